@@ -1,7 +1,22 @@
 # app.py
-from fastapi import FastAPI, HTTPException
+import time
+IMPORT_STARTED = time.monotonic()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from db.db_handling import DatabaseHandler
+from db.db_manager import DatabaseHandler
+from db.async_db_manager import async_handler_from_env
+from db.passwords import PasswordHasher
+from db.http_errors import register_error_handlers
+from db.http_cache import conditional_json
+from db.cache import TTLCache
+from db.analytics import AnalyticsWriter, AnalyticsMiddleware
+from db.metrics import MetricsRegistry, QueryMetrics, HTTPMetricsMiddleware, register_handler_stats, PROMETHEUS_CONTENT_TYPE
+from db.lifecycle import AppLifecycle, InFlightMiddleware
+from db.replicas import parse_replica_hosts
+from db.admission import AdmissionController, AdmissionMiddleware, RouteLimit, bucket_store_from_env
 from dotenv import load_dotenv
 import os
 
@@ -10,18 +25,105 @@ import os
 # =========================
 load_dotenv()
 
+metrics = MetricsRegistry()
+lifecycle = AppLifecycle(IMPORT_STARTED)
+DRAIN_TIMEOUT = float(os.getenv('DRAIN_TIMEOUT', 10))
+# Seconds between SIGTERM (readiness drops) and the server closing its socket
+DRAIN_DELAY = float(os.getenv('DRAIN_DELAY', 5))
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
 DB_CONFIG = {
     'host': os.getenv('DB_HOST', '127.0.0.1'),
     'database': os.getenv('DB_NAME', 'chatting'),
     'user': os.getenv('DB_USER', 'postgres'),
     'password': os.getenv('DB_PASSWORD', 'placeholder'),
-    'port': int(os.getenv('DB_PORT', 5432))
+    'port': int(os.getenv('DB_PORT', 5432)),
+    'pooled': os.getenv('DB_POOLED', 'true').lower() == 'true',
+    'min_connections': int(os.getenv('DB_POOL_MIN', 2)),
+    'max_connections': int(os.getenv('DB_POOL_MAX', 20)),
+    'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    'password_hasher': PasswordHasher(
+        rounds=int(os.getenv('BCRYPT_ROUNDS', 12)),
+        max_workers=int(os.getenv('BCRYPT_WORKERS', 2)),
+        max_queue=int(os.getenv('BCRYPT_QUEUE_LIMIT', 32))
+    ),
+    'cache': TTLCache(maxsize=int(os.getenv('CACHE_MAXSIZE', 10000)))
+        if os.getenv('CACHE_ENABLED', 'true').lower() == 'true' else None,
+    'cache_notify': os.getenv('CACHE_NOTIFY', 'false').lower() == 'true',
+    'last_login_flush_interval': float(os.getenv('LAST_LOGIN_FLUSH_INTERVAL', 5.0)) or None,
+    'metrics': QueryMetrics(
+        metrics,
+        enabled=METRICS_ENABLED,
+        slow_query_ms=float(os.getenv('SLOW_QUERY_MS', 200)),
+        explain_slow_queries=os.getenv('EXPLAIN_SLOW_QUERIES', 'false').lower() == 'true'
+    ),
+    'prepared_statements': os.getenv('PREPARED_STATEMENTS', 'true').lower() == 'true',
+    'max_replica_lag': float(os.getenv('DB_REPLICA_MAX_LAG', 5.0)),
+    'sticky_window': float(os.getenv('DB_REPLICA_STICKY_WINDOW', 5.0))
 }
+# Comma-separated host[:port] list; replicas share the primary's database and credentials
+DB_CONFIG['replicas'] = parse_replica_hosts(os.getenv('DB_REPLICA_HOSTS', ''), {
+    key: DB_CONFIG[key] for key in ('host', 'database', 'user', 'password', 'port')})
 
+# Built without touching the network; lifespan() connects
 db = DatabaseHandler(**DB_CONFIG)
-db.connect()
+# Routes await async_db: asyncpg (default) or 'psycopg2' on the threadpool
+async_db = async_handler_from_env(
+    os.getenv('DB_DRIVER', 'asyncpg'), db,
+    min_connections=DB_CONFIG['min_connections'],
+    max_connections=DB_CONFIG['max_connections'],
+    pool_timeout=DB_CONFIG['pool_timeout']
+)
+
+analytics = AnalyticsWriter(
+    db,
+    max_queue=int(os.getenv('ANALYTICS_QUEUE_SIZE', 10000)),
+    batch_size=int(os.getenv('ANALYTICS_BATCH_SIZE', 500)),
+    flush_interval=float(os.getenv('ANALYTICS_FLUSH_INTERVAL', 1.0)),
+    policy=os.getenv('ANALYTICS_POLICY', 'drop')
+)
+
+# Login and registration run bcrypt: cap them so a burst cannot take every
+# worker thread, and rate-limit each client IP against credential stuffing
+admission = AdmissionController([
+    RouteLimit('POST', '/register', max_concurrent=4, max_queue=8, queue_timeout=0.5,
+               rate=float(os.getenv('REGISTER_RATE_LIMIT', 0.2)), burst=float(os.getenv('REGISTER_RATE_BURST', 5))),
+    RouteLimit('POST', '/login', max_concurrent=8, max_queue=16, queue_timeout=0.5,
+               rate=float(os.getenv('LOGIN_RATE_LIMIT', 2)), burst=float(os.getenv('LOGIN_RATE_BURST', 10))),
+], store=bucket_store_from_env(os.getenv('RATE_LIMIT_STORE', 'memory'), db), registry=metrics,
+   trust_forwarded=os.getenv('TRUST_FORWARDED_FOR', 'false').lower() == 'true',
+   forwarded_hops=int(os.getenv('FORWARDED_HOPS', 1)))
+
+register_handler_stats(metrics, db)
+metrics.register_stats('db_request_pool', async_db.get_pool_stats)
+metrics.register_stats('analytics', analytics.stats)
+metrics.register_stats('admission', admission.stats)
+metrics.register_stats('app', lambda: {'in_flight': lifecycle.in_flight, 'ready': int(lifecycle.ready)})
 
-app = FastAPI(title="Chatting API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not await async_db.connect():
+        await async_db.disconnect()
+        raise RuntimeError("Database warm-up failed")
+    analytics.start()
+    admission.start()
+    lifecycle.handle_sigterm(DRAIN_DELAY)
+    lifecycle.mark_ready()
+    yield
+    await lifecycle.drain(DRAIN_TIMEOUT)
+    await run_in_threadpool(analytics.close)
+    await run_in_threadpool(admission.close)
+    await async_db.disconnect()
+    lifecycle.mark_stopped()
+
+app = FastAPI(title="Chatting API", lifespan=lifespan)
+register_error_handlers(app)
+app.add_middleware(AnalyticsMiddleware, writer=analytics)
+if METRICS_ENABLED:
+    app.add_middleware(HTTPMetricsMiddleware, registry=metrics)
+app.add_middleware(InFlightMiddleware, lifecycle=lifecycle)
+if os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true':
+    app.add_middleware(AdmissionMiddleware, controller=admission)
 
 # =========================
 # SCHEMAS
@@ -42,12 +144,12 @@ class UserLogin(BaseModel):
 # =========================
 
 @app.get("/")
-def home():
+async def home():
     return {"message": "✅ FastAPI server is running!"}
 
 @app.post("/register")
-def register(user: UserCreate):
-    user_id = db.create_user(
+async def register(user: UserCreate):
+    user_id = await async_db.create_user(
         email=user.email,
         password=user.password,
         first_name=user.first_name,
@@ -59,8 +161,8 @@ def register(user: UserCreate):
     return {"success": True, "user_id": user_id}
 
 @app.post("/login")
-def login(user: UserLogin):
-    user_info = db.authenticate_user(
+async def login(user: UserLogin):
+    user_info = await async_db.authenticate_user(
         email=user.email,
         password=user.password
     )
@@ -69,19 +171,33 @@ def login(user: UserLogin):
     return {"success": True, "user": user_info}
 
 @app.get("/projects/{user_id}")
-def get_projects(user_id: str):
-    projects = db.get_user_projects(user_id)
+async def get_projects(user_id: str):
+    projects = await async_db.get_user_projects(user_id)
     return {"projects": projects}
 
 @app.get("/chats/{user_id}")
-def get_chats(user_id: str):
-    chats = db.get_user_chat_sessions(user_id)
+async def get_chats(user_id: str):
+    chats = await async_db.get_user_chat_sessions(user_id)
     return {"chat_sessions": chats}
 
 @app.get("/models")
-def get_models():
-    models = db.get_available_models()
-    return {"models": models}
+async def get_models(request: Request):
+    models = await async_db.get_available_models()
+    return conditional_json(request, {"models": models})
+
+@app.get("/health/live")
+async def liveness():
+    return {"status": "alive", **lifecycle.stats()}
+
+@app.get("/health/ready")
+async def readiness():
+    if lifecycle.ready and await async_db.test_connection():
+        return {"status": "ready", **lifecycle.stats()}
+    raise HTTPException(status_code=503, detail=lifecycle.stats())
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 # =========================
 # RUN SERVER
@@ -0,0 +1,197 @@
+"""Latency of well-behaved clients while others flood the API, with admission control off and on.
+
+Starts the API (``--app``) against a throwaway Postgres, once with
+ADMISSION_ENABLED=false and once with it on (``--store`` picks the
+bucket store). In each run, ``--victims`` paced clients, each with its own
+IP and session, send POST /chat/messages/add at ``--victim-rate`` and POST
+/users/authenticate at ``--victim-login-rate``. They run first alone
+(baseline), then while ``--abusers`` connections from ``--abuser-ips``
+addresses send both endpoints as fast as they can, logging in with a
+wrong password. The abusers run in ``--abuser-processes`` separate
+processes, so their client-side work doesn't skew the victims' timings.
+Client IPs are sent as X-Forwarded-For, with TRUST_FORWARDED_FOR=true.
+
+With admission on, the run fails unless every victim request succeeds, the
+victims' overload p99 stays within ``--max-p99-ratio`` x baseline p99 +
+``--p99-slack-ms`` on each endpoint, and the abusers are refused.
+
+    uv run python -m benchmarks.bench_admission --abusers 128 --duration 15
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+from .common import db_config_from_env, summarize_ms
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .run import start_api
+from .seed import seed
+
+ENDPOINTS = ('chat_messages_add', 'users_authenticate')
+
+
+def request_for(endpoint: str, session_id: str, email: str, password: str) -> tuple:
+    if endpoint == 'chat_messages_add':
+        return '/chat/messages/add', {'session_id': session_id, 'role': 'user',
+                                      'content': 'compare the ablation against the baseline'}
+    return '/users/authenticate', {'email': email, 'password': password}
+
+
+async def victim(client: httpx.AsyncClient, n: int, endpoint: str, rate: float, duration: float,
+                 session_id: str, email: str, password: str, samples: list, statuses: Counter):
+    """One paced client: requests on a fixed schedule, so a slow response delays the next one only once"""
+    path, body = request_for(endpoint, session_id, email, password)
+    headers = {'X-Forwarded-For': f'10.1.{n // 250}.{n % 250 + 1}'}
+    interval = 1 / rate
+    deadline = time.perf_counter() + duration
+    next_at = time.perf_counter()
+    while next_at < deadline:
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, json=body, headers=headers)
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                samples.append(time.perf_counter() - started)
+        except httpx.HTTPError:
+            statuses['error'] += 1
+        next_at += interval
+
+
+async def run_victims(base_url: str, args, fixture) -> dict:
+    samples = {endpoint: [] for endpoint in ENDPOINTS}
+    statuses = {endpoint: Counter() for endpoint in ENDPOINTS}
+    rates = {'chat_messages_add': args.victim_rate, 'users_authenticate': args.victim_login_rate}
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0,
+                                 limits=httpx.Limits(max_connections=args.victims * 2)) as client:
+        await asyncio.gather(*(
+            victim(client, n, endpoint, rates[endpoint], args.duration,
+                   fixture.sessions[user['user_id']][0], user['email'], fixture.password,
+                   samples[endpoint], statuses[endpoint])
+            for n, user in enumerate(fixture.users[:args.victims]) for endpoint in ENDPOINTS))
+    return {endpoint: {'ok': len(samples[endpoint]), 'statuses': dict(statuses[endpoint]),
+                       'latency_ms': summarize_ms(samples[endpoint])} for endpoint in ENDPOINTS}
+
+
+async def flood(base_url: str, connections: int, ips: list, sessions: list, emails: list, stop_at: float) -> dict:
+    statuses = Counter()
+    retry_after = Counter()
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0,
+                                 limits=httpx.Limits(max_connections=connections)) as client:
+        async def worker(n: int):
+            headers = {'X-Forwarded-For': ips[n % len(ips)]}
+            endpoint = ENDPOINTS[n % len(ENDPOINTS)]
+            path, body = request_for(endpoint, sessions[n % len(sessions)], emails[n % len(emails)], 'wrong-password')
+            while time.perf_counter() < stop_at:
+                try:
+                    response = await client.post(path, json=body, headers=headers)
+                    statuses[f'{endpoint}:{response.status_code}'] += 1
+                    if 'retry-after' in response.headers:
+                        retry_after[endpoint] += 1
+                except httpx.HTTPError:
+                    statuses[f'{endpoint}:error'] += 1
+        await asyncio.gather(*(worker(n) for n in range(connections)))
+    return {'statuses': dict(statuses), 'with_retry_after': dict(retry_after)}
+
+
+def abuser_process(base_url: str, connections: int, ips: list, sessions: list, emails: list,
+                   seconds: float, results):
+    results.put(asyncio.run(flood(base_url, connections, ips, sessions, emails, time.perf_counter() + seconds)))
+
+
+def measure(params, args, fixture, admission: bool) -> dict:
+    env = {'ADMISSION_ENABLED': str(admission).lower(), 'TRUST_FORWARDED_FOR': 'true',
+           'RATE_LIMIT_STORE': args.store}
+    server, _ = start_api(args.app, params, args.port, env=env)
+    base_url = f'http://127.0.0.1:{args.port}'
+    try:
+        baseline = asyncio.run(run_victims(base_url, args, fixture))
+
+        abuser_users = fixture.users[args.victims:] or fixture.users
+        sessions = [fixture.sessions[user['user_id']][0] for user in abuser_users]
+        emails = [user['email'] for user in abuser_users]
+        ips = [f'10.2.0.{n + 1}' for n in range(args.abuser_ips)]
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        abusers = [context.Process(target=abuser_process,
+                                   args=(base_url, args.abusers // args.abuser_processes, ips, sessions, emails,
+                                         args.duration + 2 * args.ramp, results))
+                   for _ in range(args.abuser_processes)]
+        for process in abusers:
+            process.start()
+        time.sleep(args.ramp)
+        overload = asyncio.run(run_victims(base_url, args, fixture))
+        flooded = [results.get(timeout=args.duration + 60) for _ in abusers]
+        for process in abusers:
+            process.join()
+        health = httpx.get(f'{base_url}/health', timeout=30.0).json()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    abuser_statuses = Counter()
+    for result in flooded:
+        abuser_statuses.update(result['statuses'])
+    return {'baseline': baseline, 'overload': overload, 'abusers': dict(abuser_statuses),
+            'admission': health.get('admission')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--app', default='db.main:app')
+    parser.add_argument('--port', type=int, default=8768)
+    parser.add_argument('--store', choices=['memory', 'postgres'], default='memory')
+    parser.add_argument('--victims', type=int, default=8)
+    parser.add_argument('--victim-rate', type=float, default=5.0, help='messages/sec per victim')
+    parser.add_argument('--victim-login-rate', type=float, default=0.5, help='logins/sec per victim')
+    parser.add_argument('--abusers', type=int, default=128, help='flooding connections in total')
+    parser.add_argument('--abuser-ips', type=int, default=4)
+    parser.add_argument('--abuser-processes', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--ramp', type=float, default=2.0, help='seconds of flooding before victims start')
+    parser.add_argument('--max-p99-ratio', type=float, default=3.0)
+    parser.add_argument('--p99-slack-ms', type=float, default=25.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    try:
+        apply_schema(params)
+        fixture = seed(params, users=args.victims + 64, projects_per_user=1, sessions_per_user=1,
+                       messages_per_session=20, bcrypt_rounds=4, random_seed=args.seed)
+        results = {'off': measure(params, args, fixture, admission=False),
+                   'on': measure(params, args, fixture, admission=True)}
+    finally:
+        instance.stop()
+
+    on = results['on']
+    checks = {
+        'victims_all_ok': all(on[phase][endpoint]['statuses'] == {200: on[phase][endpoint]['ok']}
+                              for phase in ('baseline', 'overload') for endpoint in ENDPOINTS),
+        'abusers_refused': any(key.endswith(':429') or key.endswith(':503') for key in on['abusers']),
+    }
+    for endpoint in ENDPOINTS:
+        baseline_p99 = on['baseline'][endpoint]['latency_ms']['p99']
+        checks[f'{endpoint}_p99_stable'] = \
+            on['overload'][endpoint]['latency_ms']['p99'] <= baseline_p99 * args.max_p99_ratio + args.p99_slack_ms
+    results['checks'] = checks
+
+    print(json.dumps(results, indent=2, default=str))
+    if not all(checks.values()):
+        print(f"❌ Failed: {', '.join(name for name, ok in checks.items() if not ok)}", file=sys.stderr)
+        sys.exit(1)
+    print('✅ ' + '; '.join(
+        f"{endpoint} p99 {results['off']['overload'][endpoint]['latency_ms']['p99']:.0f} ms without admission, "
+        f"{on['overload'][endpoint]['latency_ms']['p99']:.0f} ms with (baseline "
+        f"{on['baseline'][endpoint]['latency_ms']['p99']:.0f} ms)" for endpoint in ENDPOINTS), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Messages/sec of add_chat_message (one round trip each) vs add_chat_messages.
+
+Creates a throwaway chat session for an existing user, inserts the same
+number of messages through both paths, deletes them again and prints one
+JSON document:
+
+    uv run python -m benchmarks.bench_batch_insert --messages 5000 --batch-size 500
+"""
+import argparse
+import json
+import time
+
+from db.db_manager import DatabaseHandler
+
+from .common import db_config_from_env, pick_user_id
+
+
+def make_messages(count: int):
+    return [
+        {'role': 'user' if i % 2 == 0 else 'assistant',
+         'content': f'benchmark message {i} ' + 'lorem ipsum ' * 20,
+         'metadata': {'seq': i}}
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    db = DatabaseHandler(**db_config_from_env())
+    if not db.connect():
+        raise SystemExit(1)
+    session_id = db.create_chat_session(pick_user_id(), title='batch insert benchmark')
+    messages = make_messages(args.messages)
+
+    try:
+        started = time.perf_counter()
+        for message in messages:
+            db.add_chat_message(session_id, message['role'], message['content'], message['metadata'])
+        single_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for offset in range(0, len(messages), args.batch_size):
+            db.add_chat_messages(session_id, messages[offset:offset + args.batch_size])
+        batch_elapsed = time.perf_counter() - started
+    finally:
+        with db.cursor() as cursor:
+            cursor.execute("DELETE FROM chat_messages WHERE session_id = %s", (session_id,))
+            cursor.execute("DELETE FROM chat_sessions WHERE session_id = %s", (session_id,))
+        db.disconnect()
+
+    print(json.dumps({
+        'messages': args.messages,
+        'batch_size': args.batch_size,
+        'single_insert': {'seconds': single_elapsed, 'messages_per_sec': args.messages / single_elapsed},
+        'batch_insert': {'seconds': batch_elapsed, 'messages_per_sec': args.messages / batch_elapsed},
+        'speedup': single_elapsed / batch_elapsed if batch_elapsed else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Per-turn cost of fitting a long chat into a token budget: full reload vs incremental summary.
+
+For each ``--messages`` history size, seeds one session in a throwaway
+Postgres and plays ``--turns`` turns. Each turn appends a user/assistant
+pair and builds the prompt context within ``--budget`` tokens:
+
+* ``reload``: read the whole history (server-side cursor, lean rows) and
+  keep the newest messages that fit, as a caller of get_chat_messages
+  would today
+* ``incremental``: ContextBuilder with the extractive summarizer, reading
+  only messages after the persisted summary position
+
+The first incremental turn pays for summarizing the whole history once;
+it is reported separately from the steady-state turns.
+
+    uv run python -m benchmarks.bench_context --messages 1000 10000 --turns 50
+"""
+import argparse
+import json
+import time
+
+from db.context import ContextBuilder, ExtractiveSummarizer
+from db.db_manager import DatabaseHandler
+
+from .common import db_config_from_env, summarize_ms
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .seed import seed
+
+
+def build_reload(db, builder: ContextBuilder, session_id: str, budget: int) -> int:
+    """Newest messages that fit the budget, from a full history read; returns messages read"""
+    messages = list(db.iter_chat_messages(session_id, lean=True))
+    used = 0
+    for message in reversed(messages):
+        used += builder.message_tokens(message)
+        if used > budget:
+            break
+    return len(messages)
+
+
+def play(db, session_id: str, turns: int, build) -> dict:
+    samples, reads = [], []
+    for turn in range(turns):
+        db.add_chat_messages(session_id, [
+            {'role': 'user', 'content': f'Turn {turn}: how does this change the evaluation setup?'},
+            {'role': 'assistant', 'content': f'Turn {turn}: it shifts the baseline. ' * 20},
+        ])
+        started = time.perf_counter()
+        reads.append(build())
+        samples.append(time.perf_counter() - started)
+    return {'latency_ms': summarize_ms(samples), 'messages_read_per_turn': sum(reads) / len(reads)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--messages', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--turns', type=int, default=50)
+    parser.add_argument('--budget', type=int, default=4096)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    results = {'budget': args.budget, 'turns': args.turns, 'history': {}}
+    for size in args.messages:
+        instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+        params = instance.start()
+        db = None
+        try:
+            apply_schema(params)
+            fixture = seed(params, users=1, projects_per_user=1, sessions_per_user=2,
+                           messages_per_session=size, bcrypt_rounds=4, random_seed=args.seed)
+            reload_session, incremental_session = fixture.sessions[fixture.users[0]['user_id']]
+            db = DatabaseHandler(**params)
+            db.connect()
+            builder = ContextBuilder(db, ExtractiveSummarizer())
+
+            started = time.perf_counter()
+            first = builder.build(incremental_session, args.budget)
+            first_turn = {'ms': (time.perf_counter() - started) * 1000,
+                          'messages_read': first['messages_read'], 'folded': first['folded_messages']}
+
+            results['history'][size] = {
+                'reload': play(db, reload_session, args.turns,
+                               lambda: build_reload(db, builder, reload_session, args.budget)),
+                'incremental_first_turn': first_turn,
+                'incremental': play(db, incremental_session, args.turns,
+                                    lambda: builder.build(incremental_session, args.budget)['messages_read']),
+                'builder': builder.stats(),
+            }
+            run = results['history'][size]
+            run['speedup_p50'] = run['reload']['latency_ms']['p50'] / run['incremental']['latency_ms']['p50']
+        finally:
+            if db:
+                db.disconnect()
+            instance.stop()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""PDF ingestion throughput in pages/sec, by process-pool size, plus the cost of a duplicate upload.
+
+Writes a synthetic ``--pages``-page PDF (plain text pages, built by hand
+so the benchmark needs nothing beyond pypdf), then ingests a fresh copy
+of it into a throwaway Postgres once per ``--workers`` setting. Each copy
+differs by one byte so it hashes differently and is really ingested; the
+final run re-uploads an unchanged file to time the content-hash skip.
+
+    uv run python -m benchmarks.bench_ingest --pages 400 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import List
+
+from db.db_manager import DatabaseHandler
+from db.documents import DocumentIngestor
+
+from .common import db_config_from_env
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .seed import WORDS, seed
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path: str, pages: List[List[str]], marker: str = ''):
+    """Minimal PDF with one Helvetica text line per entry of each page"""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None,
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for lines in pages:
+        stream = 'BT /F1 10 Tf 12 TL 40 800 Td ' + ' '.join(f'({_escape(line)}) Tj T*' for line in lines) + ' ET'
+        stream = stream.encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % len(objects))
+        kids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % kid for kid in kids), len(kids))
+
+    out = bytearray(b'%PDF-1.4\n% ' + marker.encode('latin-1') + b'\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def wait_done(db, document_id: str, timeout: float = 600.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        document = db.get_document(document_id)
+        if document and document['status'] in ('done', 'failed'):
+            return document
+        time.sleep(0.05)
+    raise TimeoutError(f"Document {document_id} not ingested after {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--lines-per-page', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--pages-per-task', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [[' '.join(rng.choice(WORDS) for _ in range(12)) for _ in range(args.lines_per_page)]
+             for _ in range(args.pages)]
+    workdir = tempfile.mkdtemp(prefix='bench_ingest_')
+
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    db = None
+    try:
+        apply_schema(params)
+        fixture = seed(params, users=1, projects_per_user=0, sessions_per_user=0,
+                       messages_per_session=0, bcrypt_rounds=4, random_seed=args.seed)
+        db = DatabaseHandler(**params, pooled=True, max_connections=4)
+        db.connect()
+        project_id = db.create_project('Ingest benchmark', 'bench_ingest', fixture.users[0]['user_id'])
+
+        results = {'pages': args.pages, 'runs': {}}
+        path = None
+        for workers in args.workers:
+            path = os.path.join(workdir, f'doc-{workers}.pdf')
+            write_pdf(path, pages, marker=f'run {workers}')
+            ingestor = DocumentIngestor(db, max_workers=workers, pages_per_task=args.pages_per_task)
+            try:
+                list(ingestor.iter_pages(path, 1))  # spawn the workers outside the timing
+                started = time.perf_counter()
+                document = ingestor.add(project_id, os.path.basename(path), path)
+                document = wait_done(db, document['document_id'])
+                elapsed = time.perf_counter() - started
+                results['runs'][workers] = {
+                    'status': document['status'],
+                    'seconds': elapsed,
+                    'pages_per_sec': args.pages / elapsed,
+                    'db_pages_per_sec': float(document['pages_per_sec'] or 0),
+                    'chunks': document['chunk_count'],
+                }
+            finally:
+                ingestor.close()
+
+        # Re-upload of an unchanged file: hash + lookup, no extraction
+        ingestor = DocumentIngestor(db, max_workers=1)
+        try:
+            started = time.perf_counter()
+            duplicate = ingestor.add(project_id, os.path.basename(path), path)
+            results['duplicate_upload'] = {'queued': duplicate['queued'],
+                                           'ms': (time.perf_counter() - started) * 1000}
+        finally:
+            ingestor.close()
+        base = results['runs'][args.workers[0]]['pages_per_sec']
+        results['scaling'] = {workers: run['pages_per_sec'] / base for workers, run in results['runs'].items()}
+    finally:
+        if db:
+            db.disconnect()
+        instance.stop()
+        for name in os.listdir(workdir):
+            os.unlink(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
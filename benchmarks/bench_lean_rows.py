@@ -0,0 +1,95 @@
+"""Latency and peak memory of a 10k-message history fetch: dict rows + FastAPI encoding vs lean rows + orjson.
+
+Seeds one chat session with ``--messages`` messages in a throwaway
+Postgres, then times fetching the whole history with
+get_chat_messages_page and serializing it to JSON bytes the way each
+response path does:
+
+* ``dict``: RealDictCursor rows copied into dicts, jsonable_encoder and
+  json.dumps (what FastAPI does for a returned dict)
+* ``lean``: tuple rows as MessageRecords, metadata passed through as raw
+  JSON text, orjson.dumps (LeanJSONResponse)
+
+Peak memory is measured with tracemalloc in a separate pass so tracing
+does not distort the timings.
+
+    uv run python -m benchmarks.bench_lean_rows --messages 10000 --repeat 20
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from db.db_manager import DatabaseHandler
+
+from .common import db_config_from_env, summarize_ms
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .seed import seed
+
+
+def fetch_dict(db, session_id: str, limit: int) -> bytes:
+    page = db.get_chat_messages_page(session_id, limit=limit)
+    return json.dumps(jsonable_encoder(page)).encode('utf-8')
+
+
+def fetch_lean(db, session_id: str, limit: int) -> bytes:
+    return orjson.dumps(db.get_chat_messages_page(session_id, limit=limit, lean=True))
+
+
+MODES = {'dict': fetch_dict, 'lean': fetch_lean}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    db = None
+    try:
+        apply_schema(params)
+        fixture = seed(params, users=1, projects_per_user=1, sessions_per_user=1,
+                       messages_per_session=args.messages, bcrypt_rounds=4, random_seed=args.seed)
+        session_id = fixture.sessions[fixture.users[0]['user_id']][0]
+        db = DatabaseHandler(**params)
+        db.connect()
+
+        results = {}
+        for mode, fetch in MODES.items():
+            body = fetch(db, session_id, args.messages)  # warm up
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                fetch(db, session_id, args.messages)
+                samples.append(time.perf_counter() - started)
+
+            tracemalloc.start()
+            fetch(db, session_id, args.messages)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[mode] = {
+                'latency_ms': summarize_ms(samples),
+                'peak_memory_mb': peak / 1024 / 1024,
+                'response_bytes': len(body),
+            }
+        results['speedup_p50'] = results['dict']['latency_ms']['p50'] / results['lean']['latency_ms']['p50']
+        results['memory_ratio'] = results['dict']['peak_memory_mb'] / results['lean']['peak_memory_mb']
+        results['data'] = fixture.counts
+    finally:
+        if db:
+            db.disconnect()
+        instance.stop()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
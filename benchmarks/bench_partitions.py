@@ -0,0 +1,173 @@
+"""Hot-path size and read latency before and after archiving old chat_messages partitions.
+
+Seeds a throwaway Postgres with sessions spread over ``--history-days`` at
+``--scale``. It measures the total size of the attached partitions'
+indexes and get_chat_messages_page latency (oldest page and latest page)
+for recent sessions and for sessions old enough to be archived. Then
+PartitionMaintainer archives every month older than ``--retain-months``
+and the same is measured again. Old sessions are now read back from the
+archive files.
+
+Every sampled old session is walked page by page in both directions, and
+exported with iter_chat_messages, before and after. The run fails unless
+the results are identical and the hot indexes got smaller.
+
+    uv run python -m benchmarks.bench_partitions --scale small --history-days 720 --retain-months 3
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from db.archive import PartitionMaintainer
+from db.db_manager import DatabaseHandler
+
+from .common import db_config_from_env, summarize_ms
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .seed import SCALES, seed
+
+
+def message_key(message: dict) -> tuple:
+    return (str(message['message_id']), message['role'], message['content'], message['metadata'],
+            message['created_at'])
+
+
+def walk(db, session_id: str, limit: int, latest: bool) -> list:
+    """Every message of a session through page cursors, in chronological order"""
+    page = db.get_chat_messages_page(session_id, limit=limit, latest=latest)
+    pages = [page['messages']]
+    follow = 'older_cursor' if latest else 'newer_cursor'
+    while page[follow]:
+        page = db.get_chat_messages_page(session_id, limit=limit, cursor=page[follow])
+        pages.append(page['messages'])
+    if latest:
+        pages.reverse()
+    return [message_key(message) for messages in pages for message in messages]
+
+
+def snapshot(db, sessions: list, limit: int) -> dict:
+    return {session_id: {
+        'forward': walk(db, session_id, limit, latest=False),
+        'backward': walk(db, session_id, limit, latest=True),
+        'export': [message_key(message) for message in db.iter_chat_messages(session_id)],
+    } for session_id in sessions}
+
+
+def latencies(db, sessions: list, limit: int, rounds: int) -> dict:
+    samples = {'oldest_page': [], 'latest_page': []}
+    for _ in range(rounds):
+        for session_id in sessions:
+            started = time.perf_counter()
+            db.get_chat_messages(session_id, limit=limit)
+            samples['oldest_page'].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            db.get_chat_messages_page(session_id, limit=limit, latest=True)
+            samples['latest_page'].append(time.perf_counter() - started)
+    return {name: summarize_ms(values) for name, values in samples.items()}
+
+
+def hot_size(db) -> dict:
+    partitions = db.get_message_partitions()
+    return {
+        'partitions': len(partitions),
+        'rows_estimate': sum(p['row_estimate'] for p in partitions),
+        'table_bytes': sum(p['table_bytes'] for p in partitions),
+        'index_bytes': sum(p['index_bytes'] for p in partitions),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--history-days', type=int, default=720)
+    parser.add_argument('--retain-months', type=int, default=3)
+    parser.add_argument('--inactive-days', type=int, default=30)
+    parser.add_argument('--sample', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    db = None
+    try:
+        apply_schema(params)
+        fixture = seed(params, bcrypt_rounds=4, random_seed=args.seed, history_days=args.history_days,
+                       **SCALES[args.scale])
+        db = DatabaseHandler(**params, prepared_statements=True)
+        db.connect()
+        with db.cursor('analyze') as cursor:
+            cursor.execute("ANALYZE")
+
+        with tempfile.TemporaryDirectory() as directory:
+            maintainer = PartitionMaintainer(db, directory, retain_months=args.retain_months,
+                                             inactive_days=args.inactive_days)
+            cutoff = maintainer.archive_cutoff()
+            recent_since = datetime.now(timezone.utc) - timedelta(days=args.inactive_days)
+            with db.cursor('sessions') as cursor:
+                cursor.execute("""
+                    SELECT session_id, last_message_at < %s AS old, last_message_at >= %s AS recent
+                    FROM chat_sessions WHERE message_count > 0
+                """, (cutoff - timedelta(days=1), recent_since))
+                sessions = cursor.fetchall()
+            old = rng.sample([s['session_id'] for s in sessions if s['old']],
+                             min(args.sample, sum(1 for s in sessions if s['old'])))
+            recent = rng.sample([s['session_id'] for s in sessions if s['recent']],
+                                min(args.sample, sum(1 for s in sessions if s['recent'])))
+
+            before = {'hot': hot_size(db), 'recent_sessions': latencies(db, recent, args.limit, args.rounds),
+                      'old_sessions': latencies(db, old, args.limit, args.rounds)}
+            expected = snapshot(db, old, args.limit)
+
+            started = time.perf_counter()
+            run = maintainer.run_once()
+            archive_seconds = time.perf_counter() - started
+            with db.cursor('analyze') as cursor:
+                cursor.execute("ANALYZE chat_messages")
+
+            after = {'hot': hot_size(db), 'recent_sessions': latencies(db, recent, args.limit, args.rounds),
+                     'old_sessions': latencies(db, old, args.limit, args.rounds)}
+            actual = snapshot(db, old, args.limit)
+            archives = db.get_message_archives()
+
+        archived_messages = sum(a['message_count'] for a in archives)
+        results = {
+            'data': fixture.counts,
+            'before': before,
+            'after': after,
+            'archive': {
+                'partitions': len(archives),
+                'messages': archived_messages,
+                'bytes': sum(a['size_bytes'] for a in archives),
+                'seconds': archive_seconds,
+                'blocked': run['blocked'],
+            },
+            'sampled': {'old_sessions': len(old), 'recent_sessions': len(recent)},
+        }
+        checks = {
+            'archived_something': archived_messages > 0,
+            'archived_reads_identical': actual == expected,
+            'hot_indexes_smaller': after['hot']['index_bytes'] < before['hot']['index_bytes'],
+        }
+        results['checks'] = checks
+    finally:
+        if db:
+            db.disconnect()
+        instance.stop()
+
+    print(json.dumps(results, indent=2, default=str))
+    if not all(checks.values()):
+        print(f"❌ Failed: {', '.join(name for name, ok in checks.items() if not ok)}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ Archived {archived_messages} messages; hot indexes "
+          f"{before['hot']['index_bytes'] // 1024} -> {after['hot']['index_bytes'] // 1024} KiB", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Per-query latency of the chat history and sidebar queries with and without prepared statements.
+
+Provisions and seeds a throwaway Postgres, then runs get_chat_messages_page
+(latest page) and get_user_chat_sessions through two DatabaseHandlers that
+differ only in ``prepared_statements``. Calls alternate between the two so
+drift (autovacuum, cache warming) hits both equally. Prints one JSON
+document with latency per query and variant and the p50/mean saved:
+
+    uv run python -m benchmarks.bench_prepared --repeat 2000
+    uv run python -m benchmarks.bench_prepared --provision temp-database --scale medium
+"""
+import argparse
+import json
+import random
+import time
+
+from db.db_manager import DatabaseHandler
+
+from .common import db_config_from_env, summarize_ms
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .seed import SCALES, seed
+
+QUERIES = {
+    'history': lambda db, user, session_id: db.get_chat_messages_page(session_id, limit=50, latest=True),
+    'sidebar': lambda db, user, session_id: db.get_user_chat_sessions(user['user_id']),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    handlers = {}
+    try:
+        apply_schema(params)
+        fixture = seed(params, bcrypt_rounds=4, random_seed=args.seed, **SCALES[args.scale])
+        handlers = {
+            'unprepared': DatabaseHandler(**params, prepared_statements=False),
+            'prepared': DatabaseHandler(**params, prepared_statements=True),
+        }
+        for db in handlers.values():
+            db.connect()
+
+        rng = random.Random(args.seed)
+        samples = {query: {variant: [] for variant in handlers} for query in QUERIES}
+        for n in range(args.warmup + args.repeat):
+            user = rng.choice(fixture.users)
+            session_id = rng.choice(fixture.sessions[user['user_id']])
+            for query, call in QUERIES.items():
+                # Same arguments for both variants, in alternating order
+                variants = list(handlers) if n % 2 == 0 else list(reversed(list(handlers)))
+                for variant in variants:
+                    started = time.perf_counter()
+                    call(handlers[variant], user, session_id)
+                    elapsed = time.perf_counter() - started
+                    if n >= args.warmup:
+                        samples[query][variant].append(elapsed)
+
+        results = {}
+        for query, by_variant in samples.items():
+            summary = {variant: summarize_ms(latencies) for variant, latencies in by_variant.items()}
+            summary['saved_ms'] = {
+                stat: summary['unprepared'][stat] - summary['prepared'][stat] for stat in ('mean', 'p50')
+            }
+            results[query] = summary
+        results['prepared_stats'] = handlers['prepared'].get_prepared_stats()
+        results['data'] = fixture.counts
+    finally:
+        for db in handlers.values():
+            db.disconnect()
+        instance.stop()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Full-text search latency over millions of chat messages: tsvector/GIN vs ILIKE.
+
+Seeds a throwaway Postgres at ``--scale`` (medium is 2M messages) and runs
+``--queries`` searches for random users with one- and two-word queries
+from the seed vocabulary, so most terms are common and match a large share
+of the table (the hard case for ranking):
+
+* ``fts_first_page`` / ``fts_next_page``: DatabaseHandler.search_messages,
+  access-scoped, ranked, with snippets, then the page after its cursor
+* ``ilike_scoped``: the same access scope with ``content ILIKE '%word%'``
+* ``ilike_unscoped``: a plain ``ILIKE`` over the whole table, the scan this
+  replaces (run ``--ilike-queries`` times only; it is slow)
+
+Exits non-zero if fts p95 is above ``--target-ms``.
+
+    uv run python -m benchmarks.bench_search --scale medium --queries 500
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from db.db_manager import DatabaseHandler
+
+from .common import db_config_from_env, summarize_ms
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .seed import SCALES, WORDS, seed
+
+ILIKE_SCOPED = """
+    SELECT m.message_id, m.session_id, m.content
+    FROM chat_messages m
+    WHERE m.content ILIKE %s AND m.session_id IN (
+        SELECT session_id FROM chat_sessions WHERE user_id = %s
+        UNION
+        SELECT cs.session_id FROM project_members pm
+        JOIN chat_sessions cs ON cs.project_id = pm.project_id
+        WHERE pm.user_id = %s
+    )
+    ORDER BY m.created_at DESC
+    LIMIT 20
+"""
+
+ILIKE_UNSCOPED = """
+    SELECT message_id, session_id, content
+    FROM chat_messages
+    WHERE content ILIKE %s
+    ORDER BY created_at DESC
+    LIMIT 20
+"""
+
+
+def timed(samples: list, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    samples.append(time.perf_counter() - started)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='medium')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--ilike-queries', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, default=100.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    db = None
+    try:
+        apply_schema(params)
+        fixture = seed(params, bcrypt_rounds=4, random_seed=args.seed, **SCALES[args.scale])
+        db = DatabaseHandler(**params, prepared_statements=True)
+        db.connect()
+        with db.cursor('analyze') as cursor:
+            cursor.execute("ANALYZE")
+
+        def query_text():
+            return ' '.join(rng.sample(WORDS, rng.choice([1, 2])))
+
+        samples = {'fts_first_page': [], 'fts_next_page': [], 'ilike_scoped': [], 'ilike_unscoped': []}
+        hits = []
+        for n in range(args.queries):
+            user_id = rng.choice(fixture.users)['user_id']
+            query = query_text()
+            page = timed(samples['fts_first_page'], db.search_messages, user_id, query)
+            hits.append(len(page['results']))
+            if page['next_cursor']:
+                timed(samples['fts_next_page'], db.search_messages, user_id, query, 20, page['next_cursor'])
+
+            word = f"%{rng.choice(WORDS)}%"
+            with db.cursor('ilike_scoped') as cursor:
+                timed(samples['ilike_scoped'], cursor.execute, ILIKE_SCOPED, (word, user_id, user_id))
+            if n < args.ilike_queries:
+                with db.cursor('ilike_unscoped') as cursor:
+                    timed(samples['ilike_unscoped'], cursor.execute, ILIKE_UNSCOPED, (word,))
+
+        results = {name: summarize_ms(values) for name, values in samples.items()}
+        results['avg_hits_first_page'] = sum(hits) / len(hits)
+        results['data'] = fixture.counts
+    finally:
+        if db:
+            db.disconnect()
+        instance.stop()
+
+    print(json.dumps(results, indent=2))
+    p95 = max(results['fts_first_page']['p95'], results['fts_next_page']['p95'])
+    if p95 > args.target_ms:
+        print(f"❌ Search p95 {p95:.1f}ms is above {args.target_ms:.0f}ms", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ Search p95 {p95:.1f}ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
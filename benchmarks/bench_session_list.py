@@ -0,0 +1,94 @@
+"""Sidebar latency (get_user_chat_sessions) as a user's message volume grows.
+
+Creates a throwaway user with a fixed number of sessions, grows the number
+of messages across those sessions in steps and, at each step, times the
+counter-backed get_user_chat_sessions against the previous
+COUNT/GROUP BY query. Requires migrations up to 0002_session_counters
+(``python -m db.migrations upgrade``).
+
+    uv run python -m benchmarks.bench_session_list --sessions 50 --steps 0,10000,100000,500000
+"""
+import argparse
+import json
+import time
+import uuid
+
+from db.db_manager import DatabaseHandler
+
+from .common import db_config_from_env, summarize_ms
+
+LEGACY_QUERY = """
+    SELECT cs.session_id, cs.title, cs.status, cs.created_at, cs.updated_at,
+           p.name as project_name,
+           COUNT(cm.message_id) as message_count
+    FROM chat_sessions cs
+    LEFT JOIN projects p ON cs.project_id = p.project_id
+    LEFT JOIN chat_messages cm ON cs.session_id = cm.session_id
+    WHERE cs.user_id = %s AND cs.status = 'active'
+    GROUP BY cs.session_id, cs.title, cs.status, cs.created_at, cs.updated_at, p.name
+    ORDER BY cs.updated_at DESC
+    LIMIT %s
+"""
+
+
+def time_calls(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize_ms(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--steps', default='0,10000,100000',
+                        help='comma-separated total message counts to measure at')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args()
+    steps = sorted(int(step) for step in args.steps.split(','))
+
+    db = DatabaseHandler(**db_config_from_env())
+    if not db.connect():
+        raise SystemExit(1)
+    user_id = db.create_user(f'bench-{uuid.uuid4().hex[:12]}@example.com', uuid.uuid4().hex)
+    session_ids = [db.create_chat_session(user_id, title=f'bench session {i}') for i in range(args.sessions)]
+
+    def legacy():
+        with db.cursor() as cursor:
+            cursor.execute(LEGACY_QUERY, (user_id, 20))
+            cursor.fetchall()
+
+    results = []
+    written = 0
+    try:
+        for step in steps:
+            while written < step:
+                count = min(args.batch_size, step - written)
+                session_id = session_ids[(written // args.batch_size) % len(session_ids)]
+                db.add_chat_messages(session_id, [
+                    {'role': 'user', 'content': f'message {written + i}'} for i in range(count)
+                ])
+                written += count
+            with db.cursor() as cursor:
+                cursor.execute("ANALYZE chat_messages")
+                cursor.execute("ANALYZE chat_sessions")
+            results.append({
+                'messages': written,
+                'counter_columns_ms': time_calls(lambda: db.get_user_chat_sessions(user_id), args.repeat),
+                'count_group_by_ms': time_calls(legacy, args.repeat),
+            })
+    finally:
+        with db.cursor() as cursor:
+            cursor.execute("DELETE FROM chat_messages WHERE session_id = ANY(%s::uuid[])", (session_ids,))
+            cursor.execute("DELETE FROM chat_sessions WHERE user_id = %s", (user_id,))
+            cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+        db.disconnect()
+
+    print(json.dumps({'sessions': args.sessions, 'repeat': args.repeat, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Streaming chat replies over SSE: client-side time to first token, tokens/sec and DB writes per reply.
+
+Starts the API (``--app``) against a throwaway Postgres with the fake
+model backend at ``--tokens-per-sec``, then has ``--concurrency`` clients
+each stream ``--replies`` replies from POST /chat/{session_id}/stream.
+Measured on the client: time from sending the request to the first
+``token`` event, and tokens/sec after it. From the server's stream stats:
+writes per reply, to compare with one write per token.
+
+Finally one client disconnects after ``--disconnect-after`` tokens and the
+stored reply is checked for status ``interrupted`` with the partial text.
+
+    uv run python -m benchmarks.bench_stream --concurrency 32 --replies 5 --tokens-per-sec 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+import psycopg2
+
+from .common import db_config_from_env, percentile, summarize_ms
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .run import start_api
+from .seed import seed
+
+
+async def stream_reply(client: httpx.AsyncClient, session_id: str, stop_after: int = None) -> dict:
+    """Stream one reply; returns timings, token count and the final event"""
+    started = time.perf_counter()
+    first_at, tokens, event, final = None, 0, None, None
+    async with client.stream('POST', f'/chat/{session_id}/stream',
+                             json={'content': 'summarize the evaluation baseline and ablation results'}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: ') and event == 'token':
+                tokens += 1
+                if first_at is None:
+                    first_at = time.perf_counter()
+                if stop_after and tokens >= stop_after:
+                    break
+            elif line.startswith('data: ') and event in ('start', 'done', 'error'):
+                final = {'event': event, **json.loads(line[len('data: '):])}
+    finished = time.perf_counter()
+    return {
+        'ttfb': first_at - started if first_at else None,
+        'tokens_per_sec': (tokens - 1) / (finished - first_at) if first_at and tokens > 1 else None,
+        'tokens': tokens,
+        'final': final,
+    }
+
+
+async def drive(base_url: str, sessions: list, concurrency: int, replies: int) -> list:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        async def worker(n: int):
+            return [await stream_reply(client, sessions[n % len(sessions)]) for _ in range(replies)]
+        results = await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return [reply for replies_ in results for reply in replies_]
+
+
+async def disconnect_midway(base_url: str, session_id: str, after: int) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        return await stream_reply(client, session_id, stop_after=after)
+
+
+def stored_message(params, message_id: str) -> dict:
+    connection = psycopg2.connect(**params)
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT content, metadata FROM chat_messages WHERE message_id = %s", (message_id,))
+        content, metadata = cursor.fetchone()
+    finally:
+        connection.close()
+    return {'words': len(content.split()), 'metadata': metadata}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--app', default='db.main:app')
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--replies', type=int, default=5)
+    parser.add_argument('--tokens-per-sec', type=float, default=100.0)
+    parser.add_argument('--flush-interval', type=float, default=0.5)
+    parser.add_argument('--disconnect-after', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ['CHAT_BACKEND'] = f'fake:{args.tokens_per_sec:g}'
+    os.environ['STREAM_FLUSH_INTERVAL'] = str(args.flush_interval)
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    server = None
+    try:
+        apply_schema(params)
+        fixture = seed(params, users=args.concurrency, projects_per_user=1, sessions_per_user=1,
+                       messages_per_session=20, bcrypt_rounds=4, random_seed=args.seed)
+        sessions = [fixture.sessions[user['user_id']][0] for user in fixture.users]
+        server, startup = start_api(args.app, params, args.port)
+        base_url = f'http://127.0.0.1:{args.port}'
+
+        started = time.perf_counter()
+        replies = asyncio.run(drive(base_url, sessions, args.concurrency, args.replies))
+        elapsed = time.perf_counter() - started
+
+        # Disconnect mid-reply, then give the server a moment to store the partial text
+        partial = asyncio.run(disconnect_midway(base_url, sessions[0], args.disconnect_after))
+        time.sleep(args.flush_interval + 1.0)
+        stored = stored_message(params, partial['final']['message_id'])
+        stream_stats = httpx.get(f'{base_url}/health').json()['chat_stream']
+
+        rates = [reply['tokens_per_sec'] for reply in replies if reply['tokens_per_sec']]
+        complete = [reply for reply in replies if reply['final'] and reply['final']['event'] == 'done']
+        results = {
+            'replies': len(replies),
+            'complete': len(complete),
+            'elapsed_s': elapsed,
+            'ttfb_ms': summarize_ms([reply['ttfb'] for reply in replies if reply['ttfb'] is not None]),
+            'client_tokens_per_sec': {'p50': percentile(rates, 50), 'p5': percentile(rates, 5)},
+            'tokens_per_reply': sum(reply['tokens'] for reply in replies) / len(replies),
+            'server': stream_stats,
+            'disconnect': {'tokens_received': partial['tokens'], 'stored': stored},
+            'startup': startup,
+        }
+        checks = {
+            'all_complete': len(complete) == len(replies),
+            'coalesced_writes': stream_stats['writes_per_reply'] < results['tokens_per_reply'] / 5,
+            'disconnect_finalized': stored['metadata'].get('status') == 'interrupted'
+                                    and stored['words'] >= partial['tokens'] - 1,
+        }
+        results['checks'] = checks
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        instance.stop()
+
+    print(json.dumps(results, indent=2))
+    if not all(checks.values()):
+        print(f"❌ Failed: {', '.join(name for name, ok in checks.items() if not ok)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
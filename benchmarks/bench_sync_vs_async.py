@@ -0,0 +1,77 @@
+"""Requests/sec of the API with its routes on psycopg2 (threadpool) and on asyncpg (event loop).
+
+Starts the API (``--app``) against a throwaway Postgres once per
+DB_DRIVER and drives the same weighted mix of HTTP workloads at the same
+concurrency, as ``benchmarks.run --target http`` does. With psycopg2 every
+route awaits its query on Starlette's threadpool (40 threads), the same
+cap sync ``def`` routes have; with asyncpg the request-path queries run on
+the event loop and only the connection pool bounds concurrency, so the
+difference shows once ``--concurrency`` exceeds the threadpool. Logins are
+left out of the default mix: they are bound by bcrypt on either driver.
+
+    uv run python -m benchmarks.bench_sync_vs_async --concurrency 128 --duration 15
+"""
+import argparse
+import json
+import sys
+
+import httpx
+
+from .common import db_config_from_env
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .run import drive, start_api, summarize
+from .seed import seed
+from .workloads import parse_mix
+
+DRIVERS = ('psycopg2', 'asyncpg')
+
+
+def measure(params, args, fixture, weights, driver: str) -> dict:
+    server, startup = start_api(args.app, params, args.port, env={'DB_DRIVER': driver})
+    target_factory = lambda: httpx.Client(base_url=f'http://127.0.0.1:{args.port}', timeout=30.0)
+    try:
+        if args.warmup:
+            drive(target_factory, 'http', fixture, weights, args.concurrency, args.warmup, args.seed)
+        samples, errors, elapsed = drive(target_factory, 'http', fixture, weights,
+                                         args.concurrency, args.duration, args.seed + 1000)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    workloads, overall = summarize(samples, errors, elapsed)
+    return {'startup': startup, 'workloads': workloads, 'overall': overall}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--app', default='db.main:app', help='ASGI app serving the db/main.py routes')
+    parser.add_argument('--port', type=int, default=8769)
+    parser.add_argument('--mix', default='append=4,history=4,sidebar=3')
+    parser.add_argument('--concurrency', type=int, default=128)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    try:
+        apply_schema(params)
+        fixture = seed(params, users=args.users, projects_per_user=2, sessions_per_user=3,
+                       messages_per_session=50, bcrypt_rounds=4, random_seed=args.seed)
+        results = {driver: measure(params, args, fixture, weights, driver) for driver in DRIVERS}
+    finally:
+        instance.stop()
+
+    print(json.dumps({'concurrency': args.concurrency, 'duration_s': args.duration, 'mix': weights,
+                      'results': results}, indent=2))
+    rates = {driver: results[driver]['overall']['throughput_per_sec'] for driver in DRIVERS}
+    print(f"✅ {rates['psycopg2']:.0f} req/s on psycopg2, {rates['asyncpg']:.0f} req/s on asyncpg "
+          f"({rates['asyncpg'] / rates['psycopg2']:.2f}x) at concurrency {args.concurrency}"
+          if rates['psycopg2'] else "❌ No successful requests on psycopg2", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Vector retrieval latency and recall@k at 10k/100k/1M chunks, plus embedding-cache re-index cost.
+
+Scale: for each ``--sizes`` entry, builds a fresh persistent project
+collection from clustered random unit vectors (``--dim`` wide; embedding
+them would measure the embedder, not the index), then runs ``--queries``
+top-k searches through ProjectVectorIndex.search_vector. Recall@k is
+measured against exact cosine top-k computed with numpy.
+
+Re-index: stores ``--cache-chunks`` chunks of one document in a throwaway
+Postgres and indexes it twice with the deterministic HashingEmbedder; the
+second pass should embed nothing and only pay for cache reads and upserts.
+
+    uv run python -m benchmarks.bench_vectors --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from db.db_manager import DatabaseHandler
+from db.embeddings import HashingEmbedder
+from db.vector_index import ProjectVectorIndex
+
+from .common import db_config_from_env, summarize_ms
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .seed import WORDS, seed
+
+
+def clustered_vectors(rng: np.random.Generator, n: int, dim: int, clusters: int = 1000) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int, block: int = 100000) -> np.ndarray:
+    """Indices of the ``k`` most cosine-similar vectors per query (all unit length), block by block"""
+    candidate_ids, candidate_scores = [], []
+    for start in range(0, len(vectors), block):
+        scores = queries @ vectors[start:start + block].T
+        top = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+        candidate_ids.append(top + start)
+        candidate_scores.append(np.take_along_axis(scores, top, axis=1))
+    ids, scores = np.concatenate(candidate_ids, axis=1), np.concatenate(candidate_scores, axis=1)
+    return np.take_along_axis(ids, np.argpartition(-scores, k - 1, axis=1)[:, :k], axis=1)
+
+
+def bench_scale(path: str, size: int, dim: int, queries: int, k: int, search_ef: int, seed_value: int) -> dict:
+    rng = np.random.default_rng(seed_value)
+    vectors = clustered_vectors(rng, size, dim)
+    index = ProjectVectorIndex(db=None, embedder=HashingEmbedder(dim), path=path,
+                               hnsw={'hnsw:search_ef': search_ef})
+    project_id = str(uuid.uuid4())
+    collection = index.collection(project_id)
+    batch = index.client().get_max_batch_size()
+
+    started = time.perf_counter()
+    for start in range(0, size, batch):
+        stop = min(start + batch, size)
+        collection.add(ids=[str(i) for i in range(start, stop)], embeddings=vectors[start:stop])
+    build_seconds = time.perf_counter() - started
+
+    picks = rng.integers(0, size, queries)
+    probes = vectors[picks] + 0.1 * rng.standard_normal((queries, dim), dtype=np.float32)
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+    truth = exact_top_k(vectors, probes, k)
+
+    index.search_vector(project_id, probes[0].tolist(), k)  # warm up
+    samples, hits = [], 0
+    for probe, expected in zip(probes, truth):
+        started = time.perf_counter()
+        results = index.search_vector(project_id, probe.tolist(), k)
+        samples.append(time.perf_counter() - started)
+        hits += len({int(r['id']) for r in results} & set(expected.tolist()))
+
+    index.drop_project(project_id)
+    return {
+        'build_seconds': build_seconds,
+        'build_vectors_per_sec': size / build_seconds,
+        'latency_ms': summarize_ms(samples),
+        f'recall_at_{k}': hits / (queries * k),
+    }
+
+
+def bench_reindex(args, path: str) -> dict:
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    db = None
+    try:
+        apply_schema(params)
+        fixture = seed(params, users=1, projects_per_user=0, sessions_per_user=0,
+                       messages_per_session=0, bcrypt_rounds=4, random_seed=args.seed)
+        db = DatabaseHandler(**params, pooled=True, max_connections=4)
+        db.connect()
+        project_id = db.create_project('Vector benchmark', 'bench_vectors', fixture.users[0]['user_id'])
+        document = db.register_document(project_id, 'bench.pdf', uuid.uuid4().hex, 0)
+        document_id = document['document_id']
+
+        rng = random.Random(args.seed)
+        chunks = [{'page_number': n // 10 + 1, 'chunk_index': n % 10,
+                   'content': ' '.join(rng.choice(WORDS) for _ in range(200))}
+                  for n in range(args.cache_chunks)]
+        db.start_document(document_id, chunks[-1]['page_number'])
+        for start in range(0, len(chunks), 1000):
+            batch = chunks[start:start + 1000]
+            db.add_document_chunks(document_id, batch, batch[-1]['page_number'])
+        db.finish_document(document_id)
+
+        index = ProjectVectorIndex(db, HashingEmbedder(args.dim), path=path)
+        passes = {}
+        for name in ('cold', 'cached'):
+            before = index.stats()
+            started = time.perf_counter()
+            index.index_document(project_id, document_id)
+            elapsed = time.perf_counter() - started
+            after = index.stats()
+            passes[name] = {
+                'seconds': elapsed,
+                'chunks_per_sec': len(chunks) / elapsed,
+                'embedded': after['embedded'] - before['embedded'],
+                'cache_hits': after['cache_hits'] - before['cache_hits'],
+            }
+        passes['speedup'] = passes['cold']['seconds'] / passes['cached']['seconds']
+        return passes
+    finally:
+        if db:
+            db.disconnect()
+        instance.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--dim', type=int, default=128)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--search-ef', type=int, default=100)
+    parser.add_argument('--cache-chunks', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp(prefix='bench_vectors_')
+    try:
+        results = {'dim': args.dim, 'k': args.k, 'search_ef': args.search_ef, 'scale': {}}
+        for size in args.sizes:
+            results['scale'][size] = bench_scale(path, size, args.dim, args.queries, args.k,
+                                                 args.search_ef, args.seed)
+            print(f"✅ {size} vectors: {json.dumps(results['scale'][size])}", flush=True)
+        if args.cache_chunks:
+            results['reindex'] = bench_reindex(args, path)
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Helpers shared by the benchmark scripts (run them with ``python -m benchmarks.<name>``)."""
+import os
+import statistics
+import sys
+from typing import Dict, Any, List
+
+import psycopg2
+from dotenv import load_dotenv
+
+
+def db_config_from_env() -> Dict[str, Any]:
+    """Connection settings from the same DB_* variables app.py reads"""
+    load_dotenv()
+    return {
+        'host': os.getenv('DB_HOST', '127.0.0.1'),
+        'database': os.getenv('DB_NAME', 'chatting'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', 'placeholder'),
+        'port': int(os.getenv('DB_PORT', 5432)),
+    }
+
+
+def pick_user_id() -> str:
+    """Any active user, for benchmarks that need an owner for sessions/projects"""
+    connection = psycopg2.connect(**db_config_from_env())
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT user_id FROM users WHERE status = 'active' LIMIT 1")
+        row = cursor.fetchone()
+    finally:
+        connection.close()
+    if not row:
+        sys.exit("No active user found; seed the database first")
+    return str(row[0])
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def summarize_ms(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds for samples given in seconds"""
+    return {
+        'mean': statistics.fmean(samples) * 1000 if samples else 0.0,
+        'p50': percentile(samples, 50) * 1000,
+        'p95': percentile(samples, 95) * 1000,
+        'p99': percentile(samples, 99) * 1000,
+    }
@@ -0,0 +1,65 @@
+"""Compare two benchmark runs and flag regressions.
+
+Exits with status 1 when any workload's p95 latency grew, or its
+throughput dropped, by more than the threshold:
+
+    uv run python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+"""
+import argparse
+import json
+import sys
+
+
+def compare(baseline, candidate, threshold: float):
+    rows = []
+    regressions = []
+    for name in sorted(set(baseline['workloads']) | set(candidate['workloads'])):
+        before = baseline['workloads'].get(name)
+        after = candidate['workloads'].get(name)
+        if not before or not after:
+            rows.append((name, None, None, 'missing in one run'))
+            continue
+        p95_change = _change(before['latency_ms']['p95'], after['latency_ms']['p95'])
+        throughput_change = _change(before['throughput_per_sec'], after['throughput_per_sec'])
+        status = 'ok'
+        if p95_change is not None and p95_change > threshold:
+            status = 'REGRESSION (p95)'
+        elif throughput_change is not None and throughput_change < -threshold:
+            status = 'REGRESSION (throughput)'
+        if status != 'ok':
+            regressions.append(name)
+        rows.append((name, p95_change, throughput_change, status))
+    return rows, regressions
+
+
+def _change(before: float, after: float):
+    if not before:
+        return None
+    return (after - before) / before
+
+
+def _pct(value) -> str:
+    return 'n/a' if value is None else f'{value * 100:+.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed relative change (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    print(f"{'workload':<12} {'p95':>10} {'throughput':>12}  status")
+    for name, p95_change, throughput_change, status in rows:
+        print(f"{name:<12} {_pct(p95_change):>10} {_pct(throughput_change):>12}  {status}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Plan regression check: fail if any DatabaseHandler query uses a sequential scan.
+
+Provisions a throwaway Postgres, runs every migration, seeds data and then
+drives the handler's query methods through a cursor that EXPLAINs each
+statement before running it. Sequential scans are disabled while planning,
+so a Seq Scan in a plan means no index can serve the query at all, rather
+than the planner preferring a scan on a small table. Exits non-zero on any
+unexpected Seq Scan.
+
+    uv run python -m benchmarks.plan_check
+    uv run python -m benchmarks.plan_check --provision temp-database --scale medium
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from db.db_manager import DatabaseHandler
+from db.passwords import PasswordHasher
+
+from .common import db_config_from_env
+from .postgres import TempCluster, TempDatabase, apply_schema
+from .seed import SCALES, seed
+
+# (operation, table) pairs where a full scan is intended
+ALLOWED_SEQ_SCANS = {
+    # A handful of rows, read once per cache TTL
+    ('get_available_models', 'ai_models'),
+    # Once per ingestor start-up
+    ('fail_stale_documents', 'project_documents'),
+}
+
+
+def _walk(node: Dict[str, Any]):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
+
+
+class PlanRecorder:
+    """Stands in for QueryMetrics: hands out cursors that EXPLAIN every statement"""
+
+    def __init__(self):
+        self.plans: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.failures: List[str] = []
+        self._factories: Dict[Tuple[str, type], type] = {}
+
+    def cursor_factory(self, operation: str, base: type = RealDictCursor, read_only: bool = False):
+        factory = self._factories.get((operation, base))
+        if factory is None:
+            factory = self._factories[(operation, base)] = self._make_cursor_class(operation, base)
+        return factory
+
+    def _make_cursor_class(self, operation: str, base: type):
+        recorder = self
+
+        class ExplainingCursor(base):
+            def execute(self, query, vars=None):
+                recorder.explain(operation, self.connection, query, vars)
+                return super().execute(query, vars)
+
+        return ExplainingCursor
+
+    def explain(self, operation: str, connection, query, params):
+        sql = query.encode('utf-8') if isinstance(query, str) else query
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SET enable_seqscan = off")
+            cursor.execute(b'EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0][0]['Plan']
+            cursor.execute("RESET enable_seqscan")
+        except Exception as e:
+            self.failures.append(f"{operation}: EXPLAIN failed: {e}")
+            if connection.autocommit:
+                cursor.execute("RESET enable_seqscan")
+            else:
+                connection.rollback()
+            return
+        finally:
+            cursor.close()
+        self.plans[operation].append(plan)
+        for node in _walk(plan):
+            if node['Node Type'] == 'Seq Scan' and (operation, node['Relation Name']) not in ALLOWED_SEQ_SCANS:
+                self.failures.append(f"{operation}: Seq Scan on {node['Relation Name']}")
+
+    def summary(self) -> Dict[str, List[str]]:
+        """Scan nodes (type and relation/index) per operation"""
+        summary = {}
+        for operation, plans in sorted(self.plans.items()):
+            nodes = set()
+            for plan in plans:
+                for node in _walk(plan):
+                    if 'Relation Name' in node:
+                        target = node.get('Index Name') or node['Relation Name']
+                        nodes.add(f"{node['Node Type']} ({target})")
+            summary[operation] = sorted(nodes)
+        return summary
+
+
+def exercise(db: DatabaseHandler, fixture, archive_dir: str):
+    """Call each query method once with seeded ids"""
+    user = fixture.users[0]
+    user_id = user['user_id']
+    session_id = fixture.sessions[user_id][0]
+
+    # Archive the oldest month first, so the message reads below also take the archive path
+    db.ensure_message_partitions()
+    partitions = [p for p in db.get_message_partitions() if p['range_start'] is not None]
+    if partitions:
+        oldest = partitions[0]['partition_name']
+        db.archive_message_partition(oldest, os.path.join(archive_dir, f"{oldest}.jsonl.gz"), inactive_days=30)
+    db.get_message_archives()
+
+    db.authenticate_user(user['email'], fixture.password)
+    db.update_last_login(user_id)
+    db.update_last_logins({u['user_id']: datetime.now(timezone.utc) for u in fixture.users[:10]})
+    db.get_user_by_id(user_id)
+    db.get_user_projects(user_id)
+    project_id = db.create_project('Plan check', 'plan check project', user_id)
+    new_session = db.create_chat_session(user_id, project_id, 'Plan check')
+    db.get_chat_session(session_id)
+
+    db.add_chat_message(session_id, 'user', 'plan check message', {'source': 'plan_check'})
+    db.add_chat_messages(new_session or session_id, [{'role': 'user', 'content': 'batched'}] * 3)
+    page = db.get_chat_messages_page(session_id, limit=10, latest=True)
+    if page['older_cursor']:
+        db.get_chat_messages_page(session_id, limit=10, cursor=page['older_cursor'])
+    db.get_chat_messages(session_id, limit=10)
+    for _ in db.iter_chat_messages(session_id, batch_size=10):
+        pass
+    db.get_user_chat_sessions(user_id)
+    hits = db.search_messages(user_id, 'model training', limit=5)
+    if hits['next_cursor']:
+        db.search_messages(user_id, 'model training', limit=5, cursor=hits['next_cursor'])
+    hits = db.search_projects(user_id, 'plan check', limit=1)
+    if hits['next_cursor']:
+        db.search_projects(user_id, 'plan check', limit=1, cursor=hits['next_cursor'])
+    db.repair_session_counters(session_id)
+    summary = db.get_session_summary(session_id)
+    db.save_session_summary(session_id, 'plan check summary', datetime.now(timezone.utc), str(uuid.uuid4()),
+                            (summary or {}).get('covered_count', 0) + 1, 3, 'plan-check')
+
+    document = db.register_document(project_id, 'plan_check.pdf', 'plan-check-hash', 1024)
+    db.register_document(project_id, 'plan_check.pdf', 'plan-check-hash', 1024)
+    db.fail_stale_documents(3600)
+    if document:
+        document_id = document['document_id']
+        db.start_document(document_id, 2)
+        db.add_document_chunks(document_id, [{'page_number': 1, 'chunk_index': 0, 'content': 'page one'}], 1)
+        db.add_document_chunks(document_id, [], 2)
+        db.finish_document(document_id)
+        db.get_document(document_id)
+        for _ in db.iter_document_chunks(document_id):
+            pass
+    db.store_embeddings('plan-check', {'plan-check-hash': b'\x00' * 16})
+    db.get_cached_embeddings('plan-check', ['plan-check-hash', 'missing-hash'])
+    db.get_project_documents(project_id)
+
+    db.get_available_models()
+    db.log_usage_event(user_id, 'plan_check', {'step': 1}, session_id=session_id)
+    db.log_usage_events([{'user_id': user_id, 'event_type': 'plan_check', 'event_data': None}] * 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    recorder = PlanRecorder()
+    try:
+        apply_schema(params)
+        fixture = seed(params, bcrypt_rounds=4, random_seed=args.seed, **SCALES[args.scale])
+        db = DatabaseHandler(**params, password_hasher=PasswordHasher(rounds=4), metrics=recorder)
+        db.connect()
+        try:
+            with tempfile.TemporaryDirectory() as archive_dir:
+                exercise(db, fixture, archive_dir)
+        finally:
+            db.disconnect()
+    finally:
+        instance.stop()
+
+    print(json.dumps({'plans': recorder.summary(), 'failures': recorder.failures}, indent=2))
+    if recorder.failures:
+        print(f"❌ {len(recorder.failures)} plan regression(s)", file=sys.stderr)
+        sys.exit(1)
+    print("✅ No sequential scans in handler queries", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
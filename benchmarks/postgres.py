@@ -0,0 +1,127 @@
+"""Throwaway Postgres instances for benchmark runs."""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import uuid
+from typing import Dict, Any, Optional
+
+import psycopg2
+
+from db.migrations import Migrator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _pg_bin(name: str) -> str:
+    bin_dir = os.getenv('PG_BIN')
+    if not bin_dir and shutil.which('pg_config'):
+        bin_dir = subprocess.run(['pg_config', '--bindir'], capture_output=True, text=True).stdout.strip()
+    path = os.path.join(bin_dir, name) if bin_dir else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise RuntimeError(f"Cannot find {name}; put the Postgres binaries on PATH or set PG_BIN")
+    return path
+
+
+class TempCluster:
+    """A private Postgres cluster (initdb + pg_ctl) on a free local port.
+
+    Everything lives in a temporary directory that ``stop()`` removes.
+    initdb refuses to run as root, so run benchmarks as a regular user.
+    """
+
+    def __init__(self, port: Optional[int] = None, settings: Dict[str, str] = None):
+        self.port = port or _free_port()
+        self.settings = settings or {}
+        self.data_dir: Optional[str] = None
+
+    def _init_data_dir(self, pgdata: str):
+        subprocess.run([_pg_bin('initdb'), '-D', pgdata, '-U', 'postgres', '--auth=trust',
+                        '-E', 'UTF8', '--no-sync'], check=True, capture_output=True)
+
+    def start(self) -> Dict[str, Any]:
+        self.data_dir = tempfile.mkdtemp(prefix='bench-pg-')
+        pgdata = os.path.join(self.data_dir, 'data')
+        self._init_data_dir(pgdata)
+        options = f"-p {self.port} -k {self.data_dir} -c listen_addresses=127.0.0.1"
+        for key, value in self.settings.items():
+            options += f" -c {key}={value}"
+        subprocess.run([_pg_bin('pg_ctl'), '-D', pgdata, '-o', options, '-w',
+                        '-l', os.path.join(self.data_dir, 'postgres.log'), 'start'],
+                       check=True, capture_output=True)
+        return {'host': '127.0.0.1', 'port': self.port, 'user': 'postgres',
+                'password': '', 'database': 'postgres'}
+
+    def stop(self):
+        if not self.data_dir:
+            return
+        subprocess.run([_pg_bin('pg_ctl'), '-D', os.path.join(self.data_dir, 'data'),
+                        '-m', 'fast', '-w', 'stop'], capture_output=True)
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+        self.data_dir = None
+
+
+class TempReplica(TempCluster):
+    """A streaming hot standby of a running ``TempCluster`` (pg_basebackup -R).
+
+    ``stop()`` on the standby alone simulates a replica outage.
+    """
+
+    def __init__(self, primary: TempCluster, port: Optional[int] = None, settings: Dict[str, str] = None):
+        super().__init__(port=port, settings=settings)
+        self.primary = primary
+
+    def _init_data_dir(self, pgdata: str):
+        subprocess.run([_pg_bin('pg_basebackup'), '-h', '127.0.0.1', '-p', str(self.primary.port),
+                        '-U', 'postgres', '-D', pgdata, '-R', '-X', 'stream', '--no-sync'],
+                       check=True, capture_output=True)
+
+
+class TempDatabase:
+    """A uniquely named database on an existing server, dropped by ``stop()``"""
+
+    def __init__(self, admin_params: Dict[str, Any]):
+        self.admin_params = admin_params
+        self.name = f"bench_{uuid.uuid4().hex[:12]}"
+
+    def _admin(self):
+        connection = psycopg2.connect(**self.admin_params)
+        connection.autocommit = True
+        return connection
+
+    def start(self) -> Dict[str, Any]:
+        connection = self._admin()
+        try:
+            connection.cursor().execute(f'CREATE DATABASE "{self.name}"')
+        finally:
+            connection.close()
+        return {**self.admin_params, 'database': self.name}
+
+    def stop(self):
+        connection = self._admin()
+        try:
+            connection.cursor().execute(f'DROP DATABASE IF EXISTS "{self.name}" WITH (FORCE)')
+        finally:
+            connection.close()
+
+
+def apply_schema(params: Dict[str, Any]):
+    """Create the application schema in a fresh database by running every migration"""
+    Migrator(params).upgrade()
+
+
+def server_version(params: Dict[str, Any]) -> str:
+    connection = psycopg2.connect(**params)
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SHOW server_version")
+        return cursor.fetchone()[0]
+    finally:
+        connection.close()
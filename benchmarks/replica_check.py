@@ -0,0 +1,123 @@
+"""Read-replica routing check against a local primary and streaming standby.
+
+Starts a throwaway primary (initdb), migrates and seeds it, attaches a hot
+standby with pg_basebackup and then checks DatabaseHandler's routing:
+
+* reads go to the replica while it is healthy
+* a user/session reads its own writes straight after writing
+* a replica whose replay is paused past ``--max-lag`` leaves rotation
+* reads keep working (on the primary) after the replica is stopped
+
+Exits non-zero if any check fails.
+
+    uv run python -m benchmarks.replica_check
+"""
+import argparse
+import json
+import sys
+import time
+
+import psycopg2
+
+from db.db_manager import DatabaseHandler
+
+from .postgres import TempCluster, TempReplica, apply_schema
+from .seed import seed
+
+
+def wait_for(condition, timeout: float, interval: float = 0.1) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(interval)
+    return condition()
+
+
+def replica_sql(params, sql: str):
+    connection = psycopg2.connect(**params)
+    connection.autocommit = True
+    try:
+        connection.cursor().execute(sql)
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-lag', type=float, default=1.0)
+    parser.add_argument('--sticky-window', type=float, default=1.0)
+    parser.add_argument('--reads', type=int, default=50)
+    args = parser.parse_args()
+
+    primary = TempCluster()
+    replica = TempReplica(primary)
+    checks = {}
+    db = None
+    try:
+        params = primary.start()
+        apply_schema(params)
+        fixture = seed(params, users=20, projects_per_user=1, sessions_per_user=2,
+                       messages_per_session=20, bcrypt_rounds=4)
+        replica_params = replica.start()
+
+        db = DatabaseHandler(**params, pooled=True, max_connections=4, replicas=[replica_params],
+                             max_replica_lag=args.max_lag, sticky_window=args.sticky_window)
+        db.connect()
+        router = db.replicas
+        user_id = fixture.users[0]['user_id']
+
+        # 1. Healthy replica serves reads
+        before = router.stats()['replica_reads']
+        for _ in range(args.reads):
+            db.get_user_chat_sessions(user_id)
+        checks['reads_routed_to_replica'] = router.stats()['replica_reads'] - before == args.reads
+
+        # 2. Read-your-writes straight after a write
+        session_id = db.create_chat_session(user_id, title='replica check')
+        sessions = db.get_user_chat_sessions(user_id, limit=100)
+        checks['reads_own_session_after_write'] = any(s['session_id'] == session_id for s in sessions)
+        message_id = db.add_chat_message(session_id, 'user', 'replica check')
+        page = db.get_chat_messages_page(session_id, latest=True)
+        checks['reads_own_message_after_write'] = any(m['message_id'] == message_id for m in page['messages'])
+
+        # ... and the replica serves it once the window has passed
+        time.sleep(args.sticky_window)
+        before = router.stats()['replica_reads']
+        checks['replica_catches_up'] = wait_for(
+            lambda: any(s['session_id'] == session_id for s in db.get_user_chat_sessions(user_id, limit=100)),
+            timeout=5.0)
+        checks['replica_serves_after_window'] = router.stats()['replica_reads'] > before
+
+        # 3. Lagging replica leaves rotation
+        replica_sql(replica_params, "SELECT pg_wal_replay_pause()")
+        db.create_chat_session(fixture.users[1]['user_id'], title='lag check')
+        checks['lagging_replica_benched'] = wait_for(
+            lambda: router.stats()['healthy'] == 0, timeout=args.max_lag + 5.0)
+        before = router.stats()['primary_reads']
+        db.get_user_chat_sessions(user_id)
+        checks['lagging_reads_use_primary'] = router.stats()['primary_reads'] > before
+        replica_sql(replica_params, "SELECT pg_wal_replay_resume()")
+        checks['replica_returns'] = wait_for(lambda: router.stats()['healthy'] == 1, timeout=10.0)
+
+        # 4. Replica outage: reads fall back to the primary
+        replica.stop()
+        results = [db.get_user_chat_sessions(user_id) for _ in range(args.reads)]
+        checks['reads_survive_outage'] = all(results)
+        checks['outage_detected'] = router.stats()['healthy'] == 0
+        stats = router.stats()
+    finally:
+        if db:
+            db.disconnect()
+        replica.stop()
+        primary.stop()
+
+    print(json.dumps({'checks': checks, 'router': stats}, indent=2))
+    if not all(checks.values()):
+        print(f"❌ Failed: {', '.join(name for name, ok in checks.items() if not ok)}", file=sys.stderr)
+        sys.exit(1)
+    print("✅ Replica routing checks passed", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""Reproducible mixed-load benchmark for DatabaseHandler and the API.
+
+Provisions a throwaway Postgres (a private initdb cluster, or a temporary
+database on the server from DB_*), applies the schema, seeds data at the
+chosen scale and drives a weighted mix of workloads (login storm, chat
+append, history read, sidebar listing) at a fixed concurrency. Prints (and
+optionally writes) one JSON document with per-workload p50/p95/p99 latency
+and throughput, plus startup timing (import-to-ready for the API, pool
+warm-up for the handler); compare two runs with ``python -m benchmarks.compare``.
+
+    uv run python -m benchmarks.run --scale small --concurrency 16 --duration 30 --output run.json
+    uv run python -m benchmarks.run --provision temp-database --target http --mix login=1,history=5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from db.db_manager import DatabaseHandler
+from db.passwords import PasswordHasher
+
+from .common import db_config_from_env, summarize_ms
+from .postgres import ROOT, TempCluster, TempDatabase, apply_schema, server_version
+from .seed import SCALES, seed
+from .workloads import WORKLOADS, DEFAULT_MIX, parse_mix
+
+
+def git_revision() -> str:
+    result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True)
+    dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                           cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return result.stdout.strip() + ('-dirty' if dirty else '') if result.returncode == 0 else 'unknown'
+
+
+def drive(target_factory, call_kind: str, fixture, weights, concurrency: int, duration: float, random_seed: int):
+    """Run the mix on ``concurrency`` threads; returns per-workload samples and errors"""
+    names = list(weights)
+    cumulative = [sum(list(weights.values())[:i + 1]) for i in range(len(names))]
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def worker(n: int):
+        rng = random.Random(random_seed + n)
+        target = target_factory()
+        local = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        start_barrier.wait()
+        try:
+            while time.monotonic() < deadline[0]:
+                name = rng.choices(names, cum_weights=cumulative)[0]
+                started = time.perf_counter()
+                try:
+                    ok = WORKLOADS[name][call_kind](target, fixture, rng)
+                except Exception:
+                    ok = False
+                elapsed = time.perf_counter() - started
+                if ok:
+                    local[name].append(elapsed)
+                else:
+                    local_errors[name] += 1
+        finally:
+            if hasattr(target, 'close'):
+                target.close()
+        with lock:
+            for name in names:
+                samples[name].extend(local[name])
+                errors[name] += local_errors[name]
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.monotonic() + duration
+    started = time.monotonic()
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+    return samples, errors, time.monotonic() - started
+
+
+def summarize(samples, errors, elapsed: float):
+    workloads = {}
+    for name, latencies in samples.items():
+        workloads[name] = {
+            'requests': len(latencies),
+            'errors': errors[name],
+            'throughput_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+            'latency_ms': summarize_ms(latencies),
+        }
+    everything = [latency for latencies in samples.values() for latency in latencies]
+    overall = {
+        'requests': len(everything),
+        'errors': sum(errors.values()),
+        'throughput_per_sec': len(everything) / elapsed if elapsed else 0.0,
+        'latency_ms': summarize_ms(everything),
+    }
+    return workloads, overall
+
+
+def start_api(app: str, params, port: int, env: dict = None):
+    """Start uvicorn and wait for readiness; returns (process, startup timings).
+
+    All load comes from one client IP, so admission control is off unless
+    ``env`` turns it on, and the server exits on SIGTERM without a drain delay.
+    """
+    env = {'ADMISSION_ENABLED': 'false', 'DRAIN_DELAY': '0', **os.environ,
+           'DB_HOST': str(params['host']), 'DB_PORT': str(params['port']),
+           'DB_NAME': params['database'], 'DB_USER': params['user'],
+           'DB_PASSWORD': params.get('password') or '', **(env or {})}
+    started = time.monotonic()
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', app, '--port', str(port),
+                               '--log-level', 'warning', '--no-access-log'], cwd=ROOT, env=env)
+    deadline = started + 30
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(f'http://127.0.0.1:{port}/health/ready')
+            if response.status_code == 200:
+                return server, {
+                    'spawn_to_ready_s': time.monotonic() - started,
+                    'import_to_ready_ms': response.json().get('import_to_ready_ms'),
+                }
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError(f"{app} did not become ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provision', choices=['temp-cluster', 'temp-database'], default='temp-cluster')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--projects-per-user', type=int)
+    parser.add_argument('--sessions-per-user', type=int)
+    parser.add_argument('--messages-per-session', type=int)
+    parser.add_argument('--target', choices=['handler', 'http'], default='handler')
+    parser.add_argument('--app', default='db.main:app', help='ASGI app for --target http')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--warmup', type=float, default=5.0)
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='also write the JSON result to this file')
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    volumes = dict(SCALES[args.scale])
+    for key in volumes:
+        if getattr(args, key) is not None:
+            volumes[key] = getattr(args, key)
+
+    instance = TempCluster() if args.provision == 'temp-cluster' else TempDatabase(db_config_from_env())
+    params = instance.start()
+    server = None
+    db = None
+    startup = {}
+    try:
+        apply_schema(params)
+        seed_started = time.monotonic()
+        fixture = seed(params, bcrypt_rounds=args.bcrypt_rounds, random_seed=args.seed, **volumes)
+        seed_seconds = time.monotonic() - seed_started
+
+        if args.target == 'handler':
+            db = DatabaseHandler(**params, pooled=True, min_connections=args.concurrency,
+                                 max_connections=args.concurrency,
+                                 password_hasher=PasswordHasher(rounds=args.bcrypt_rounds,
+                                                                max_workers=os.cpu_count() or 2,
+                                                                max_queue=args.concurrency))
+            connect_started = time.monotonic()
+            db.connect()
+            startup = {'connect_s': time.monotonic() - connect_started}
+            target_factory = lambda: db
+        else:
+            server, startup = start_api(args.app, params, args.port)
+            target_factory = lambda: httpx.Client(base_url=f'http://127.0.0.1:{args.port}', timeout=30.0)
+
+        if args.warmup:
+            drive(target_factory, args.target, fixture, weights, args.concurrency, args.warmup, args.seed)
+        samples, errors, elapsed = drive(target_factory, args.target, fixture, weights,
+                                         args.concurrency, args.duration, args.seed + 1000)
+        workloads, overall = summarize(samples, errors, elapsed)
+
+        result = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'postgres': server_version(params),
+                'target': args.target,
+                'app': args.app if args.target == 'http' else None,
+                'provision': args.provision,
+                'concurrency': args.concurrency,
+                'duration_s': elapsed,
+                'mix': weights,
+                'bcrypt_rounds': args.bcrypt_rounds,
+                'seed': args.seed,
+                'data': fixture.counts,
+                'seed_seconds': seed_seconds,
+                'startup': startup,
+            },
+            'workloads': workloads,
+            'overall': overall,
+        }
+    finally:
+        if db:
+            db.disconnect()
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        instance.stop()
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Deterministic seed data at configurable volumes."""
+import json
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List
+
+import bcrypt
+import psycopg2
+from psycopg2.extras import execute_values
+
+PASSWORD = 'benchmark-password'
+
+SCALES = {
+    'small': {'users': 200, 'projects_per_user': 2, 'sessions_per_user': 5, 'messages_per_session': 40},
+    'medium': {'users': 2000, 'projects_per_user': 3, 'sessions_per_user': 10, 'messages_per_session': 100},
+    'large': {'users': 10000, 'projects_per_user': 3, 'sessions_per_user': 20, 'messages_per_session': 200},
+}
+
+MODELS = [
+    ('llama3.1', '8b', 'General chat model', 'ollama', 'chat'),
+    ('qwen2.5', '14b', 'Multilingual chat model', 'ollama', 'chat'),
+    ('nomic-embed-text', 'v1.5', 'Text embeddings', 'ollama', 'embedding'),
+    ('gemini-1.5-flash', '002', 'Hosted chat model', 'google', 'chat'),
+]
+
+WORDS = ('research paper method result dataset model training evaluation baseline citation '
+         'hypothesis experiment analysis figure table appendix related work abstract limitation '
+         'transformer attention retrieval embedding corpus benchmark ablation variance').split()
+
+
+@dataclass
+class Fixture:
+    """What workloads need to know about the seeded data"""
+    password: str
+    users: List[Dict[str, str]] = field(default_factory=list)     # user_id, email
+    sessions: Dict[str, List[str]] = field(default_factory=dict)  # user_id -> session_ids
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def _text(rng: random.Random, low: int, high: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def seed(params: Dict[str, Any], users: int, projects_per_user: int, sessions_per_user: int,
+         messages_per_session: int, bcrypt_rounds: int = 12, random_seed: int = 42,
+         page_size: int = 2000, history_days: int = 90) -> Fixture:
+    rng = random.Random(random_seed)
+    # Every user shares one password, so one hash serves them all
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(bcrypt_rounds)).decode('utf-8')
+    fixture = Fixture(password=PASSWORD)
+    now = datetime.now(timezone.utc)
+
+    connection = psycopg2.connect(**params)
+    connection.autocommit = False
+    try:
+        cursor = connection.cursor()
+        execute_values(cursor, """
+            INSERT INTO ai_models (name, version, description, provider, model_type) VALUES %s
+        """, MODELS)
+
+        user_rows, project_rows, member_rows, session_rows = [], [], [], []
+        for n in range(users):
+            user_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            email = f'user{n}@bench.example.com'
+            user_rows.append((user_id, email, password_hash, f'First{n}', f'Last{n}', 'scholar',
+                              'active', True, now - timedelta(days=rng.randint(30, 720))))
+            fixture.users.append({'user_id': user_id, 'email': email})
+
+            projects = []
+            for p in range(projects_per_user):
+                project_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+                projects.append(project_id)
+                project_rows.append((project_id, f'Project {n}.{p}', _text(rng, 5, 20), user_id,
+                                     rng.random() < 0.3, now - timedelta(days=rng.randint(1, 365))))
+                member_rows.append((project_id, user_id, 'owner'))
+
+            fixture.sessions[user_id] = []
+            for s in range(sessions_per_user):
+                session_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+                fixture.sessions[user_id].append(session_id)
+                started = now - timedelta(days=rng.randint(0, history_days), seconds=rng.randint(0, 86400))
+                session_rows.append((session_id, user_id, rng.choice(projects) if projects and rng.random() < 0.7 else None,
+                                     f'Session {s}: {_text(rng, 2, 6)}', rng.randint(1, len(MODELS)),
+                                     'active' if rng.random() < 0.9 else 'archived', started, started))
+
+        execute_values(cursor, """
+            INSERT INTO users (user_id, email, password_hash, first_name, last_name, role, status,
+                               email_verified, created_at) VALUES %s
+        """, user_rows, page_size=page_size)
+        execute_values(cursor, """
+            INSERT INTO projects (project_id, name, description, created_by_user_id, is_private, created_at)
+            VALUES %s
+        """, project_rows, page_size=page_size)
+        execute_values(cursor, "INSERT INTO project_members (project_id, user_id, role) VALUES %s",
+                       member_rows, page_size=page_size)
+        execute_values(cursor, """
+            INSERT INTO chat_sessions (session_id, user_id, project_id, title, model_id, status,
+                                       created_at, updated_at) VALUES %s
+        """, session_rows, page_size=page_size)
+
+        # chat_messages is partitioned by month; the migration only creates months from now on
+        cursor.execute("""
+            SELECT create_chat_messages_partition(month)
+            FROM generate_series(date_trunc('month', %s AT TIME ZONE 'UTC'),
+                                 date_trunc('month', NOW() AT TIME ZONE 'UTC'), INTERVAL '1 month') AS month
+        """, (min((row[6] for row in session_rows), default=now),))
+
+        message_count = 0
+        message_rows = []
+        for session_id, _, _, _, _, _, started, _ in session_rows:
+            at = started
+            for m in range(messages_per_session):
+                at += timedelta(seconds=rng.randint(5, 600))
+                role = 'user' if m % 2 == 0 else 'assistant'
+                content = _text(rng, 5, 40) if role == 'user' else _text(rng, 40, 300)
+                message_rows.append((str(uuid.UUID(int=rng.getrandbits(128), version=4)), session_id, role,
+                                     content, json.dumps({'tokens': len(content.split())}), at))
+                if len(message_rows) >= page_size * 5:
+                    execute_values(cursor, """
+                        INSERT INTO chat_messages (message_id, session_id, role, content, metadata, created_at)
+                        VALUES %s
+                    """, message_rows, page_size=page_size)
+                    message_count += len(message_rows)
+                    message_rows = []
+        if message_rows:
+            execute_values(cursor, """
+                INSERT INTO chat_messages (message_id, session_id, role, content, metadata, created_at)
+                VALUES %s
+            """, message_rows, page_size=page_size)
+            message_count += len(message_rows)
+
+        # Counters normally maintained by add_chat_message
+        cursor.execute("""
+            UPDATE chat_sessions cs
+            SET message_count = totals.message_count,
+                last_message_at = totals.last_message_at,
+                updated_at = totals.last_message_at
+            FROM (
+                SELECT session_id, COUNT(*) AS message_count, MAX(created_at) AS last_message_at
+                FROM chat_messages
+                GROUP BY session_id
+            ) totals
+            WHERE cs.session_id = totals.session_id
+        """)
+        connection.commit()
+
+        connection.autocommit = True
+        cursor.execute("VACUUM ANALYZE")
+    finally:
+        connection.close()
+
+    fixture.counts = {
+        'users': len(user_rows),
+        'projects': len(project_rows),
+        'chat_sessions': len(session_rows),
+        'chat_messages': message_count,
+    }
+    return fixture
@@ -0,0 +1,90 @@
+"""Workload definitions for the mixed-load benchmark.
+
+Each workload has a handler variant (calls DatabaseHandler in-process)
+and an HTTP variant (calls the db/main.py API). Both return True on
+success.
+"""
+import random
+from typing import Callable, Dict
+
+from .seed import Fixture
+
+
+def _user(fixture: Fixture, rng: random.Random) -> Dict[str, str]:
+    return rng.choice(fixture.users)
+
+
+def _session(fixture: Fixture, rng: random.Random) -> str:
+    return rng.choice(fixture.sessions[_user(fixture, rng)['user_id']])
+
+
+# =========================
+# HANDLER WORKLOADS
+# =========================
+
+def login_handler(db, fixture: Fixture, rng: random.Random) -> bool:
+    return db.authenticate_user(_user(fixture, rng)['email'], fixture.password) is not None
+
+
+def append_handler(db, fixture: Fixture, rng: random.Random) -> bool:
+    return db.add_chat_message(_session(fixture, rng), 'user', 'benchmark append ' * 8,
+                               {'source': 'benchmark'}) is not None
+
+
+def history_handler(db, fixture: Fixture, rng: random.Random) -> bool:
+    db.get_chat_messages_page(_session(fixture, rng), limit=50, latest=True)
+    return True
+
+
+def sidebar_handler(db, fixture: Fixture, rng: random.Random) -> bool:
+    db.get_user_chat_sessions(_user(fixture, rng)['user_id'])
+    return True
+
+
+# =========================
+# HTTP WORKLOADS
+# =========================
+
+def login_http(client, fixture: Fixture, rng: random.Random) -> bool:
+    response = client.post('/users/authenticate',
+                           json={'email': _user(fixture, rng)['email'], 'password': fixture.password})
+    return response.status_code == 200
+
+
+def append_http(client, fixture: Fixture, rng: random.Random) -> bool:
+    response = client.post('/chat/messages/add', json={
+        'session_id': _session(fixture, rng), 'role': 'user',
+        'content': 'benchmark append ' * 8, 'metadata': {'source': 'benchmark'}})
+    return response.status_code == 200
+
+
+def history_http(client, fixture: Fixture, rng: random.Random) -> bool:
+    response = client.get(f'/chat/{_session(fixture, rng)}/messages', params={'limit': 50, 'latest': 'true'})
+    return response.status_code == 200
+
+
+def sidebar_http(client, fixture: Fixture, rng: random.Random) -> bool:
+    response = client.get(f"/users/{_user(fixture, rng)['user_id']}/chat-sessions")
+    return response.status_code == 200
+
+
+WORKLOADS: Dict[str, Dict[str, Callable]] = {
+    'login': {'handler': login_handler, 'http': login_http},
+    'append': {'handler': append_handler, 'http': append_http},
+    'history': {'handler': history_handler, 'http': history_http},
+    'sidebar': {'handler': sidebar_handler, 'http': sidebar_http},
+}
+
+DEFAULT_MIX = 'login=1,append=4,history=4,sidebar=3'
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """'login=1,append=4' -> {'login': 1.0, 'append': 4.0}"""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in WORKLOADS:
+            raise ValueError(f"Unknown workload {name!r}; choose from {', '.join(WORKLOADS)}")
+        weights[name] = float(weight or 1)
+    return weights
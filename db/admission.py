@@ -0,0 +1,375 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+import anyio
+from starlette.responses import JSONResponse
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .db_manager import DatabaseHandler
+
+ADMITTED = 'admitted'
+RATE_LIMITED = 'rate_limited'
+SHED = 'shed'
+QUEUE_TIMEOUT = 'queue_timeout'
+
+
+@dataclass
+class RouteLimit:
+    """Admission rule for requests to ``method`` + ``path`` (a route template such as ``/users/{user_id}``).
+
+    ``max_concurrent`` caps requests in progress on the route in this
+    process; up to ``max_queue`` more wait at most ``queue_timeout``
+    seconds for a slot, the rest are shed with 503 straight away. ``rate``
+    (requests/sec) and ``burst`` set a token bucket per ``key``, which is
+    ``'ip'`` or the name of a path parameter (falling back to the IP when
+    the path has none); requests over it get 429.
+    """
+    method: str
+    path: str
+    max_concurrent: Optional[int] = None
+    max_queue: int = 0
+    queue_timeout: float = 0.0
+    rate: Optional[float] = None
+    burst: Optional[float] = None
+    key: str = 'ip'
+
+
+class _Gate:
+    """Concurrency cap with a bounded, time-limited wait"""
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> Optional[str]:
+        """None once a slot is held, else SHED or QUEUE_TIMEOUT"""
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                return SHED
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                return QUEUE_TIMEOUT
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        return None
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+
+class _Route:
+    def __init__(self, limit: RouteLimit):
+        self.limit = limit
+        self.name = f"{limit.method} {limit.path}"
+        self.regex, _, _ = compile_path(limit.path)
+        self.burst = limit.burst or max(1.0, limit.rate or 0)
+        self.gate = _Gate(limit.max_concurrent, limit.max_queue, limit.queue_timeout) \
+            if limit.max_concurrent else None
+
+
+# =========================
+# RATE LIMIT STATE
+# =========================
+
+class BucketStore:
+    """Token buckets by key. ``take`` removes one token and returns 0.0, or
+    returns the seconds until a token is available without taking one."""
+    name = 'store'
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemoryBucketStore(BucketStore):
+    """Buckets in this process; each worker limits on its own.
+
+    Only used on the event loop, so no lock. The least recently used
+    buckets beyond ``max_keys`` are dropped; a dropped bucket comes back
+    full, which an idle key would have refilled to anyway.
+    """
+    name = 'memory'
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._evicted = 0
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self._evicted += 1
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {'keys': len(self._buckets), 'evicted': self._evicted}
+
+
+class PostgresBucketStore(BucketStore):
+    """Buckets in Postgres, shared by every worker and host using the database.
+
+    Checks run through a handler of their own: at most ``max_connections``
+    connections, each with a ``statement_timeout`` of ``statement_timeout``
+    seconds, and an equal number of threads. The routes' pool and threadpool
+    are never used, so a saturated API cannot stall its own admission checks.
+    A check never waits either. While every connection is busy, or for
+    ``retry_interval`` seconds after a failure, the check falls back to a
+    per-process ``MemoryBucketStore``, so limiting degrades to per worker
+    instead of failing open.
+
+    A denied key is refused locally until its retry time, so a client
+    hammering the API costs one round trip per refill rather than one per
+    request. Buckets idle for ``idle_seconds`` (longer than any bucket takes
+    to refill) are pruned every ``prune_interval`` seconds.
+    """
+    name = 'postgres'
+
+    def __init__(self, db, max_connections: int = 4, statement_timeout: float = 0.2,
+                 checkout_timeout: float = 0.05, connect_timeout: int = 2, retry_interval: float = 1.0, idle_seconds: float = 3600.0,
+                 prune_interval: float = 60.0, max_denied_keys: int = 100000):
+        params = {key: db.connection_params[key] for key in ('host', 'database', 'user', 'password', 'port')}
+        self.db = DatabaseHandler(
+            **params, pooled=True, min_connections=0, max_connections=max_connections,
+            pool_timeout=checkout_timeout, prepared_statements=True, password_hasher=db.password_hasher,
+            connect_options={'connect_timeout': connect_timeout,
+                             'options': f'-c statement_timeout={int(statement_timeout * 1000)}',
+                             'application_name': 'rate_limits'})
+        self.max_connections = max_connections
+        self.retry_interval = retry_interval
+        self.idle_seconds = idle_seconds
+        self.prune_interval = prune_interval
+        self.max_denied_keys = max_denied_keys
+        self.fallback = MemoryBucketStore()
+        self._limiter: Optional[anyio.CapacityLimiter] = None
+        self._down_until = 0.0
+        self._denied_until: Dict[str, float] = {}
+        self._pruned_at = time.monotonic()
+        self._prune_task: Optional[asyncio.Task] = None
+        self._stats = {'checks': 0, 'local_denials': 0, 'busy_fallbacks': 0, 'down_fallbacks': 0,
+                       'errors': 0, 'pruned': 0}
+
+    def start(self):
+        self.db.connect()
+
+    def close(self):
+        self.db.disconnect()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        denied_until = self._denied_until.get(key)
+        if denied_until is not None:
+            if denied_until > now:
+                self._stats['local_denials'] += 1
+                return denied_until - now
+            del self._denied_until[key]
+
+        if self._limiter is None:
+            # Created lazily: it must belong to the running event loop
+            self._limiter = anyio.CapacityLimiter(self.max_connections)
+        if now < self._down_until:
+            self._stats['down_fallbacks'] += 1
+            return await self.fallback.take(key, rate, burst)
+        if self._limiter.available_tokens < 1:
+            self._stats['busy_fallbacks'] += 1
+            return await self.fallback.take(key, rate, burst)
+
+        self._stats['checks'] += 1
+        wait = await anyio.to_thread.run_sync(self.db.take_rate_limit_token, key, rate, burst,
+                                              limiter=self._limiter)
+        if wait is None:
+            self._stats['errors'] += 1
+            self._down_until = time.monotonic() + self.retry_interval
+            return await self.fallback.take(key, rate, burst)
+        if wait > 0 and len(self._denied_until) < self.max_denied_keys:
+            self._denied_until[key] = time.monotonic() + wait
+        self._prune(now)
+        return wait
+
+    def _prune(self, now: float):
+        if now - self._pruned_at < self.prune_interval or (self._prune_task and not self._prune_task.done()):
+            return
+        self._pruned_at = now
+        self._denied_until = {key: until for key, until in self._denied_until.items() if until > now}
+        self._prune_task = asyncio.get_running_loop().create_task(self._prune_buckets())
+
+    async def _prune_buckets(self):
+        pruned = await anyio.to_thread.run_sync(self.db.prune_rate_limit_buckets, self.idle_seconds,
+                                                limiter=self._limiter)
+        self._stats['pruned'] += pruned or 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, 'denied_keys': len(self._denied_until),
+                'fallback_keys': len(self.fallback._buckets)}
+
+
+def bucket_store_from_env(value: str, db=None) -> BucketStore:
+    """'memory' / 'postgres' -> a BucketStore"""
+    if (value or 'memory') == 'memory':
+        return MemoryBucketStore()
+    if value == 'postgres':
+        return PostgresBucketStore(db)
+    raise ValueError(f"Unknown rate limit store: {value}")
+
+
+# =========================
+# ADMISSION
+# =========================
+
+class AdmissionController:
+    """Decides, before a request reaches its route, whether to run it now, queue it briefly or refuse it.
+
+    Rate limits are checked first, so a client over its budget never takes
+    a concurrency slot. Concurrency caps are per process: they protect this
+    worker's threadpool and connection pool, and only the token buckets go
+    through the (possibly shared) ``store``. Requests to routes without a
+    rule pass straight through.
+
+    ``trust_forwarded`` takes the client IP from X-Forwarded-For, for
+    deployments behind ``forwarded_hops`` proxies that each append the
+    address they received from. Earlier entries are whatever the client
+    sent, so the IP is the entry ``forwarded_hops`` from the right.
+    """
+
+    def __init__(self, limits: List[RouteLimit], store: BucketStore = None, registry=None,
+                 trust_forwarded: bool = False, forwarded_hops: int = 1, shed_retry_after: int = 1):
+        if forwarded_hops < 1:
+            raise ValueError("forwarded_hops must be at least 1")
+        self.store = store or MemoryBucketStore()
+        self.trust_forwarded = trust_forwarded
+        self.forwarded_hops = forwarded_hops
+        self.shed_retry_after = shed_retry_after
+        self.routes = [_Route(limit) for limit in limits]
+        self._by_method: Dict[str, List[_Route]] = {}
+        for route in self.routes:
+            self._by_method.setdefault(route.limit.method.upper(), []).append(route)
+        self._stats = {ADMITTED: 0, RATE_LIMITED: 0, SHED: 0, QUEUE_TIMEOUT: 0}
+        self._decisions = None
+        if registry is not None:
+            self._decisions = registry.counter('admission_decisions_total',
+                                               'Admission decisions by route and outcome', ('route', 'decision'))
+
+    def match(self, scope: Scope) -> Optional[Tuple[_Route, Dict[str, str]]]:
+        for route in self._by_method.get(scope['method'], ()):
+            match = route.regex.match(scope['path'])
+            if match:
+                return route, match.groupdict()
+        return None
+
+    def client_ip(self, scope: Scope) -> str:
+        if self.trust_forwarded:
+            # Repeated headers are one list, in order (RFC 7230 3.2.2)
+            entries = [entry.strip() for name, value in scope.get('headers', []) if name == b'x-forwarded-for'
+                       for entry in value.decode('latin-1').split(',')]
+            entries = [entry for entry in entries if entry]
+            if entries:
+                return entries[-min(self.forwarded_hops, len(entries))]
+        client = scope.get('client')
+        return client[0] if client else 'unknown'
+
+    async def admit(self, route: _Route, params: Dict[str, str], scope: Scope) -> Tuple[str, float]:
+        """(decision, retry_after seconds); a route slot is held when the decision is ADMITTED"""
+        limit = route.limit
+        if limit.rate:
+            subject = params.get(limit.key) if limit.key != 'ip' else None
+            key = f"{route.name}|{limit.key}={subject}" if subject else f"{route.name}|ip={self.client_ip(scope)}"
+            wait = await self.store.take(key, limit.rate, route.burst)
+            if wait > 0:
+                return self._record(route, RATE_LIMITED), wait
+        if route.gate is not None:
+            refused = await route.gate.acquire()
+            if refused:
+                return self._record(route, refused), self.shed_retry_after
+        return self._record(route, ADMITTED), 0.0
+
+    def start(self):
+        self.store.start()
+
+    def close(self):
+        self.store.close()
+
+    def release(self, route: _Route):
+        if route.gate is not None:
+            route.gate.release()
+
+    def _record(self, route: _Route, decision: str) -> str:
+        self._stats[decision] += 1
+        if self._decisions is not None:
+            self._decisions.inc(route.name, decision)
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        # Only touched on the event loop, so no lock
+        stats = dict(self._stats)
+        stats['in_flight'] = sum(route.gate.active for route in self.routes if route.gate)
+        stats['queued'] = sum(route.gate.waiting for route in self.routes if route.gate)
+        stats.update({f'store_{key}': value for key, value in self.store.stats().items()})
+        return stats
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an ``AdmissionController``: 429 over the rate limit, 503 when shed.
+
+    Both responses carry ``Retry-After``. Add it last so it runs first and
+    refused requests cost as little as possible.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        matched = self.controller.match(scope)
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+
+        route, params = matched
+        decision, retry_after = await self.controller.admit(route, params, scope)
+        if decision != ADMITTED:
+            status_code, detail = (429, "Too many requests") if decision == RATE_LIMITED \
+                else (503, "Server busy, please retry")
+            response = JSONResponse(status_code=status_code, content={"detail": detail},
+                                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route)
@@ -0,0 +1,183 @@
+import ipaddress
+import queue
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+DROP = 'drop'
+BLOCK = 'block'
+
+
+class AnalyticsWriter:
+    """Buffers usage events in memory and writes them in batches.
+
+    ``record()`` only enqueues; a background thread flushes through
+    ``DatabaseHandler.log_usage_events`` once ``batch_size`` events are
+    waiting or ``flush_interval`` seconds have passed. When the queue is
+    full the ``policy`` decides: ``drop`` discards the event immediately,
+    ``block`` waits up to ``block_timeout`` seconds before dropping it.
+    """
+
+    def __init__(self, db, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, policy: str = DROP, block_timeout: float = 0.05):
+        if policy not in (DROP, BLOCK):
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._closing = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'flushed': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._closing.clear()
+        self._thread = threading.Thread(target=self._run, name='analytics-writer', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop accepting events, flush everything queued and stop the thread"""
+        self._closing.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def record(self, user_id: str, event_type: str, event_data: Dict = None,
+               session_id: str = None, project_id: str = None,
+               ip_address: str = None, user_agent: str = None) -> bool:
+        """Queue one event (same fields as log_usage_event); False if dropped"""
+        event = {
+            'user_id': user_id,
+            'event_type': event_type,
+            'event_data': event_data,
+            'session_id': session_id,
+            'project_id': project_id,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+        }
+        if self._closing.is_set():
+            self._count('dropped')
+            return False
+        try:
+            if self.policy == BLOCK:
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('enqueued')
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Enqueued/flushed/dropped counters and current queue depth"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        stats['policy'] = self.policy
+        return stats
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._closing.is_set():
+                # Shutting down: take whatever is left without waiting
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        if self.db.log_usage_events(batch):
+            self._count('flushed', len(batch))
+            self._count('batches')
+        else:
+            self._count('failed', len(batch))
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+            elif self._closing.is_set():
+                return
+
+
+def _uuid_or_none(value) -> Optional[str]:
+    try:
+        return str(uuid.UUID(value)) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _ip_or_none(value) -> Optional[str]:
+    try:
+        return str(ipaddress.ip_address(value)) if value else None
+    except ValueError:
+        return None
+
+
+class AnalyticsMiddleware:
+    """ASGI middleware that records one ``http_request`` event per request"""
+
+    def __init__(self, app: ASGIApp, writer: AnalyticsWriter):
+        self.app = app
+        self.writer = writer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            path_params = scope.get('path_params', {})
+            headers = dict(scope.get('headers', []))
+            client = scope.get('client')
+            self.writer.record(
+                # Malformed ids/addresses would make the whole batch insert fail
+                user_id=_uuid_or_none(path_params.get('user_id')),
+                event_type='http_request',
+                event_data={
+                    'method': scope['method'],
+                    'route': getattr(route, 'path', scope['path']),
+                    'status': status_code,
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                },
+                session_id=_uuid_or_none(path_params.get('session_id')),
+                ip_address=_ip_or_none(client[0]) if client else None,
+                user_agent=headers.get(b'user-agent', b'').decode('latin-1') or None,
+            )
@@ -0,0 +1,368 @@
+"""Cold archive for old chat_messages partitions.
+
+Each archived month is one gzip JSONL file. Every line is a message
+object: message_id, session_id, role, content, metadata and created_at.
+Each session's rows are written as a separate gzip member. The
+chat_message_archive_segments table records where each member starts,
+so one session's history is read back with a single seek and a
+decompress of just its rows. The members concatenate into one valid
+gzip file, so ``zcat`` still reads the whole month.
+
+Partitions are archived oldest first. A pass stops at the first partition
+that still holds messages of a recently active session. So for every
+session, archived messages are older than all of its messages still in
+chat_messages, and reads only need the archive past the oldest hot row.
+
+    uv run python -m db.archive status
+    uv run python -m db.archive archive --directory ./data/message_archive --retain-months 6
+"""
+import argparse
+import functools
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+import orjson
+from dotenv import load_dotenv
+
+from .lean import MessageRecord
+from .pagination import NEWER
+
+PARTITION_NAME = re.compile(r'^chat_messages_(\d{4})_(\d{2})$')
+
+# CSV with a delimiter and quote character that never occur unescaped in
+# JSON text, so COPY hands over "session_id<0x02>json" lines verbatim
+ARCHIVE_COPY_OPTIONS = "FORMAT csv, DELIMITER E'\\x02', QUOTE E'\\x01'"
+
+
+class ArchiveError(RuntimeError):
+    """Raised when a partition cannot be archived safely"""
+
+
+def partition_range(partition_name: str) -> Tuple[datetime, datetime]:
+    """[start, end) of a chat_messages_YYYY_MM partition; ValueError for any other name"""
+    match = PARTITION_NAME.match(partition_name)
+    if not match:
+        raise ValueError(f"Not a monthly chat_messages partition: {partition_name!r}")
+    year, month = int(match.group(1)), int(match.group(2))
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def _months_before(month_start: datetime, months: int) -> datetime:
+    index = month_start.year * 12 + month_start.month - 1 - months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+# =========================
+# ARCHIVE FILES
+# =========================
+
+class SegmentWriter:
+    """File-like COPY TO target that compresses each session's rows as its own gzip member.
+
+    Rows must arrive grouped by session as ``session_id<0x02>json`` lines
+    (see ARCHIVE_COPY_OPTIONS). ``segments`` lists each member's session,
+    byte range, message count and first/last created_at once ``close`` has
+    been called.
+    """
+
+    def __init__(self, out, level: int = 6):
+        self.out = out
+        self.level = level
+        self.segments: List[Dict[str, Any]] = []
+        self.message_count = 0
+        self.size_bytes = 0
+        self._pending = b''
+        self._session: Optional[bytes] = None
+        self._compressor = None
+        self._start = 0
+        self._count = 0
+        self._first = self._last = None
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        lines = (self._pending + data).split(b'\n')
+        self._pending = lines.pop()
+        for line in lines:
+            self._row(line)
+        return len(data)
+
+    def _row(self, line: bytes):
+        session_id, _, row = line.partition(b'\x02')
+        if session_id != self._session:
+            self._finish_segment()
+            self._session = session_id
+            # wbits=31: gzip container, so every member is a standalone .gz
+            self._compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+            self._start = self.size_bytes
+            self._count = 0
+            self._first = row
+        self._last = row
+        self._count += 1
+        self._emit(self._compressor.compress(row + b'\n'))
+
+    def _emit(self, data: bytes):
+        if data:
+            self.out.write(data)
+            self.size_bytes += len(data)
+
+    def _finish_segment(self):
+        if self._session is None:
+            return
+        self._emit(self._compressor.flush())
+        self.segments.append({
+            'session_id': self._session.decode('ascii'),
+            'byte_offset': self._start,
+            'byte_length': self.size_bytes - self._start,
+            'message_count': self._count,
+            'first_created_at': datetime.fromisoformat(json.loads(self._first)['created_at']),
+            'last_created_at': datetime.fromisoformat(json.loads(self._last)['created_at']),
+        })
+        self.message_count += self._count
+        self._session = None
+
+    def close(self):
+        """Finish the last member; call once COPY has returned"""
+        if self._pending:
+            self._row(self._pending)
+            self._pending = b''
+        self._finish_segment()
+
+
+@functools.lru_cache(maxsize=32)
+def read_segment(path: str, byte_offset: int, byte_length: int) -> Tuple[Dict[str, Any], ...]:
+    """One session's messages from an archive file, oldest first.
+
+    Archive files never change once written, so segments are cached; the
+    returned dicts are shared and must not be modified.
+    """
+    with open(path, 'rb') as f:
+        f.seek(byte_offset)
+        data = f.read(byte_length)
+    messages = []
+    for line in gzip.decompress(data).splitlines():
+        row = orjson.loads(line)
+        messages.append({
+            'message_id': row['message_id'],
+            'role': row['role'],
+            'content': row['content'],
+            'metadata': row['metadata'],
+            'created_at': datetime.fromisoformat(row['created_at']),
+        })
+    return tuple(messages)
+
+
+def _lean(message: Dict[str, Any]) -> MessageRecord:
+    metadata = message['metadata']
+    return MessageRecord(message['message_id'], message['role'], message['content'],
+                         orjson.Fragment(orjson.dumps(metadata)) if metadata is not None else None,
+                         message['created_at'])
+
+
+def _iter_archived(segments: Sequence[Tuple[str, int, int]], direction: str,
+                   key: Optional[Tuple[datetime, str]], lean: bool) -> Iterator[Any]:
+    for path, byte_offset, byte_length in (segments if direction == NEWER else reversed(segments)):
+        messages = read_segment(path, byte_offset, byte_length)
+        for message in (messages if direction == NEWER else reversed(messages)):
+            if key:
+                position = (message['created_at'], str(message['message_id']))
+                if (position <= key) if direction == NEWER else (position >= key):
+                    continue
+            yield _lean(message) if lean else dict(message)
+
+
+def archived_messages(segments: Sequence[Tuple[str, int, int]], direction: str,
+                      key: Optional[Tuple[datetime, str]], count: int, lean: bool = False) -> List[Any]:
+    """Up to ``count`` archived messages past ``key`` in ``direction``.
+
+    ``segments`` are (path, byte_offset, byte_length) ordered oldest first.
+    Messages come in page order: ascending for NEWER, descending for OLDER.
+    They are dicts like get_chat_messages_page rows, or ``MessageRecord``s
+    with ``lean=True``.
+    """
+    return list(islice(_iter_archived(segments, direction, key, lean), count))
+
+
+def iter_archived_messages(segments: Sequence[Tuple[str, int, int]], lean: bool = False) -> Iterator[Any]:
+    """Every archived message of ``segments`` in chronological order, one segment in memory at a time"""
+    return _iter_archived(segments, NEWER, None, lean)
+
+
+# =========================
+# MAINTENANCE
+# =========================
+
+class PartitionMaintainer:
+    """Keeps monthly chat_messages partitions ahead of time and moves old months to the archive.
+
+    ``run_once`` creates partitions through ``months_ahead`` months from now.
+    With ``archive=True`` it also archives partitions whose month ended more
+    than ``retain_months`` ago, oldest first, into ``directory``, then
+    detaches them. Archiving stops at a partition that still holds
+    messages of a session active in the last ``inactive_days`` days. A
+    background thread repeats this every ``interval`` seconds between
+    ``start`` and ``close``. The handler takes an advisory lock, so workers
+    never run maintenance at the same time.
+    """
+
+    def __init__(self, db, directory: str, months_ahead: int = 3, retain_months: int = 6,
+                 inactive_days: int = 90, archive: bool = True, interval: float = 3600.0):
+        if retain_months < 1:
+            raise ValueError("retain_months must be at least 1")
+        self.db = db
+        self.directory = os.path.abspath(directory)
+        self.months_ahead = months_ahead
+        self.retain_months = retain_months
+        self.inactive_days = inactive_days
+        self.archive = archive
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            'runs': 0,
+            'partitions_created': 0,
+            'partitions_archived': 0,
+            'messages_archived': 0,
+            'archive_bytes': 0,
+            'blocked': 0,
+            'failures': 0,
+            'hot_partitions': 0,
+            'hot_rows_estimate': 0,
+            'hot_table_bytes': 0,
+            'hot_index_bytes': 0,
+        }
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._closing.clear()
+        self._thread = threading.Thread(target=self._run, name='partition-maintainer', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the background thread; a pass in progress finishes first"""
+        self._closing.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def archive_cutoff(self, now: datetime = None) -> datetime:
+        """Partitions ending on or before this are due for the archive"""
+        now = now or datetime.now(timezone.utc)
+        return _months_before(datetime(now.year, now.month, 1, tzinfo=timezone.utc), self.retain_months)
+
+    def run_once(self) -> Dict[str, Any]:
+        """Create upcoming partitions and archive due ones; returns what was done"""
+        created = self.db.ensure_message_partitions(self.months_ahead)
+        archived, blocked = [], None
+        if self.archive:
+            archived, blocked = self._archive_due()
+        partitions = self.db.get_message_partitions()
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['partitions_created'] += len(created or [])
+            self._stats['failures'] += int(created is None)
+            self._stats['hot_partitions'] = len(partitions)
+            self._stats['hot_rows_estimate'] = sum(p['row_estimate'] for p in partitions)
+            self._stats['hot_table_bytes'] = sum(p['table_bytes'] for p in partitions)
+            self._stats['hot_index_bytes'] = sum(p['index_bytes'] for p in partitions)
+        return {'created': created or [], 'archived': archived, 'blocked': blocked}
+
+    def _archive_due(self) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        cutoff = self.archive_cutoff()
+        due = [p for p in self.db.get_message_partitions()
+               if p['range_end'] is not None and p['range_end'] <= cutoff]
+        archived = []
+        for partition in due:
+            name = partition['partition_name']
+            os.makedirs(self.directory, exist_ok=True)
+            result = self.db.archive_message_partition(
+                name, os.path.join(self.directory, f"{name}.jsonl.gz"), self.inactive_days)
+            if not result or not result['archived']:
+                # Archiving out of order would interleave archived and hot messages
+                with self._lock:
+                    self._stats['blocked' if result else 'failures'] += 1
+                return archived, result or {'partition_name': name, 'archived': False, 'reason': 'error'}
+            archived.append(result)
+            with self._lock:
+                self._stats['partitions_archived'] += 1
+                self._stats['messages_archived'] += result['message_count']
+                self._stats['archive_bytes'] += result['size_bytes']
+        return archived, None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['archive_enabled'] = self.archive
+        return stats
+
+    def _run(self):
+        while not self._closing.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Partition maintenance failed: {e}")
+                with self._lock:
+                    self._stats['failures'] += 1
+            self._closing.wait(self.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain chat_messages partitions and the cold archive')
+    parser.add_argument('command', choices=['status', 'ensure', 'archive'], nargs='?', default='status')
+    parser.add_argument('--directory', default=os.getenv('MESSAGE_ARCHIVE_PATH', './data/message_archive'))
+    parser.add_argument('--months-ahead', type=int, default=3)
+    parser.add_argument('--retain-months', type=int, default=6)
+    parser.add_argument('--inactive-days', type=int, default=90)
+    args = parser.parse_args()
+
+    # Imported here: db_manager imports this module
+    from .db_manager import DatabaseHandler
+
+    load_dotenv()
+    db = DatabaseHandler(
+        host=os.getenv('DB_HOST', '127.0.0.1'),
+        database=os.getenv('DB_NAME', 'chatting'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'placeholder'),
+        port=int(os.getenv('DB_PORT', 5432)),
+    )
+    if not db.connect():
+        sys.exit(1)
+    try:
+        maintainer = PartitionMaintainer(db, args.directory, months_ahead=args.months_ahead,
+                                         retain_months=args.retain_months, inactive_days=args.inactive_days,
+                                         archive=args.command == 'archive')
+        if args.command != 'status':
+            started = time.monotonic()
+            result = maintainer.run_once()
+            for partition in result['archived']:
+                print(f"✅ Archived {partition['partition_name']}: {partition['message_count']} messages, "
+                      f"{partition['size_bytes']} bytes -> {partition['path']}")
+            if result['blocked']:
+                print(f"📝 Stopped at {result['blocked']['partition_name']}: {result['blocked']['reason']}")
+            print(f"📝 Maintenance took {time.monotonic() - started:.1f}s")
+        for partition in db.get_message_partitions():
+            print(f"{partition['partition_name']:<28} hot   ~{partition['row_estimate']:>10} rows "
+                  f"{partition['index_bytes'] // 1024:>10} KiB indexes")
+        for archive in db.get_message_archives():
+            print(f"{archive['partition_name']:<28} cold   {archive['message_count']:>10} rows "
+                  f"{archive['size_bytes'] // 1024:>10} KiB  {archive['path']}")
+    finally:
+        db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
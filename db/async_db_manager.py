@@ -0,0 +1,659 @@
+import asyncio
+import functools
+import json
+import time
+import uuid
+from typing import Optional, Dict, List, Any
+
+import asyncpg
+from starlette.concurrency import run_in_threadpool
+
+from .db_manager import DatabaseHandler
+from .pagination import OLDER, NEWER, encode_cursor, decode_cursor
+from .cache import MISSING, NOTIFY_CHANNEL, notify_payload
+from .passwords import PasswordQueueFull
+from .lean import MESSAGE_COLUMNS, message_records
+from .archive import archived_messages
+
+# asyncpg raises its own hierarchy; connection failures surface as OSError
+DB_ERRORS = (asyncpg.PostgresError, asyncpg.InterfaceError, OSError)
+
+# Errors after which a read is retried on the primary and the replica benched
+REPLICA_ERRORS = (asyncpg.PostgresConnectionError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError)
+
+# The subset of DatabaseHandler.connection_params asyncpg understands
+CONNECTION_KEYS = ('host', 'database', 'user', 'password', 'port')
+
+
+async def _init_connection(connection):
+    """Decode uuid/json columns the same way psycopg2 does in DatabaseHandler"""
+    await connection.set_type_codec('uuid', encoder=str, decoder=str,
+                                    schema='pg_catalog', format='text')
+    for json_type in ('json', 'jsonb'):
+        await connection.set_type_codec(json_type, encoder=json.dumps, decoder=json.loads,
+                                        schema='pg_catalog', format='text')
+
+
+def _rowcount(result) -> int:
+    """Rows returned or affected, from a fetch/fetchrow result or an execute status tag"""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, str):
+        count = result.rsplit(' ', 1)[-1]
+        return int(count) if count.isdigit() else -1
+    return int(result is not None)
+
+
+class ThreadedDatabaseHandler:
+    """Awaitable view of a DatabaseHandler: every method runs on the threadpool.
+
+    This is what ``async def`` routes do with the psycopg2 driver, and what
+    AsyncDatabaseHandler falls back to for methods it does not implement.
+    Attributes that are not methods (``cache``, ``password_hasher``, ...)
+    are the handler's own.
+    """
+    driver = 'psycopg2'
+
+    def __init__(self, db: DatabaseHandler):
+        self.db = db
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Usage stats of the pool this handler's queries run on"""
+        return self.db.get_pool_stats()
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.db, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(attribute, *args, **kwargs)
+        return call
+
+
+class AsyncDatabaseHandler(ThreadedDatabaseHandler):
+    """DatabaseHandler's request-path methods on an asyncpg pool.
+
+    Method names, arguments and return shapes match DatabaseHandler, so
+    routes only add ``await``. The routes' hot paths (users, projects, chat
+    sessions and messages, models) run natively on the event loop; any
+    other method runs the psycopg2 handler on the threadpool.
+
+    ``db`` is shared, not copied: its read cache and NOTIFY invalidation,
+    bcrypt pool, last-login buffer, replica health and read-your-writes
+    stickiness and query metrics apply to both drivers. Reads go to an
+    asyncpg pool per replica whenever ``db``'s router picks one. asyncpg
+    prepares and caches every statement per connection on its own, so
+    ``prepared_statements`` only affects the psycopg2 paths.
+    """
+    driver = 'asyncpg'
+
+    def __init__(self, db: DatabaseHandler, min_connections: int = 1, max_connections: int = 10,
+                 pool_timeout: float = 30.0):
+        super().__init__(db)
+        self.connection_params = {key: db.connection_params[key] for key in CONNECTION_KEYS}
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.pool: Optional[asyncpg.Pool] = None
+        self._replica_pools: Dict[str, asyncpg.Pool] = {}
+        self.password_hasher = db.password_hasher
+        self.cache = db.cache
+        self.cache_notify = db.cache_notify
+        self.replicas = db.replicas
+        self.last_login_buffer = db.last_login_buffer
+        self.metrics = db.metrics if db.metrics is not None and db.metrics.enabled else None
+
+    async def connect(self):
+        """Connect the psycopg2 handler, then create the asyncpg pools"""
+        if not await run_in_threadpool(self.db.connect):
+            return False
+        try:
+            self.pool = await asyncpg.create_pool(
+                **self.connection_params,
+                min_size=self.min_connections,
+                max_size=self.max_connections,
+                init=_init_connection
+            )
+            # Replica pools connect on first use: the router decides which are usable
+            for replica in (self.replicas.replicas if self.replicas else []):
+                self._replica_pools[replica.name] = await asyncpg.create_pool(
+                    **{key: replica.connection_params[key] for key in CONNECTION_KEYS},
+                    min_size=0,
+                    max_size=self.max_connections,
+                    init=_init_connection
+                )
+            print(f"✅ Async database pool ready ({self.min_connections}-{self.max_connections} connections)")
+            return True
+        except DB_ERRORS as e:
+            print(f"❌ Database connection failed: {e}")
+            return False
+
+    async def disconnect(self):
+        """Close the asyncpg pools, then the psycopg2 handler"""
+        for pool in [*self._replica_pools.values(), self.pool]:
+            if pool is not None:
+                await pool.close()
+        self._replica_pools.clear()
+        if self.pool is not None:
+            self.pool = None
+            print("📝 Async database pool closed")
+        await run_in_threadpool(self.db.disconnect)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get asyncpg pool usage stats"""
+        if not self.pool:
+            return {'pooled': True, 'size': 0, 'in_use': 0, 'idle': 0}
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        return {
+            'pooled': True,
+            'min_size': self.pool.get_min_size(),
+            'max_size': self.pool.get_max_size(),
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+        }
+
+    # =========================
+    # QUERY EXECUTION
+    # =========================
+
+    async def _run(self, pool: asyncpg.Pool, operation: str, method: str, sql: str, *args):
+        """``connection.<method>(sql, *args)`` on a connection from ``pool``, recorded in query metrics"""
+        if pool is None:
+            raise asyncpg.InterfaceError("Database connection unavailable")
+        async with pool.acquire(timeout=self.pool_timeout) as connection:
+            started = time.perf_counter()
+            rows = -1
+            try:
+                result = await getattr(connection, method)(sql, *args)
+                rows = _rowcount(result)
+                return result
+            except Exception as e:
+                if self.metrics is not None:
+                    self.metrics.errors.inc(operation, type(e).__name__)
+                raise
+            finally:
+                if self.metrics is not None:
+                    self.metrics.observe(operation, sql, args, time.perf_counter() - started, rows)
+
+    async def _read(self, operation: str, method: str, sql: str, *args, sticky_key: str = None):
+        """``_run`` on a replica when the router picks one, else on the primary (see DatabaseHandler._read)"""
+        replica = self.replicas.pick(sticky_key) if self.replicas else None
+        if replica is not None:
+            try:
+                return await self._run(self._replica_pools.get(replica.name), operation, method, sql, *args)
+            except REPLICA_ERRORS as e:
+                self.replicas.mark_down(replica, e)
+        return await self._run(self.pool, operation, method, sql, *args)
+
+    def _stick(self, *keys: str):
+        self.db._stick(*keys)
+
+    # =========================
+    # READ CACHE
+    # =========================
+
+    def _cache_get(self, *key):
+        return self.cache.get(key) if self.cache is not None else MISSING
+
+    def _cache_set(self, value, *key):
+        if self.cache is not None:
+            self.cache.set(key, value)
+
+    async def invalidate_cache(self, namespace: str, *key):
+        """Drop cached reads here and, with cache_notify, in every other worker"""
+        if self.cache is None:
+            return
+        self.cache.invalidate(namespace, *key)
+        if self.cache_notify:
+            try:
+                await self._run(self.pool, 'invalidate_cache', 'execute', "SELECT pg_notify($1, $2)",
+                                NOTIFY_CHANNEL, notify_payload(namespace, *key))
+            except DB_ERRORS as e:
+                print(f"❌ Error publishing cache invalidation: {e}")
+
+    # =========================
+    # USER MANAGEMENT
+    # =========================
+
+    async def create_user(self, email: str, password: str, first_name: str = None,
+                          last_name: str = None, role: str = 'scholar') -> Optional[str]:
+        """Create a new user and return user_id"""
+        try:
+            # Hash password on the bcrypt pool without blocking the event loop
+            password_hash = await self.password_hasher.hash_async(password)
+            user_id = str(uuid.uuid4())
+
+            result = await self._run(self.pool, 'create_user', 'fetchrow', """
+                INSERT INTO users (user_id, email, password_hash, first_name, last_name, role, email_verified)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+                RETURNING user_id
+            """, user_id, email, password_hash, first_name, last_name, role, True)
+
+            if result:
+                self._stick(result['user_id'])
+                await self.invalidate_cache('user', result['user_id'])
+            print(f"✅ User created: {email}")
+            return result['user_id'] if result else None
+
+        except asyncpg.UniqueViolationError:
+            print(f"❌ User with email {email} already exists")
+            return None
+        except DB_ERRORS as e:
+            print(f"❌ Error creating user: {e}")
+            return None
+
+    async def authenticate_user(self, email: str, password: str) -> Optional[Dict]:
+        """Authenticate user and return user info"""
+        try:
+            user = await self._run(self.pool, 'authenticate_user', 'fetchrow', """
+                SELECT user_id, email, password_hash, first_name, last_name, role, status
+                FROM users
+                WHERE email = $1 AND status = 'active'
+            """, email)
+
+            if not user:
+                print("❌ User not found or inactive")
+                return None
+
+            # Verify password without blocking the event loop
+            if await self.password_hasher.verify_async(password, user['password_hash']):
+                # Upgrade hashes made with an old cost factor
+                new_hash = await self._upgraded_hash(password, user['password_hash'])
+
+                # Update last login (write-behind when buffered); an upgraded
+                # hash is written in the same statement
+                if self.last_login_buffer and not new_hash:
+                    self.last_login_buffer.touch(user['user_id'])
+                    user_dict = dict(user)
+                    del user_dict['password_hash']
+                else:
+                    user_dict = await self._record_login(user['user_id'], user['password_hash'], new_hash)
+                    if not user_dict:
+                        print("❌ Password changed or user deactivated during login")
+                        return None
+
+                print(f"✅ User authenticated: {email}")
+                return user_dict
+            else:
+                print("❌ Invalid password")
+                return None
+
+        except DB_ERRORS as e:
+            print(f"❌ Error authenticating user: {e}")
+            return None
+
+    async def _record_login(self, user_id: str, verified_hash: str, new_hash: str = None) -> Optional[Dict]:
+        """Stamp last_login (and store ``new_hash``) if ``verified_hash`` is still current (see DatabaseHandler)"""
+        user = await self._run(self.pool, 'record_login', 'fetchrow', """
+            UPDATE users
+            SET last_login = NOW(),
+                password_hash = COALESCE($1, password_hash)
+            WHERE user_id = $2 AND password_hash = $3 AND status = 'active'
+            RETURNING user_id, email, first_name, last_name, role, status
+        """, new_hash, user_id, verified_hash)
+        if not user:
+            return None
+        self._stick(user_id)
+        await self.invalidate_cache('user', user_id)
+        return dict(user)
+
+    async def _upgraded_hash(self, password: str, password_hash: str) -> Optional[str]:
+        """New hash of a verified password if its cost factor is outdated"""
+        if not self.password_hasher.needs_rehash(password_hash):
+            return None
+        try:
+            return await self.password_hasher.hash_async(password)
+        except PasswordQueueFull:
+            # Best effort: the old hash still verifies, retry on a later login
+            return None
+
+    async def get_user_by_id(self, user_id: str) -> Optional[Dict]:
+        """Get user information by user_id"""
+        cached = self._cache_get('user', user_id)
+        if cached is not MISSING:
+            return cached
+        try:
+            user = await self._read('get_user_by_id', 'fetchrow', """
+                SELECT user_id, email, first_name, last_name, role, status, created_at, last_login
+                FROM users
+                WHERE user_id = $1
+            """, user_id, sticky_key=user_id)
+
+            if not user:
+                return None
+            user = dict(user)
+            self._cache_set(user, 'user', user_id)
+            return user
+
+        except DB_ERRORS as e:
+            print(f"❌ Error getting user: {e}")
+            return None
+
+    # =========================
+    # PROJECT MANAGEMENT
+    # =========================
+
+    async def create_project(self, name: str, description: str, created_by_user_id: str,
+                             is_private: bool = False) -> Optional[str]:
+        """Create a new project"""
+        try:
+            project_id = str(uuid.uuid4())
+
+            # Project and owner membership in one atomic statement
+            result = await self._run(self.pool, 'create_project', 'fetchrow', """
+                WITH project AS (
+                    INSERT INTO projects (project_id, name, description, created_by_user_id, is_private)
+                    VALUES ($1, $2, $3, $4, $5)
+                    RETURNING project_id, created_by_user_id
+                ), owner AS (
+                    INSERT INTO project_members (project_id, user_id, role)
+                    SELECT project_id, created_by_user_id, 'owner' FROM project
+                )
+                SELECT project_id FROM project
+            """, project_id, name, description, created_by_user_id, is_private)
+
+            if result:
+                self._stick(created_by_user_id)
+                await self.invalidate_cache('user_projects', created_by_user_id)
+            print(f"✅ Project created: {name}")
+            return result['project_id'] if result else None
+
+        except DB_ERRORS as e:
+            print(f"❌ Error creating project: {e}")
+            return None
+
+    async def get_user_projects(self, user_id: str) -> List[Dict]:
+        """Get all projects for a user"""
+        cached = self._cache_get('user_projects', user_id)
+        if cached is not MISSING:
+            return cached
+        try:
+            projects = await self._read('get_user_projects', 'fetch', """
+                SELECT p.project_id, p.name, p.description, p.is_private, p.created_at,
+                       pm.role as member_role,
+                       u.first_name || ' ' || u.last_name as created_by_name
+                FROM projects p
+                JOIN project_members pm ON p.project_id = pm.project_id
+                LEFT JOIN users u ON p.created_by_user_id = u.user_id
+                WHERE pm.user_id = $1
+                ORDER BY p.created_at DESC
+            """, user_id, sticky_key=user_id)
+
+            projects = [dict(project) for project in projects]
+            self._cache_set(projects, 'user_projects', user_id)
+            return projects
+
+        except DB_ERRORS as e:
+            print(f"❌ Error getting user projects: {e}")
+            return []
+
+    # =========================
+    # CHAT MANAGEMENT
+    # =========================
+
+    async def create_chat_session(self, user_id: str, project_id: str = None,
+                                  title: str = None, model_id: int = 1) -> Optional[str]:
+        """Create a new chat session"""
+        try:
+            session_id = str(uuid.uuid4())
+
+            result = await self._run(self.pool, 'create_chat_session', 'fetchrow', """
+                INSERT INTO chat_sessions (session_id, user_id, project_id, title, model_id)
+                VALUES ($1, $2, $3, $4, $5)
+                RETURNING session_id
+            """, session_id, user_id, project_id, title, model_id)
+
+            if result:
+                self._stick(user_id, result['session_id'])
+            print(f"✅ Chat session created: {session_id}")
+            return result['session_id'] if result else None
+
+        except DB_ERRORS as e:
+            print(f"❌ Error creating chat session: {e}")
+            return None
+
+    async def get_chat_session(self, session_id: str) -> Optional[Dict]:
+        """Get a chat session's owner, project and title"""
+        try:
+            session = await self._read('get_chat_session', 'fetchrow', """
+                SELECT session_id, user_id, project_id, title, status, created_at
+                FROM chat_sessions
+                WHERE session_id = $1
+            """, session_id, sticky_key=session_id)
+            return dict(session) if session else None
+
+        except DB_ERRORS as e:
+            print(f"❌ Error getting chat session: {e}")
+            return None
+
+    async def add_chat_message(self, session_id: str, role: str, content: str,
+                               metadata: Dict = None) -> Optional[str]:
+        """Add a message to chat session"""
+        try:
+            message_id = str(uuid.uuid4())
+
+            # Insert and bump the session counters in one statement
+            result = await self._run(self.pool, 'add_chat_message', 'fetchrow', """
+                WITH inserted AS (
+                    INSERT INTO chat_messages (message_id, session_id, role, content, metadata)
+                    VALUES ($1, $2, $3, $4, $5)
+                    RETURNING message_id, session_id, created_at
+                ), counted AS (
+                    UPDATE chat_sessions cs
+                    SET message_count = cs.message_count + 1,
+                        last_message_at = GREATEST(cs.last_message_at, inserted.created_at),
+                        updated_at = NOW()
+                    FROM inserted
+                    WHERE cs.session_id = inserted.session_id
+                    RETURNING cs.user_id
+                )
+                SELECT message_id, (SELECT user_id FROM counted) AS user_id FROM inserted
+            """, message_id, session_id, role, content, metadata if metadata else None)
+
+            if result:
+                self._stick(session_id, result['user_id'])
+            return result['message_id'] if result else None
+
+        except DB_ERRORS as e:
+            print(f"❌ Error adding chat message: {e}")
+            return None
+
+    async def add_chat_messages(self, session_id: str, messages: List[Dict]) -> Optional[List[str]]:
+        """Add many messages to a chat session in one atomic statement (see DatabaseHandler)"""
+        if not messages:
+            return []
+        try:
+            message_ids = [str(uuid.uuid4()) for _ in messages]
+
+            # Columns as arrays: one statement text (and cached plan) for any
+            # batch size, and no bind parameter limit. Offset created_at by the
+            # row position so the batch keeps its order
+            owners = await self._run(self.pool, 'add_chat_messages', 'fetch', """
+                WITH inserted AS (
+                    INSERT INTO chat_messages (message_id, session_id, role, content, metadata, created_at)
+                    SELECT m.message_id::uuid, $1, m.role, m.content, m.metadata::jsonb,
+                           NOW() + (m.position - 1) * INTERVAL '1 microsecond'
+                    FROM unnest($2::text[], $3::text[], $4::text[], $5::text[])
+                         WITH ORDINALITY AS m(message_id, role, content, metadata, position)
+                    RETURNING session_id, created_at
+                )
+                UPDATE chat_sessions cs
+                SET message_count = cs.message_count + batch.added,
+                    last_message_at = GREATEST(cs.last_message_at, batch.last_at),
+                    updated_at = NOW()
+                FROM (
+                    SELECT session_id, COUNT(*) AS added, MAX(created_at) AS last_at
+                    FROM inserted
+                    GROUP BY session_id
+                ) batch
+                WHERE cs.session_id = batch.session_id
+                RETURNING cs.user_id
+            """, session_id, message_ids,
+                [message['role'] for message in messages],
+                [message['content'] for message in messages],
+                [json.dumps(message['metadata']) if message.get('metadata') else None for message in messages])
+
+            self._stick(session_id, *(row['user_id'] for row in owners))
+            return message_ids
+
+        except DB_ERRORS as e:
+            print(f"❌ Error adding chat messages: {e}")
+            return None
+
+    async def get_chat_messages(self, session_id: str, limit: int = 50) -> List[Dict]:
+        """Get the oldest chat messages for a session"""
+        return (await self.get_chat_messages_page(session_id, limit=limit))['messages']
+
+    async def get_chat_messages_page(self, session_id: str, limit: int = 50, cursor: str = None,
+                                     latest: bool = False, lean: bool = False) -> Dict:
+        """Get one page of chat messages using keyset pagination (see DatabaseHandler)"""
+        key = None
+        if cursor:
+            direction, created_at, message_id = decode_cursor(cursor)
+            key = (created_at, message_id)
+        else:
+            direction = OLDER if latest else NEWER
+
+        order = "ASC" if direction == NEWER else "DESC"
+        if key:
+            keyset = "AND (created_at, message_id) {} ($2, $3)".format('>' if direction == NEWER else '<')
+            args = [session_id, *key, limit + 1]
+        else:
+            keyset = ""
+            args = [session_id, limit + 1]
+        columns = MESSAGE_COLUMNS if lean else "message_id, role, content, metadata, created_at"
+
+        try:
+            messages = await self._read('get_chat_messages_page', 'fetch', f"""
+                SELECT {columns}
+                FROM chat_messages
+                WHERE session_id = $1 {keyset}
+                ORDER BY created_at {order}, message_id {order}
+                LIMIT ${len(args)}
+            """, *args, sticky_key=session_id)
+            # Archived messages are older than all hot ones: reading forwards
+            # they may come first, reading backwards only once hot rows run out
+            segments = []
+            if direction == NEWER or len(messages) <= limit:
+                segments = await self._archived_segments(session_id, direction, key)
+
+        except DB_ERRORS as e:
+            print(f"❌ Error getting chat messages: {e}")
+            messages, segments = [], []
+
+        if lean:
+            messages = message_records(messages)
+            boundary = lambda message: (message.created_at, message.message_id)
+        else:
+            messages = [dict(message) for message in messages]
+            boundary = lambda message: (message['created_at'], message['message_id'])
+        if segments:
+            try:
+                # Segment reads decompress files, so keep them off the event loop
+                archived = await run_in_threadpool(archived_messages, segments, direction, key, limit + 1, lean)
+            except OSError as e:
+                print(f"❌ Error reading archived chat messages: {e}")
+                archived = []
+            messages = (archived + messages if direction == NEWER else messages + archived)[:limit + 1]
+
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        if direction == OLDER:
+            messages.reverse()
+
+        # A cursor was given, so rows exist on its other side
+        more_older = has_more if direction == OLDER else bool(key)
+        more_newer = has_more if direction == NEWER else bool(key)
+        first, last = (messages[0], messages[-1]) if messages else (None, None)
+        return {
+            'messages': messages,
+            'older_cursor': encode_cursor(OLDER, *boundary(first)) if first and more_older else None,
+            'newer_cursor': encode_cursor(NEWER, *boundary(last)) if last and more_newer else None,
+        }
+
+    async def _archived_segments(self, session_id: str, direction: str = NEWER, key=None) -> List[tuple]:
+        """(path, byte_offset, byte_length) of a session's archive segments past ``key``, oldest first"""
+        if key is None:
+            keyset, args = "", [session_id]
+        else:
+            column = 'last_created_at >=' if direction == NEWER else 'first_created_at <='
+            keyset, args = f"AND s.{column} $2", [session_id, key[0]]
+        rows = await self._read('get_archived_segments', 'fetch', f"""
+            SELECT a.path, s.byte_offset, s.byte_length
+            FROM chat_message_archive_segments s
+            JOIN chat_message_archives a ON a.partition_name = s.partition_name
+            WHERE s.session_id = $1 {keyset}
+            ORDER BY s.first_created_at
+        """, *args, sticky_key=session_id)
+        return [tuple(row) for row in rows]
+
+    async def get_user_chat_sessions(self, user_id: str, limit: int = 20) -> List[Dict]:
+        """Get user's chat sessions with their denormalized message counters"""
+        try:
+            sessions = await self._read('get_user_chat_sessions', 'fetch', """
+                SELECT cs.session_id, cs.title, cs.status, cs.created_at, cs.updated_at,
+                       p.name as project_name,
+                       cs.message_count, cs.last_message_at
+                FROM chat_sessions cs
+                LEFT JOIN projects p ON cs.project_id = p.project_id
+                WHERE cs.user_id = $1 AND cs.status = 'active'
+                ORDER BY cs.updated_at DESC
+                LIMIT $2
+            """, user_id, limit, sticky_key=user_id)
+
+            return [dict(session) for session in sessions]
+
+        except DB_ERRORS as e:
+            print(f"❌ Error getting chat sessions: {e}")
+            return []
+
+    # =========================
+    # AI MODELS
+    # =========================
+
+    async def get_available_models(self) -> List[Dict]:
+        """Get all active AI models"""
+        cached = self._cache_get('models')
+        if cached is not MISSING:
+            return cached
+        try:
+            models = await self._read('get_available_models', 'fetch', """
+                SELECT model_id, name, version, description, provider, model_type
+                FROM ai_models
+                WHERE is_active = TRUE
+                ORDER BY name
+            """)
+
+            models = [dict(model) for model in models]
+            self._cache_set(models, 'models')
+            return models
+
+        except DB_ERRORS as e:
+            print(f"❌ Error getting AI models: {e}")
+            return []
+
+    # =========================
+    # UTILITY METHODS
+    # =========================
+
+    async def test_connection(self) -> bool:
+        """Test database connection"""
+        try:
+            result = await self._run(self.pool, 'test_connection', 'fetchrow', "SELECT 1")
+            return result is not None
+        except DB_ERRORS as e:
+            print(f"❌ Connection test failed: {e}")
+            return False
+
+
+def async_handler_from_env(value: str, db: DatabaseHandler, **pool_options) -> ThreadedDatabaseHandler:
+    """'asyncpg' / 'psycopg2' -> the awaitable handler async routes call"""
+    if (value or 'asyncpg') == 'asyncpg':
+        return AsyncDatabaseHandler(db, **pool_options)
+    if value == 'psycopg2':
+        return ThreadedDatabaseHandler(db)
+    raise ValueError(f"Unknown database driver: {value}")
@@ -0,0 +1,166 @@
+import json
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Hashable
+
+import psycopg2
+
+MISSING = object()
+
+# Default time-to-live per namespace, in seconds
+DEFAULT_TTLS = {
+    'models': 300.0,
+    'user': 60.0,
+    'user_projects': 30.0,
+}
+
+NOTIFY_CHANNEL = 'cache_invalidation'
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a time-to-live per entry.
+
+    Keys are tuples whose first item is a namespace (``('user', user_id)``),
+    so a whole namespace can be dropped at once. Cached values are shared
+    between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttls: Dict[str, float] = None, default_ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Any:
+        """Return the cached value, or MISSING"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Tuple[Hashable, ...], value: Any, ttl: Optional[float] = None):
+        if ttl is None:
+            ttl = self.ttls.get(key[0], self.default_ttl)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, namespace: str, *key):
+        """Drop one entry, or every entry of the namespace when no key is given"""
+        with self._lock:
+            if key:
+                dropped = self._entries.pop((namespace, *key), None) is not None
+            else:
+                stale = [k for k in self._entries if k[0] == namespace]
+                for k in stale:
+                    del self._entries[k]
+                dropped = bool(stale)
+            if dropped:
+                self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+            }
+
+
+def notify_payload(namespace: str, *key) -> str:
+    return json.dumps([namespace, *key])
+
+
+class PgNotifyInvalidator:
+    """Applies invalidations published by other workers via LISTEN/NOTIFY.
+
+    Writers call ``pg_notify(NOTIFY_CHANNEL, notify_payload(...))``; every
+    process running an invalidator drops the matching entries from its own
+    cache. The listener runs on a dedicated connection in a daemon thread and
+    clears the whole cache after reconnecting, since notifications sent while
+    it was disconnected are lost.
+    """
+
+    def __init__(self, connection_params: Dict[str, Any], cache: TTLCache,
+                 channel: str = NOTIFY_CHANNEL, reconnect_delay: float = 5.0):
+        self.connection_params = connection_params
+        self.cache = cache
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='cache-invalidator', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _apply(self, payload: str):
+        try:
+            namespace, *key = json.loads(payload)
+        except (ValueError, TypeError):
+            print(f"❌ Ignoring malformed cache invalidation: {payload!r}")
+            return
+        self.cache.invalidate(namespace, *key)
+
+    def _run(self):
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = psycopg2.connect(**self.connection_params)
+                connection.autocommit = True
+                cursor = connection.cursor()
+                cursor.execute(f'LISTEN "{self.channel}"')
+                self.cache.clear()
+                while not self._stop.is_set():
+                    if select.select([connection], [], [], 1.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self._apply(connection.notifies.pop(0).payload)
+            except psycopg2.Error as e:
+                print(f"❌ Cache invalidation listener failed: {e}")
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                if connection is not None:
+                    connection.close()
@@ -0,0 +1,249 @@
+import re
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional
+
+from .lean import MessageRecord
+from .pagination import NEWER, encode_cursor
+
+# Role markers and separators each message adds on top of its text
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+
+def approx_tokens(text: str) -> int:
+    """~4 characters per token, close enough for budgeting English text"""
+    return (len(text) + 3) // 4
+
+
+def is_streaming(message: MessageRecord, now: datetime, grace: float) -> bool:
+    """A reply ReplyStreamer is still writing: status 'streaming', created under ``grace`` seconds ago"""
+    metadata = message.decoded_metadata()
+    if not isinstance(metadata, dict) or metadata.get('status') != 'streaming':
+        return False
+    return (now - message.created_at).total_seconds() < grace
+
+
+class Summarizer:
+    """Folds messages into a running summary, one increment at a time.
+
+    ``extend`` gets the previous summary (None on the first call) and only
+    the messages that are new to it, and returns a summary of at most about
+    ``max_tokens`` tokens. ``name`` is stored with the summary.
+    """
+    name = 'summarizer'
+
+    def extend(self, summary: Optional[str], messages: List[MessageRecord], max_tokens: int) -> str:
+        raise NotImplementedError
+
+
+class ExtractiveSummarizer(Summarizer):
+    """Deterministic local stand-in: one clipped line per message, oldest lines dropped first"""
+    name = 'extractive'
+
+    def __init__(self, line_chars: int = 200, count_tokens: Callable[[str], int] = approx_tokens):
+        self.line_chars = line_chars
+        self.count_tokens = count_tokens
+
+    def _line(self, message: MessageRecord) -> str:
+        text = ' '.join(message.content.split())
+        first = SENTENCE_END.split(text, 1)[0]
+        if len(first) > self.line_chars:
+            first = first[:self.line_chars - 1].rstrip() + '…'
+        return f"{message.role}: {first}"
+
+    def extend(self, summary: Optional[str], messages: List[MessageRecord], max_tokens: int) -> str:
+        lines = (summary.split('\n') if summary else []) + [self._line(message) for message in messages]
+        tokens = [self.count_tokens(line) + 1 for line in lines]
+        total = sum(tokens)
+        start = 0
+        while total > max_tokens and start < len(lines):
+            total -= tokens[start]
+            start += 1
+        return '\n'.join(lines[start:])
+
+
+class OllamaSummarizer(Summarizer):
+    """Summaries from a local Ollama chat model through langchain-ollama"""
+
+    PROMPT = (
+        "You maintain a running summary of a research conversation.\n"
+        "Current summary:\n{summary}\n\n"
+        "New messages:\n{messages}\n\n"
+        "Rewrite the summary so it also covers the new messages. Keep facts, decisions, "
+        "open questions and references. Use at most {max_words} words. Reply with the summary only."
+    )
+
+    def __init__(self, model: str = 'llama3.2', base_url: str = None):
+        # Imported here so the extractive summarizer works without langchain-ollama
+        from langchain_ollama import ChatOllama
+        self.name = f'ollama-{model}'
+        self._model = ChatOllama(model=model, base_url=base_url, temperature=0)
+
+    def extend(self, summary: Optional[str], messages: List[MessageRecord], max_tokens: int) -> str:
+        prompt = self.PROMPT.format(
+            summary=summary or '(empty)',
+            messages='\n'.join(f"{message.role}: {message.content}" for message in messages),
+            max_words=max(max_tokens * 3 // 4, 1),
+        )
+        return self._model.invoke(prompt).content.strip()
+
+
+def summarizer_from_env(value: str) -> Summarizer:
+    """'extractive' / 'ollama:llama3.2' -> a Summarizer"""
+    kind, _, option = (value or 'extractive').partition(':')
+    if kind == 'extractive':
+        return ExtractiveSummarizer()
+    if kind == 'ollama':
+        return OllamaSummarizer(option or 'llama3.2')
+    raise ValueError(f"Unknown summarizer: {value}")
+
+
+class ContextBuilder:
+    """Fits a chat session into a token budget: rolling summary + recent messages verbatim.
+
+    The summary is persisted with the keyset position of the last message
+    it covers, so a build only reads messages after that position: the
+    verbatim window (bounded by the budget) plus whatever arrived since the
+    last turn. Messages that no longer fit are folded into the summary
+    through ``summarizer.extend`` and the new position is saved, so each
+    turn costs O(new messages) however long the session gets.
+
+    ``summary_ratio`` of the budget is reserved for the summary once one is
+    needed. When folding, the verbatim window is cut back to
+    ``keep_ratio`` of its share so the next few turns fit without another
+    summarizer call.
+
+    A reply that is still streaming is never folded, nor is anything after
+    it: its text is partial and the summary is never revisited. The context
+    may run over budget until the reply completes. A row still marked
+    streaming after ``streaming_grace`` seconds lost its writer (a crashed
+    worker) and is folded as it stands.
+    """
+
+    def __init__(self, db, summarizer: Summarizer, count_tokens: Callable[[str], int] = approx_tokens,
+                 summary_ratio: float = 0.25, keep_ratio: float = 0.75, page_size: int = 200,
+                 streaming_grace: float = 600.0):
+        if not 0 < summary_ratio < 1 or not 0 < keep_ratio <= 1:
+            raise ValueError("summary_ratio must be in (0, 1) and keep_ratio in (0, 1]")
+        self.db = db
+        self.summarizer = summarizer
+        self.count_tokens = count_tokens
+        self.summary_ratio = summary_ratio
+        self.keep_ratio = keep_ratio
+        self.page_size = page_size
+        self.streaming_grace = streaming_grace
+        self._lock = threading.Lock()
+        self._stats = {
+            'builds': 0,
+            'messages_read': 0,
+            'folds': 0,
+            'folds_held': 0,
+            'messages_folded': 0,
+            'summarize_seconds_total': 0.0,
+            'build_seconds_total': 0.0,
+        }
+
+    def message_tokens(self, message: MessageRecord) -> int:
+        return self.count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+    def _unsummarized(self, session_id: str, stored: Optional[Dict[str, Any]]) -> List[MessageRecord]:
+        """Messages after the summary's position, oldest first"""
+        cursor = None
+        if stored:
+            cursor = encode_cursor(NEWER, stored['covered_created_at'], stored['covered_message_id'])
+        messages: List[MessageRecord] = []
+        while True:
+            page = self.db.get_chat_messages_page(session_id, limit=self.page_size, cursor=cursor, lean=True)
+            messages.extend(page['messages'])
+            cursor = page['newer_cursor']
+            if not cursor:
+                return messages
+
+    @staticmethod
+    def _window(tokens: List[int], budget: int) -> int:
+        """Index of the oldest message in the newest run of ``tokens`` that fits ``budget``"""
+        start, used = len(tokens), 0
+        while start > 0 and used + tokens[start - 1] <= budget:
+            start -= 1
+            used += tokens[start]
+        return start
+
+    def _settled(self, messages: List[MessageRecord], end: int) -> int:
+        """``end``, or the index of the first reply before it that is still streaming"""
+        now = datetime.now(timezone.utc)
+        for index, message in enumerate(messages[:end]):
+            if is_streaming(message, now, self.streaming_grace):
+                return index
+        return end
+
+    def build(self, session_id: str, budget: int) -> Dict[str, Any]:
+        """Summary and verbatim recent messages of ``session_id`` within ``budget`` tokens"""
+        started = time.monotonic()
+        stored = self.db.get_session_summary(session_id)
+        messages = self._unsummarized(session_id, stored)
+        tokens = [self.message_tokens(message) for message in messages]
+
+        summary = stored['summary'] if stored else None
+        summary_tokens = stored['token_count'] if stored else 0
+        covered = stored['covered_count'] if stored else 0
+        folded = 0
+        start = self._window(tokens, budget - summary_tokens)
+        if start > 0:
+            # Does not fit: fold the oldest messages into the summary
+            reserve = int(budget * self.summary_ratio)
+            start = max(start, self._window(tokens, int((budget - reserve) * self.keep_ratio)))
+            settled = self._settled(messages, start)
+            if settled < start:
+                start = settled
+                with self._lock:
+                    self._stats['folds_held'] += 1
+        if start > 0:
+            overflow = messages[:start]
+            summarize_started = time.monotonic()
+            summary = self.summarizer.extend(summary, overflow, reserve)
+            summarize_seconds = time.monotonic() - summarize_started
+            summary_tokens = self.count_tokens(summary)
+            folded, covered = len(overflow), covered + len(overflow)
+            last = overflow[-1]
+            self.db.save_session_summary(session_id, summary, last.created_at, last.message_id,
+                                         covered, summary_tokens, self.summarizer.name)
+            with self._lock:
+                self._stats['folds'] += 1
+                self._stats['messages_folded'] += folded
+                self._stats['summarize_seconds_total'] += summarize_seconds
+
+        recent = messages[start:]
+        message_tokens = sum(tokens[start:])
+        with self._lock:
+            self._stats['builds'] += 1
+            self._stats['messages_read'] += len(messages)
+            self._stats['build_seconds_total'] += time.monotonic() - started
+        return {
+            'session_id': session_id,
+            'summary': summary,
+            'messages': [{'role': message.role, 'content': message.content} for message in recent],
+            'token_count': summary_tokens + message_tokens,
+            'summary_tokens': summary_tokens,
+            'message_tokens': message_tokens,
+            'summarized_messages': covered,
+            'folded_messages': folded,
+            'messages_read': len(messages),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['messages_read_per_build'] = stats['messages_read'] / stats['builds'] if stats['builds'] else 0.0
+        return stats
+
+
+def prompt_messages(context: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Chat-model messages for a built context, the summary as a leading system message"""
+    messages = []
+    if context['summary']:
+        messages.append({'role': 'system',
+                         'content': f"Summary of the earlier conversation:\n{context['summary']}"})
+    return messages + context['messages']
@@ -1,26 +1,132 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
-import bcrypt
+import psycopg2.errors
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+from psycopg2.extras import RealDictCursor, execute_values
+import os
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterator
 import json
 
+from .pool import ConnectionPool
+from .passwords import PasswordHasher, PasswordQueueFull
+from .pagination import OLDER, NEWER, encode_cursor, decode_cursor, encode_search_cursor, decode_search_cursor
+from .cache import TTLCache, PgNotifyInvalidator, MISSING, NOTIFY_CHANNEL, notify_payload
+from .last_login import LastLoginBuffer
+from .metrics import QueryMetrics
+from .prepared import PreparedStatements
+from .lean import MESSAGE_COLUMNS, message_record, message_records
+from .replicas import ReplicaRouter, REPLICA_ERRORS
+from .archive import (ARCHIVE_COPY_OPTIONS, ArchiveError, SegmentWriter, archived_messages,
+                      iter_archived_messages, partition_range)
+
+# Status columns plus throughput so far (or overall, once finished)
+DOCUMENT_COLUMNS = """
+    document_id, project_id, filename, content_hash, size_bytes, status,
+    page_count, pages_done, chunk_count, error, created_at, started_at, finished_at,
+    pages_done / NULLIF(EXTRACT(EPOCH FROM COALESCE(finished_at, NOW()) - started_at), 0) AS pages_per_sec
+"""
+
+# Serializes partition creation and archiving across workers (pg advisory lock)
+PARTITION_LOCK_ID = 0x63686174
+
+# ts_headline snippet: up to two fragments of ~15-35 words around the matches
+SEARCH_HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MinWords=15, MaxWords=35, MaxFragments=2, FragmentDelimiter=" … "'
+
 class DatabaseHandler:
-    def __init__(self, host: str, database: str, user: str, password: str, port: int = 5432):
-        """Initialize database connection parameters"""
+    def __init__(self, host: str, database: str, user: str, password: str, port: int = 5432,
+                 pooled: bool = False, min_connections: int = 1, max_connections: int = 10,
+                 pool_timeout: float = 30.0, health_check_interval: float = 30.0,
+                 password_hasher: Optional[PasswordHasher] = None,
+                 cache: Optional[TTLCache] = None, cache_notify: bool = False,
+                 last_login_flush_interval: Optional[float] = None,
+                 metrics: Optional[QueryMetrics] = None, prepared_statements: bool = False,
+                 replicas: Optional[List[Dict[str, Any]]] = None, max_replica_lag: float = 5.0,
+                 sticky_window: float = 5.0, connect_options: Optional[Dict[str, Any]] = None):
+        """Initialize database connection parameters.
+
+        With ``pooled=True`` every call checks out its own connection from a
+        thread-safe pool of ``min_connections``..``max_connections``, so sync
+        FastAPI routes running in the threadpool no longer queue on one socket.
+        bcrypt work runs on ``password_hasher``'s bounded pool and raises
+        ``PasswordQueueFull`` when it is saturated.
+        
+        Pass a ``TTLCache`` to cache the model catalog and user/project reads;
+        with ``cache_notify=True`` write paths also publish invalidations over
+        LISTEN/NOTIFY so other workers drop their copies.
+        
+        With ``last_login_flush_interval`` set, logins record last_login in
+        memory and a background thread writes them in bulk at that interval.
+        
+        ``metrics`` records per-operation latency, row counts, errors and slow
+        queries for every statement the handler runs.
+        
+        With ``prepared_statements=True`` hot queries run as named server-side
+        prepared statements, prepared once per connection.
+        
+        ``replicas`` (connection dicts like the primary's) receive the
+        read-only queries: history, sidebar, projects, models and users. A
+        replica more than ``max_replica_lag`` seconds behind, or unreachable,
+        is skipped in favour of the primary, and for ``sticky_window`` seconds
+        after a write the affected user/session reads from the primary.
+        
+        Handler calls made inside ``with db.transaction():`` on the same thread
+        share one connection and commit or roll back together.
+        
+        ``connect_options`` are extra libpq parameters for every connection,
+        e.g. ``{'connect_timeout': 2, 'options': '-c statement_timeout=200'}``.
+        """
         self.connection_params = {
             'host': host,
             'database': database,
             'user': user,
             'password': password,
-            'port': port
+            'port': port,
+            **(connect_options or {})
         }
         self.connection = None
+        self.pool = None
+        self._local = threading.local()
+        self.password_hasher = password_hasher or PasswordHasher()
+        self.cache = cache
+        self.cache_notify = cache_notify
+        self.cache_invalidator = None
+        if cache is not None and cache_notify:
+            self.cache_invalidator = PgNotifyInvalidator(self.connection_params, cache)
+        self.metrics = metrics
+        self.prepared = PreparedStatements() if prepared_statements else None
+        self.replicas = None
+        if replicas:
+            self.replicas = ReplicaRouter(replicas, max_connections=max_connections,
+                                          max_lag=max_replica_lag, sticky_window=sticky_window)
+        self.last_login_buffer = None
+        if last_login_flush_interval:
+            self.last_login_buffer = LastLoginBuffer(self.update_last_logins, last_login_flush_interval)
+        if pooled:
+            self.pool = ConnectionPool(
+                self.connection_params,
+                min_size=min_connections,
+                max_size=max_connections,
+                timeout=pool_timeout,
+                health_check_interval=health_check_interval
+            )
     
     def connect(self):
-        """Establish database connection"""
+        """Establish database connection (or warm up the pool)"""
+        if self.cache_invalidator:
+            self.cache_invalidator.start()
+        if self.last_login_buffer:
+            self.last_login_buffer.start()
+        if self.replicas:
+            self.replicas.start()
         try:
+            if self.pool:
+                self.pool.warm_up()
+                print(f"✅ Database pool ready ({self.pool.min_size}-{self.pool.max_size} connections)")
+                return True
             self.connection = psycopg2.connect(**self.connection_params)
             self.connection.autocommit = True
             print("✅ Database connected successfully")
@@ -31,17 +137,271 @@ class DatabaseHandler:
     
     def disconnect(self):
         """Close database connection"""
+        if self.last_login_buffer:
+            self.last_login_buffer.close()
+        if self.cache_invalidator:
+            self.cache_invalidator.stop()
+        if self.replicas:
+            self.replicas.close()
+        if self.pool:
+            self.pool.close()
+            print("📝 Database pool closed")
         if self.connection:
             self.connection.close()
+            self.connection = None
             print("📝 Database connection closed")
     
+    @contextmanager
+    def connection_scope(self):
+        """Check out a connection for the duration of the block.
+
+        Inside ``transaction()`` this is the transaction's connection. Pooled
+        mode borrows from the pool; single-connection mode reuses
+        ``self.connection`` and reconnects if it was lost.
+        """
+        state = getattr(self._local, 'transaction', None)
+        if state is not None:
+            yield state['connection']
+            return
+
+        if self.pool:
+            with self.pool.connection() as connection:
+                yield connection
+            return
+
+        if not self.connection or self.connection.closed:
+            if not self.connect():
+                raise psycopg2.OperationalError("Database connection unavailable")
+        try:
+            yield self.connection
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Drop the broken connection so the next call reconnects
+            if self.connection and self.connection.closed:
+                self.connection = None
+            raise
+    
+    def _cursor_factory(self, operation: str, lean: bool = False, read_only: bool = False):
+        base = psycopg2.extensions.cursor if lean else RealDictCursor
+        if self.metrics is None:
+            return base
+        return self.metrics.cursor_factory(operation, base, read_only)
+    
+    @contextmanager
+    def cursor(self, operation: str = 'query', lean: bool = False, read_only: bool = False):
+        """Dictionary cursor on a checked-out connection, closed on exit.
+
+        ``operation`` labels the cursor's statements in query metrics.
+        ``lean=True`` gives a plain tuple cursor instead. ``read_only=True``
+        promises the statements have no side effects, so slow ones may be
+        EXPLAINed.
+        """
+        with self.connection_scope() as connection:
+            cursor = connection.cursor(cursor_factory=self._cursor_factory(operation, lean, read_only))
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+    
+    def _read(self, operation: str, fetch, sticky_key: str = None, lean: bool = False):
+        """Run ``fetch(cursor)`` on a replica when one is usable, else on the primary.
+
+        A replica that fails mid-read is taken out of rotation and the read
+        is retried on the primary. Inside ``transaction()`` reads stay on the
+        transaction's connection.
+        """
+        replica = None
+        if self.replicas and getattr(self._local, 'transaction', None) is None:
+            replica = self.replicas.pick(sticky_key)
+        if replica is not None:
+            try:
+                with replica.pool.connection() as connection:
+                    cursor = connection.cursor(cursor_factory=self._cursor_factory(operation, lean, read_only=True))
+                    try:
+                        return fetch(cursor)
+                    finally:
+                        cursor.close()
+            except REPLICA_ERRORS as e:
+                self.replicas.mark_down(replica, e)
+        with self.cursor(operation, lean, read_only=True) as cursor:
+            return fetch(cursor)
+    
+    def _stick(self, *keys: str):
+        """Read-your-writes: keep reads for these users/sessions on the primary for a while"""
+        if self.replicas:
+            self.replicas.stick(*keys)
+    
+    def _execute(self, cursor, name: str, sql: str, params=None):
+        """cursor.execute, as prepared statement ``name`` when they are enabled"""
+        if self.prepared is None:
+            cursor.execute(sql, params)
+        else:
+            self.prepared.execute(cursor, name, sql, params or ())
+    
+    @contextmanager
+    def dedicated_connection(self):
+        """A connection no other caller uses for the duration of the block.
+
+        Needed for work that changes session state (transactions, server-side
+        cursors). In single-connection mode a short-lived extra connection is
+        opened so the shared one is never left inside a transaction.
+        """
+        if self.pool:
+            with self.pool.connection() as connection:
+                yield connection
+            return
+        
+        connection = psycopg2.connect(**self.connection_params)
+        connection.autocommit = True
+        try:
+            yield connection
+        finally:
+            connection.close()
+    
+    @contextmanager
+    def transaction(self):
+        """Run every handler call in the block in one database transaction.
+
+        Commits when the block exits normally and rolls back if it raises.
+        Handler methods report errors by returning None, so a statement that
+        failed inside the block also forces a rollback and raises
+        ``InFailedSqlTransaction`` at exit. Nested blocks become savepoints.
+        Cache invalidations are held back until the outermost commit so other
+        readers cannot re-cache rows that are not yet visible.
+        """
+        state = getattr(self._local, 'transaction', None)
+        if state is not None:
+            yield from self._savepoint(state)
+            return
+
+        with self.dedicated_connection() as connection:
+            connection.autocommit = False
+            state = {'connection': connection, 'invalidations': [], 'depth': 0}
+            self._local.transaction = state
+            try:
+                yield connection
+                if connection.get_transaction_status() == TRANSACTION_STATUS_INERROR:
+                    raise psycopg2.errors.InFailedSqlTransaction(
+                        "A statement failed inside the transaction; rolled back")
+                connection.commit()
+            except BaseException:
+                if not connection.closed:
+                    connection.rollback()
+                raise
+            finally:
+                self._local.transaction = None
+                if not connection.closed:
+                    connection.autocommit = True
+        
+        for invalidate, args in state['invalidations']:
+            invalidate(*args)
+    
+    def _savepoint(self, state: Dict[str, Any]):
+        connection = state['connection']
+        state['depth'] += 1
+        name = f"sp_{state['depth']}"
+        invalidations = len(state['invalidations'])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SAVEPOINT {name}")
+        try:
+            yield connection
+            if connection.get_transaction_status() == TRANSACTION_STATUS_INERROR:
+                raise psycopg2.errors.InFailedSqlTransaction(
+                    "A statement failed inside the savepoint; rolled back to it")
+            with connection.cursor() as cursor:
+                cursor.execute(f"RELEASE SAVEPOINT {name}")
+        except BaseException:
+            if not connection.closed:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+                del state['invalidations'][invalidations:]
+            raise
+        finally:
+            state['depth'] -= 1
+    
     def get_cursor(self):
-        """Get database cursor with dictionary support"""
-        if not self.connection:
+        """Get database cursor with dictionary support (single-connection mode only)"""
+        if self.pool:
+            raise RuntimeError("get_cursor() is not available in pooled mode; use cursor()")
+        if not self.connection or self.connection.closed:
             if not self.connect():
                 return None
         return self.connection.cursor(cursor_factory=RealDictCursor)
     
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool usage stats"""
+        if not self.pool:
+            connected = bool(self.connection and not self.connection.closed)
+            return {'pooled': False, 'size': int(connected), 'in_use': 0, 'waiting': 0}
+        return {'pooled': True, **self.pool.stats()}
+    
+    def get_replica_stats(self) -> Dict[str, Any]:
+        """Get read routing counters and replica health"""
+        if self.replicas is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.replicas.stats()}
+    
+    def get_prepared_stats(self) -> Dict[str, Any]:
+        """Get prepared statement prepare/execute counters"""
+        if self.prepared is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.prepared.stats()}
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get read cache hit/miss/eviction counters"""
+        if self.cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.cache.stats()}
+    
+    # =========================
+    # READ CACHE
+    # =========================
+    
+    def _cache_get(self, *key):
+        return self.cache.get(key) if self.cache is not None else MISSING
+    
+    def _cache_set(self, value, *key):
+        if self.cache is not None:
+            self.cache.set(key, value)
+    
+    def _defer_invalidation(self, invalidate, *args) -> bool:
+        # Inside transaction(): replay after commit, drop on rollback
+        state = getattr(self._local, 'transaction', None)
+        if state is None:
+            return False
+        state['invalidations'].append((invalidate, args))
+        return True
+    
+    def invalidate_cache(self, namespace: str, *key):
+        """Drop cached reads here and, with cache_notify, in every other worker"""
+        if self.cache is None:
+            return
+        if self._defer_invalidation(self.invalidate_cache, namespace, *key):
+            return
+        self.cache.invalidate(namespace, *key)
+        if self.cache_notify:
+            try:
+                with self.cursor('invalidate_cache') as cursor:
+                    cursor.execute("SELECT pg_notify(%s, %s)",
+                                   (NOTIFY_CHANNEL, notify_payload(namespace, *key)))
+            except psycopg2.Error as e:
+                print(f"❌ Error publishing cache invalidation: {e}")
+    
+    def invalidate_cache_many(self, namespace: str, keys: List[str]):
+        """invalidate_cache for many keys with a single NOTIFY round trip"""
+        if self.cache is None or not keys:
+            return
+        if self._defer_invalidation(self.invalidate_cache_many, namespace, keys):
+            return
+        for key in keys:
+            self.cache.invalidate(namespace, key)
+        if self.cache_notify:
+            try:
+                with self.cursor('invalidate_cache_many') as cursor:
+                    cursor.execute("SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+                                   (NOTIFY_CHANNEL, [notify_payload(namespace, key) for key in keys]))
+            except psycopg2.Error as e:
+                print(f"❌ Error publishing cache invalidation: {e}")
+    
     # =========================
     # USER MANAGEMENT
     # =========================
@@ -51,19 +411,21 @@ class DatabaseHandler:
         """Create a new user and return user_id"""
         try:
             # Hash password
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            password_hash = self.password_hasher.hash(password)
             user_id = str(uuid.uuid4())
             
-            cursor = self.get_cursor()
-            cursor.execute("""
-                INSERT INTO users (user_id, email, password_hash, first_name, last_name, role, email_verified)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                RETURNING user_id
-            """, (user_id, email, password_hash, first_name, last_name, role, True))
+            with self.cursor('create_user') as cursor:
+                cursor.execute("""
+                    INSERT INTO users (user_id, email, password_hash, first_name, last_name, role, email_verified)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    RETURNING user_id
+                """, (user_id, email, password_hash, first_name, last_name, role, True))
             
-            result = cursor.fetchone()
-            cursor.close()
+                result = cursor.fetchone()
             
+            if result:
+                self._stick(result['user_id'])
+                self.invalidate_cache('user', result['user_id'])
             print(f"✅ User created: {email}")
             return result['user_id'] if result else None
             
@@ -77,28 +439,36 @@ class DatabaseHandler:
     def authenticate_user(self, email: str, password: str) -> Optional[Dict]:
         """Authenticate user and return user info"""
         try:
-            cursor = self.get_cursor()
-            cursor.execute("""
-                SELECT user_id, email, password_hash, first_name, last_name, role, status
-                FROM users 
-                WHERE email = %s AND status = 'active'
-            """, (email,))
+            with self.cursor('authenticate_user') as cursor:
+                self._execute(cursor, 'authenticate_user', """
+                    SELECT user_id, email, password_hash, first_name, last_name, role, status
+                    FROM users 
+                    WHERE email = %s AND status = 'active'
+                """, (email,))
             
-            user = cursor.fetchone()
-            cursor.close()
+                user = cursor.fetchone()
             
             if not user:
                 print("❌ User not found or inactive")
                 return None
             
             # Verify password
-            if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
-                # Update last login
-                self.update_last_login(user['user_id'])
+            if self.password_hasher.verify(password, user['password_hash']):
+                # Upgrade hashes made with an old cost factor
+                new_hash = self._upgraded_hash(password, user['password_hash'])
+                
+                # Update last login (write-behind when buffered); an upgraded
+                # hash is written in the same statement
+                if self.last_login_buffer and not new_hash:
+                    self.last_login_buffer.touch(user['user_id'])
+                    user_dict = dict(user)
+                    del user_dict['password_hash']
+                else:
+                    user_dict = self._record_login(user['user_id'], user['password_hash'], new_hash)
+                    if not user_dict:
+                        print("❌ Password changed or user deactivated during login")
+                        return None
                 
-                # Return user info without password hash
-                user_dict = dict(user)
-                del user_dict['password_hash']
                 print(f"✅ User authenticated: {email}")
                 return user_dict
             else:
@@ -109,33 +479,93 @@ class DatabaseHandler:
             print(f"❌ Error authenticating user: {e}")
             return None
     
+    def _record_login(self, user_id: str, verified_hash: str, new_hash: str = None) -> Optional[Dict]:
+        """Stamp last_login (and store ``new_hash``) if ``verified_hash`` is still current.
+
+        The password was verified without holding a connection, so the write
+        is conditional on the hash and status it was verified against and
+        returns the user as of that write; None means the login lost a race
+        with a password change or deactivation.
+        """
+        with self.cursor('record_login') as cursor:
+            self._execute(cursor, 'record_login', """
+                UPDATE users 
+                SET last_login = NOW(),
+                    password_hash = COALESCE(%s, password_hash)
+                WHERE user_id = %s AND password_hash = %s AND status = 'active'
+                RETURNING user_id, email, first_name, last_name, role, status
+            """, (new_hash, user_id, verified_hash))
+            user = cursor.fetchone()
+        if not user:
+            return None
+        self._stick(user_id)
+        self.invalidate_cache('user', user_id)
+        return dict(user)
+    
+    def _upgraded_hash(self, password: str, password_hash: str) -> Optional[str]:
+        """New hash of a verified password if its cost factor is outdated"""
+        if not self.password_hasher.needs_rehash(password_hash):
+            return None
+        try:
+            return self.password_hasher.hash(password)
+        except PasswordQueueFull:
+            # Best effort: the old hash still verifies, retry on a later login
+            return None
+    
     def update_last_login(self, user_id: str):
         """Update user's last login timestamp"""
         try:
-            cursor = self.get_cursor()
-            cursor.execute("""
-                UPDATE users 
-                SET last_login = NOW() 
-                WHERE user_id = %s
-            """, (user_id,))
-            cursor.close()
+            with self.cursor('update_last_login') as cursor:
+                self._execute(cursor, 'update_last_login', """
+                    UPDATE users 
+                    SET last_login = NOW() 
+                    WHERE user_id = %s
+                """, (user_id,))
+            self._stick(user_id)
+            self.invalidate_cache('user', user_id)
         except psycopg2.Error as e:
             print(f"❌ Error updating last login: {e}")
     
+    def update_last_logins(self, logins: Dict[str, datetime]) -> bool:
+        """Bulk-apply buffered last_login timestamps ({user_id: logged_in_at})"""
+        if not logins:
+            return True
+        try:
+            with self.cursor('update_last_logins') as cursor:
+                execute_values(cursor, """
+                    UPDATE users u
+                    SET last_login = GREATEST(u.last_login, v.last_login)
+                    FROM (VALUES %s) AS v(user_id, last_login)
+                    WHERE u.user_id = v.user_id
+                """, list(logins.items()), template="(%s::uuid, %s::timestamptz)", page_size=len(logins))
+            self._stick(*logins)
+            self.invalidate_cache_many('user', list(logins))
+            return True
+        except psycopg2.Error as e:
+            print(f"❌ Error updating last logins: {e}")
+            return False
+    
     def get_user_by_id(self, user_id: str) -> Optional[Dict]:
         """Get user information by user_id"""
+        cached = self._cache_get('user', user_id)
+        if cached is not MISSING:
+            return cached
         try:
-            cursor = self.get_cursor()
-            cursor.execute("""
-                SELECT user_id, email, first_name, last_name, role, status, created_at, last_login
-                FROM users 
-                WHERE user_id = %s
-            """, (user_id,))
+            def fetch(cursor):
+                self._execute(cursor, 'get_user_by_id', """
+                    SELECT user_id, email, first_name, last_name, role, status, created_at, last_login
+                    FROM users 
+                    WHERE user_id = %s
+                """, (user_id,))
+                return cursor.fetchone()
             
-            user = cursor.fetchone()
-            cursor.close()
+            user = self._read('get_user_by_id', fetch, sticky_key=user_id)
             
-            return dict(user) if user else None
+            if not user:
+                return None
+            user = dict(user)
+            self._cache_set(user, 'user', user_id)
+            return user
             
         except psycopg2.Error as e:
             print(f"❌ Error getting user: {e}")
@@ -151,24 +581,25 @@ class DatabaseHandler:
         try:
             project_id = str(uuid.uuid4())
             
-            cursor = self.get_cursor()
-            cursor.execute("""
-                INSERT INTO projects (project_id, name, description, created_by_user_id, is_private)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING project_id
-            """, (project_id, name, description, created_by_user_id, is_private))
-            
-            result = cursor.fetchone()
-            
-            # Add creator as owner
-            if result:
+            # Project and owner membership in one atomic statement
+            with self.cursor('create_project') as cursor:
                 cursor.execute("""
-                    INSERT INTO project_members (project_id, user_id, role)
-                    VALUES (%s, %s, 'owner')
-                """, (result['project_id'], created_by_user_id))
+                    WITH project AS (
+                        INSERT INTO projects (project_id, name, description, created_by_user_id, is_private)
+                        VALUES (%s, %s, %s, %s, %s)
+                        RETURNING project_id, created_by_user_id
+                    ), owner AS (
+                        INSERT INTO project_members (project_id, user_id, role)
+                        SELECT project_id, created_by_user_id, 'owner' FROM project
+                    )
+                    SELECT project_id FROM project
+                """, (project_id, name, description, created_by_user_id, is_private))
             
-            cursor.close()
+                result = cursor.fetchone()
             
+            if result:
+                self._stick(created_by_user_id)
+                self.invalidate_cache('user_projects', created_by_user_id)
             print(f"✅ Project created: {name}")
             return result['project_id'] if result else None
             
@@ -178,23 +609,28 @@ class DatabaseHandler:
     
     def get_user_projects(self, user_id: str) -> List[Dict]:
         """Get all projects for a user"""
+        cached = self._cache_get('user_projects', user_id)
+        if cached is not MISSING:
+            return cached
         try:
-            cursor = self.get_cursor()
-            cursor.execute("""
-                SELECT p.project_id, p.name, p.description, p.is_private, p.created_at,
-                       pm.role as member_role,
-                       u.first_name || ' ' || u.last_name as created_by_name
-                FROM projects p
-                JOIN project_members pm ON p.project_id = pm.project_id
-                LEFT JOIN users u ON p.created_by_user_id = u.user_id
-                WHERE pm.user_id = %s
-                ORDER BY p.created_at DESC
-            """, (user_id,))
+            def fetch(cursor):
+                self._execute(cursor, 'get_user_projects', """
+                    SELECT p.project_id, p.name, p.description, p.is_private, p.created_at,
+                           pm.role as member_role,
+                           u.first_name || ' ' || u.last_name as created_by_name
+                    FROM projects p
+                    JOIN project_members pm ON p.project_id = pm.project_id
+                    LEFT JOIN users u ON p.created_by_user_id = u.user_id
+                    WHERE pm.user_id = %s
+                    ORDER BY p.created_at DESC
+                """, (user_id,))
+                return cursor.fetchall()
             
-            projects = cursor.fetchall()
-            cursor.close()
+            projects = self._read('get_user_projects', fetch, sticky_key=user_id)
             
-            return [dict(project) for project in projects]
+            projects = [dict(project) for project in projects]
+            self._cache_set(projects, 'user_projects', user_id)
+            return projects
             
         except psycopg2.Error as e:
             print(f"❌ Error getting user projects: {e}")
@@ -210,16 +646,17 @@ class DatabaseHandler:
         try:
             session_id = str(uuid.uuid4())
             
-            cursor = self.get_cursor()
-            cursor.execute("""
-                INSERT INTO chat_sessions (session_id, user_id, project_id, title, model_id)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING session_id
-            """, (session_id, user_id, project_id, title, model_id))
+            with self.cursor('create_chat_session') as cursor:
+                self._execute(cursor, 'create_chat_session', """
+                    INSERT INTO chat_sessions (session_id, user_id, project_id, title, model_id)
+                    VALUES (%s, %s, %s, %s, %s)
+                    RETURNING session_id
+                """, (session_id, user_id, project_id, title, model_id))
             
-            result = cursor.fetchone()
-            cursor.close()
+                result = cursor.fetchone()
             
+            if result:
+                self._stick(user_id, result['session_id'])
             print(f"✅ Chat session created: {session_id}")
             return result['session_id'] if result else None
             
@@ -227,68 +664,275 @@ class DatabaseHandler:
             print(f"❌ Error creating chat session: {e}")
             return None
     
+    def get_chat_session(self, session_id: str) -> Optional[Dict]:
+        """Get a chat session's owner, project and title"""
+        try:
+            def fetch(cursor):
+                cursor.execute("""
+                    SELECT session_id, user_id, project_id, title, status, created_at
+                    FROM chat_sessions
+                    WHERE session_id = %s
+                """, (session_id,))
+                return cursor.fetchone()
+            
+            session = self._read('get_chat_session', fetch, sticky_key=session_id)
+            return dict(session) if session else None
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error getting chat session: {e}")
+            return None
+    
     def add_chat_message(self, session_id: str, role: str, content: str, 
                         metadata: Dict = None) -> Optional[str]:
         """Add a message to chat session"""
         try:
             message_id = str(uuid.uuid4())
             
-            cursor = self.get_cursor()
-            cursor.execute("""
-                INSERT INTO chat_messages (message_id, session_id, role, content, metadata)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING message_id
-            """, (message_id, session_id, role, content, json.dumps(metadata) if metadata else None))
+            # Insert and bump the session counters in one statement
+            with self.cursor('add_chat_message') as cursor:
+                self._execute(cursor, 'add_chat_message', """
+                    WITH inserted AS (
+                        INSERT INTO chat_messages (message_id, session_id, role, content, metadata)
+                        VALUES (%s, %s, %s, %s, %s)
+                        RETURNING message_id, session_id, created_at
+                    ), counted AS (
+                        UPDATE chat_sessions cs
+                        SET message_count = cs.message_count + 1,
+                            last_message_at = GREATEST(cs.last_message_at, inserted.created_at),
+                            updated_at = NOW()
+                        FROM inserted
+                        WHERE cs.session_id = inserted.session_id
+                        RETURNING cs.user_id
+                    )
+                    SELECT message_id, (SELECT user_id FROM counted) AS user_id FROM inserted
+                """, (message_id, session_id, role, content, json.dumps(metadata) if metadata else None))
             
-            result = cursor.fetchone()
-            cursor.close()
+                result = cursor.fetchone()
             
+            if result:
+                self._stick(session_id, result['user_id'])
             return result['message_id'] if result else None
             
         except psycopg2.Error as e:
             print(f"❌ Error adding chat message: {e}")
             return None
     
-    def get_chat_messages(self, session_id: str, limit: int = 50) -> List[Dict]:
-        """Get chat messages for a session"""
+    def add_chat_messages(self, session_id: str, messages: List[Dict]) -> Optional[List[str]]:
+        """Add many messages to a chat session in one atomic statement.
+
+        ``messages`` are dicts with ``role``, ``content`` and optional
+        ``metadata``. Returns the new message_ids in input order, or None if
+        nothing was written.
+        """
+        if not messages:
+            return []
         try:
-            cursor = self.get_cursor()
-            cursor.execute("""
-                SELECT message_id, role, content, metadata, created_at
-                FROM chat_messages 
-                WHERE session_id = %s
-                ORDER BY created_at ASC
-                LIMIT %s
-            """, (session_id, limit))
+            message_ids = [str(uuid.uuid4()) for _ in messages]
+            # Offset created_at by the row position so the batch keeps its order
+            rows = [
+                (message_id, session_id, message['role'], message['content'],
+                 json.dumps(message['metadata']) if message.get('metadata') else None, position)
+                for position, (message_id, message) in enumerate(zip(message_ids, messages))
+            ]
             
-            messages = cursor.fetchall()
-            cursor.close()
+            with self.cursor('add_chat_messages') as cursor:
+                owners = execute_values(cursor, """
+                    WITH inserted AS (
+                        INSERT INTO chat_messages (message_id, session_id, role, content, metadata, created_at)
+                        VALUES %s
+                        RETURNING session_id, created_at
+                    )
+                    UPDATE chat_sessions cs
+                    SET message_count = cs.message_count + batch.added,
+                        last_message_at = GREATEST(cs.last_message_at, batch.last_at),
+                        updated_at = NOW()
+                    FROM (
+                        SELECT session_id, COUNT(*) AS added, MAX(created_at) AS last_at
+                        FROM inserted
+                        GROUP BY session_id
+                    ) batch
+                    WHERE cs.session_id = batch.session_id
+                    RETURNING cs.user_id
+                """, rows,
+                    template="(%s, %s, %s, %s, %s, NOW() + %s * INTERVAL '1 microsecond')",
+                    page_size=len(rows), fetch=True)
             
-            return [dict(message) for message in messages]
+            self._stick(session_id, *(row['user_id'] for row in owners))
+            return message_ids
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error adding chat messages: {e}")
+            return None
+    
+    def update_message_content(self, message_id: str, content: str, metadata: Dict = None) -> bool:
+        """Replace a message's content and merge ``metadata`` into its metadata.
+
+        Used to persist a reply while it is still being generated, so the
+        row is rewritten whole; callers coalesce updates rather than write
+        per token. While metadata.status is 'streaming' the generated
+        search_vector stays empty (migration 0008), so these rewrites add no
+        GIN entries and can be HOT updates; the write that sets the final
+        status indexes the text once.
+        """
+        try:
+            with self.cursor('update_message_content') as cursor:
+                self._execute(cursor, 'update_message_content', """
+                    UPDATE chat_messages
+                    SET content = %s,
+                        metadata = COALESCE(metadata, '{}'::jsonb) || COALESCE(%s::jsonb, '{}'::jsonb)
+                    WHERE message_id = %s
+                    RETURNING session_id
+                """, (content, json.dumps(metadata) if metadata else None, message_id))
+            
+                result = cursor.fetchone()
+            
+            if result:
+                self._stick(result['session_id'])
+            return result is not None
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error updating message content: {e}")
+            return False
+    
+    def get_chat_messages(self, session_id: str, limit: int = 50) -> List[Dict]:
+        """Get the oldest chat messages for a session"""
+        return self.get_chat_messages_page(session_id, limit=limit)['messages']
+    
+    def get_chat_messages_page(self, session_id: str, limit: int = 50, cursor: str = None,
+                               latest: bool = False, lean: bool = False) -> Dict:
+        """Get one page of chat messages using keyset pagination.
+
+        Without a cursor the page starts at the oldest message, or at the
+        newest with ``latest=True``. Pass ``older_cursor``/``newer_cursor``
+        from a previous page to move in that direction. Messages in a page
+        are always in chronological order. Raises ValueError on a bad cursor.
+        
+        With ``lean=True`` messages are ``MessageRecord``s whose metadata is
+        the raw JSON text, ready for ``LeanJSONResponse``.
+        
+        Messages of archived partitions are read back from the archive files
+        where the page reaches past the session's oldest hot message.
+        """
+        key = None
+        if cursor:
+            direction, created_at, message_id = decode_cursor(cursor)
+            key = (created_at, message_id)
+        else:
+            direction = OLDER if latest else NEWER
+        
+        if direction == NEWER:
+            keyset, order = "AND (created_at, message_id) > (%s, %s)", "ASC"
+        else:
+            keyset, order = "AND (created_at, message_id) < (%s, %s)", "DESC"
+        params = [session_id] + (list(key) if key else []) + [limit + 1]
+        
+        columns = MESSAGE_COLUMNS if lean else "message_id, role, content, metadata, created_at"
+        name = f"get_chat_messages_page_{direction}{'_keyset' if key else ''}{'_lean' if lean else ''}"
+        
+        try:
+            def fetch(db_cursor):
+                self._execute(db_cursor, name, f"""
+                    SELECT {columns}
+                    FROM chat_messages 
+                    WHERE session_id = %s {keyset if key else ''}
+                    ORDER BY created_at {order}, message_id {order}
+                    LIMIT %s
+                """, params)
+                rows = db_cursor.fetchall()
+                # Archived messages are older than all hot ones: reading forwards
+                # they may come first, reading backwards only once hot rows run out
+                segments = []
+                if direction == NEWER or len(rows) <= limit:
+                    segments = self._archived_segments(db_cursor, session_id, direction, key)
+                return rows, segments
+            
+            messages, segments = self._read('get_chat_messages_page', fetch, sticky_key=session_id, lean=lean)
             
         except psycopg2.Error as e:
             print(f"❌ Error getting chat messages: {e}")
-            return []
+            messages, segments = [], []
+        
+        if lean:
+            messages = message_records(messages)
+            boundary = lambda message: (message.created_at, message.message_id)
+        else:
+            messages = [dict(message) for message in messages]
+            boundary = lambda message: (message['created_at'], message['message_id'])
+        if segments:
+            try:
+                archived = archived_messages(segments, direction, key, limit + 1, lean)
+            except OSError as e:
+                print(f"❌ Error reading archived chat messages: {e}")
+                archived = []
+            messages = (archived + messages if direction == NEWER else messages + archived)[:limit + 1]
+        
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        if direction == OLDER:
+            messages.reverse()
+        
+        # A cursor was given, so rows exist on its other side
+        more_older = has_more if direction == OLDER else bool(key)
+        more_newer = has_more if direction == NEWER else bool(key)
+        first, last = (messages[0], messages[-1]) if messages else (None, None)
+        return {
+            'messages': messages,
+            'older_cursor': encode_cursor(OLDER, *boundary(first)) if first and more_older else None,
+            'newer_cursor': encode_cursor(NEWER, *boundary(last)) if last and more_newer else None,
+        }
+    
+    def iter_chat_messages(self, session_id: str, batch_size: int = 1000,
+                           lean: bool = False) -> Iterator[Dict]:
+        """Stream every message of a session in order through a server-side cursor.
+
+        Only ``batch_size`` rows are held in memory at a time. The generator
+        keeps a connection checked out until it is exhausted or closed.
+        ``lean=True`` yields ``MessageRecord``s instead of dicts. Archived
+        messages come first, read back one archive segment at a time.
+        """
+        columns = MESSAGE_COLUMNS if lean else "message_id, role, content, metadata, created_at"
+        with self.dedicated_connection() as connection:
+            connection.autocommit = False
+            try:
+                with connection.cursor(cursor_factory=self._cursor_factory('iter_chat_messages', lean)) as db_cursor:
+                    segments = self._archived_segments(db_cursor, session_id, NEWER, None)
+                yield from iter_archived_messages(segments, lean)
+                with connection.cursor(name=f"export_{uuid.uuid4().hex}",
+                                       cursor_factory=self._cursor_factory('iter_chat_messages', lean)) as db_cursor:
+                    db_cursor.itersize = batch_size
+                    db_cursor.execute(f"""
+                        SELECT {columns}
+                        FROM chat_messages 
+                        WHERE session_id = %s
+                        ORDER BY created_at ASC, message_id ASC
+                    """, (session_id,))
+                    if lean:
+                        yield from map(message_record, db_cursor)
+                    else:
+                        yield from db_cursor
+                connection.commit()
+            finally:
+                if not connection.closed:
+                    connection.rollback()
+                    connection.autocommit = True
     
     def get_user_chat_sessions(self, user_id: str, limit: int = 20) -> List[Dict]:
-        """Get user's chat sessions"""
-        try:
-            cursor = self.get_cursor()
-            cursor.execute("""
-                SELECT cs.session_id, cs.title, cs.status, cs.created_at, cs.updated_at,
-                       p.name as project_name,
-                       COUNT(cm.message_id) as message_count
-                FROM chat_sessions cs
-                LEFT JOIN projects p ON cs.project_id = p.project_id
-                LEFT JOIN chat_messages cm ON cs.session_id = cm.session_id
-                WHERE cs.user_id = %s AND cs.status = 'active'
-                GROUP BY cs.session_id, cs.title, cs.status, cs.created_at, cs.updated_at, p.name
-                ORDER BY cs.updated_at DESC
-                LIMIT %s
-            """, (user_id, limit))
-            
-            sessions = cursor.fetchall()
-            cursor.close()
+        """Get user's chat sessions with their denormalized message counters"""
+        try:
+            def fetch(cursor):
+                self._execute(cursor, 'get_user_chat_sessions', """
+                    SELECT cs.session_id, cs.title, cs.status, cs.created_at, cs.updated_at,
+                           p.name as project_name,
+                           cs.message_count, cs.last_message_at
+                    FROM chat_sessions cs
+                    LEFT JOIN projects p ON cs.project_id = p.project_id
+                    WHERE cs.user_id = %s AND cs.status = 'active'
+                    ORDER BY cs.updated_at DESC
+                    LIMIT %s
+                """, (user_id, limit))
+                return cursor.fetchall()
+            
+            sessions = self._read('get_user_chat_sessions', fetch, sticky_key=user_id)
             
             return [dict(session) for session in sessions]
             
@@ -296,25 +940,674 @@ class DatabaseHandler:
             print(f"❌ Error getting chat sessions: {e}")
             return []
     
+    def repair_session_counters(self, session_id: str = None) -> Optional[int]:
+        """Rebuild message_count/last_message_at from chat_messages and the archive index.
+
+        Repairs one session, or every session when ``session_id`` is None.
+        Returns the number of sessions updated.
+        """
+        try:
+            with self.cursor('repair_session_counters') as cursor:
+                cursor.execute(f"""
+                    UPDATE chat_sessions cs
+                    SET message_count = COALESCE(totals.message_count, 0),
+                        last_message_at = totals.last_message_at
+                    FROM chat_sessions target
+                    LEFT JOIN (
+                        SELECT session_id, SUM(message_count) AS message_count, MAX(last_message_at) AS last_message_at
+                        FROM (
+                            SELECT session_id, COUNT(*) AS message_count, MAX(created_at) AS last_message_at
+                            FROM chat_messages
+                            {'WHERE session_id = %(session_id)s' if session_id else ''}
+                            GROUP BY session_id
+                            UNION ALL
+                            SELECT session_id, message_count, last_created_at
+                            FROM chat_message_archive_segments
+                            {'WHERE session_id = %(session_id)s' if session_id else ''}
+                        ) counted
+                        GROUP BY session_id
+                    ) totals ON totals.session_id = target.session_id
+                    WHERE cs.session_id = target.session_id
+                      {'AND target.session_id = %(session_id)s' if session_id else ''}
+                      AND (cs.message_count IS DISTINCT FROM COALESCE(totals.message_count, 0)
+                           OR cs.last_message_at IS DISTINCT FROM totals.last_message_at)
+                """, {'session_id': session_id})
+                repaired = cursor.rowcount
+            
+            print(f"✅ Session counters repaired: {repaired}")
+            return repaired
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error repairing session counters: {e}")
+            return None
+    
+    def get_session_summary(self, session_id: str) -> Optional[Dict]:
+        """Get the rolling summary of a session's older messages and the position it covers"""
+        try:
+            # Primary only: each turn reads the summary the previous turn saved
+            with self.cursor('get_session_summary') as cursor:
+                self._execute(cursor, 'get_session_summary', """
+                    SELECT summary, covered_created_at, covered_message_id, covered_count, token_count, model
+                    FROM chat_session_summaries
+                    WHERE session_id = %s
+                """, (session_id,))
+            
+                summary = cursor.fetchone()
+            
+            return dict(summary) if summary else None
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error getting session summary: {e}")
+            return None
+    
+    def save_session_summary(self, session_id: str, summary: str, covered_created_at: datetime,
+                             covered_message_id: str, covered_count: int, token_count: int,
+                             model: str) -> bool:
+        """Store a session summary if it covers more than the stored one.
+
+        Returns False when a concurrent builder already saved a summary
+        reaching at least as far, in which case that one is kept.
+        """
+        try:
+            with self.cursor('save_session_summary') as cursor:
+                self._execute(cursor, 'save_session_summary', """
+                    INSERT INTO chat_session_summaries
+                        (session_id, summary, covered_created_at, covered_message_id, covered_count, token_count, model)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (session_id) DO UPDATE
+                    SET summary = EXCLUDED.summary,
+                        covered_created_at = EXCLUDED.covered_created_at,
+                        covered_message_id = EXCLUDED.covered_message_id,
+                        covered_count = EXCLUDED.covered_count,
+                        token_count = EXCLUDED.token_count,
+                        model = EXCLUDED.model,
+                        updated_at = NOW()
+                    WHERE (chat_session_summaries.covered_created_at, chat_session_summaries.covered_message_id)
+                        < (EXCLUDED.covered_created_at, EXCLUDED.covered_message_id)
+                """, (session_id, summary, covered_created_at, covered_message_id, covered_count,
+                      token_count, model))
+                return cursor.rowcount == 1
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error saving session summary: {e}")
+            return False
+    
+    # =========================
+    # MESSAGE PARTITIONS
+    # =========================
+    
+    def _archived_segments(self, db_cursor, session_id: str, direction: str = NEWER,
+                           key=None) -> List[tuple]:
+        """(path, byte_offset, byte_length) of a session's archive segments past ``key``, oldest first"""
+        if key is None:
+            keyset = ""
+        elif direction == NEWER:
+            keyset = "AND s.last_created_at >= %s"
+        else:
+            keyset = "AND s.first_created_at <= %s"
+        self._execute(db_cursor, f"get_archived_segments{'_' + direction if key else ''}", f"""
+            SELECT a.path, s.byte_offset, s.byte_length
+            FROM chat_message_archive_segments s
+            JOIN chat_message_archives a ON a.partition_name = s.partition_name
+            WHERE s.session_id = %s {keyset}
+            ORDER BY s.first_created_at
+        """, [session_id] + ([key[0]] if key else []))
+        # Plain tuples from either cursor type
+        return [tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in db_cursor.fetchall()]
+    
+    def ensure_message_partitions(self, months_ahead: int = 3, lock_timeout: str = '5s') -> Optional[List[str]]:
+        """Create monthly chat_messages partitions from this month through ``months_ahead`` months ahead.
+
+        Returns the names of the partitions created (usually none).
+        """
+        try:
+            with self.transaction():
+                with self.cursor('ensure_message_partitions') as cursor:
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_ID,))
+                    # Creating a partition briefly locks chat_messages; do not queue behind long reads
+                    cursor.execute("SELECT set_config('lock_timeout', %s, true)", (lock_timeout,))
+                    cursor.execute("""
+                        SELECT partition_name FROM (
+                            SELECT create_chat_messages_partition(month) AS partition_name
+                            FROM generate_series(
+                                date_trunc('month', NOW() AT TIME ZONE 'UTC'),
+                                date_trunc('month', NOW() AT TIME ZONE 'UTC') + %s * INTERVAL '1 month',
+                                INTERVAL '1 month'
+                            ) AS month
+                        ) created
+                        WHERE partition_name IS NOT NULL
+                    """, (months_ahead,))
+                    created = [row['partition_name'] for row in cursor.fetchall()]
+            
+            if created:
+                print(f"✅ Message partitions created: {', '.join(created)}")
+            return created
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error creating message partitions: {e}")
+            return None
+    
+    def get_message_partitions(self) -> List[Dict]:
+        """Attached chat_messages partitions, oldest first, with row estimates and sizes"""
+        try:
+            with self.cursor('get_message_partitions') as cursor:
+                cursor.execute("""
+                    SELECT c.relname AS partition_name,
+                           GREATEST(c.reltuples, 0)::bigint AS row_estimate,
+                           pg_table_size(c.oid) AS table_bytes,
+                           pg_indexes_size(c.oid) AS index_bytes
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = 'chat_messages'::regclass
+                    ORDER BY c.relname
+                """)
+                partitions = [dict(partition) for partition in cursor.fetchall()]
+            
+            for partition in partitions:
+                try:
+                    partition['range_start'], partition['range_end'] = partition_range(partition['partition_name'])
+                except ValueError:
+                    # The default partition
+                    partition['range_start'] = partition['range_end'] = None
+            return partitions
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error getting message partitions: {e}")
+            return []
+    
+    def get_message_archives(self) -> List[Dict]:
+        """Archived chat_messages partitions, oldest first"""
+        try:
+            with self.cursor('get_message_archives') as cursor:
+                cursor.execute("""
+                    SELECT partition_name, range_start, range_end, path, message_count, session_count,
+                           size_bytes, archived_at
+                    FROM chat_message_archives
+                    ORDER BY range_start
+                """)
+                return [dict(archive) for archive in cursor.fetchall()]
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error getting message archives: {e}")
+            return []
+    
+    def archive_message_partition(self, partition_name: str, path: str, inactive_days: int = 90,
+                                  lock_timeout: str = '5s') -> Optional[Dict]:
+        """Export a monthly chat_messages partition to a gzip JSONL file at ``path``, then detach and drop it.
+
+        Rows stream from ``COPY TO`` straight into the file, one gzip member
+        per session, and the segment index is stored in the same transaction
+        as the detach. Nothing changes (``archived`` is False, with a
+        ``reason``) when another worker holds the partition lock, when a
+        session with messages in the partition had a message in the last
+        ``inactive_days`` days, or when the default partition holds rows at
+        least as old. The detach waits at most ``lock_timeout`` for reads in
+        progress on chat_messages. Callers archive partitions oldest first
+        (see PartitionMaintainer).
+        """
+        range_start, range_end = partition_range(partition_name)
+        # Safe to interpolate: partition_range only accepts chat_messages_YYYY_MM
+        table = f'"{partition_name}"'
+        temp_path = f"{path}.tmp"
+        started = time.monotonic()
+        skipped = {'partition_name': partition_name, 'archived': False}
+        try:
+            with self.transaction() as connection:
+                with self.cursor('archive_message_partition') as cursor:
+                    cursor.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked", (PARTITION_LOCK_ID,))
+                    if not cursor.fetchone()['locked']:
+                        return {**skipped, 'reason': 'locked'}
+                    
+                    cursor.execute(f"""
+                        SELECT COUNT(DISTINCT m.session_id) AS active_sessions
+                        FROM {table} m
+                        JOIN chat_sessions cs ON cs.session_id = m.session_id
+                        WHERE cs.last_message_at > NOW() - %s * INTERVAL '1 day'
+                    """, (inactive_days,))
+                    active_sessions = cursor.fetchone()['active_sessions']
+                    if active_sessions:
+                        return {**skipped, 'reason': 'active_sessions', 'active_sessions': active_sessions}
+                    cursor.execute("""
+                        SELECT EXISTS (SELECT 1 FROM chat_messages_default WHERE created_at < %s) AS stray
+                    """, (range_end,))
+                    if cursor.fetchone()['stray']:
+                        return {**skipped, 'reason': 'default_partition_rows'}
+                    
+                    with open(temp_path, 'wb') as out:
+                        writer = SegmentWriter(out)
+                        cursor.copy_expert(f"""
+                            COPY (
+                                SELECT session_id, json_build_object(
+                                    'message_id', message_id, 'session_id', session_id, 'role', role,
+                                    'content', content, 'metadata', metadata, 'created_at', created_at)
+                                FROM {table}
+                                ORDER BY session_id, created_at, message_id
+                            ) TO STDOUT WITH ({ARCHIVE_COPY_OPTIONS})
+                        """, writer)
+                        writer.close()
+                        out.flush()
+                        os.fsync(out.fileno())
+                    
+                    cursor.execute("""
+                        INSERT INTO chat_message_archives
+                            (partition_name, range_start, range_end, path, message_count, session_count, size_bytes)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    """, (partition_name, range_start, range_end, os.path.abspath(path), writer.message_count,
+                          len(writer.segments), writer.size_bytes))
+                    execute_values(cursor, """
+                        INSERT INTO chat_message_archive_segments
+                            (session_id, partition_name, byte_offset, byte_length, message_count,
+                             first_created_at, last_created_at)
+                        VALUES %s
+                    """, [(segment['session_id'], partition_name, segment['byte_offset'], segment['byte_length'],
+                           segment['message_count'], segment['first_created_at'], segment['last_created_at'])
+                          for segment in writer.segments], page_size=1000)
+                    
+                    cursor.execute("SELECT set_config('lock_timeout', %s, true)", (lock_timeout,))
+                    # DDL on a plain cursor: it cannot go through EXPLAIN-ing metrics cursors
+                    with connection.cursor() as ddl:
+                        ddl.execute(f"ALTER TABLE chat_messages DETACH PARTITION {table}")
+                    # Detached under an exclusive lock, so nothing can have been written since
+                    cursor.execute(f"SELECT COUNT(*) AS remaining FROM {table}")
+                    remaining = cursor.fetchone()['remaining']
+                    if remaining != writer.message_count:
+                        raise ArchiveError(f"{partition_name} changed while archiving: "
+                                           f"{remaining} rows, {writer.message_count} exported")
+                    with connection.cursor() as ddl:
+                        ddl.execute(f"DROP TABLE {table}")
+                    os.replace(temp_path, path)
+            
+            print(f"✅ Partition archived: {partition_name} ({writer.message_count} messages, "
+                  f"{writer.size_bytes} bytes)")
+            return {
+                'partition_name': partition_name,
+                'archived': True,
+                'path': os.path.abspath(path),
+                'message_count': writer.message_count,
+                'session_count': len(writer.segments),
+                'size_bytes': writer.size_bytes,
+                'seconds': time.monotonic() - started,
+            }
+            
+        except (psycopg2.Error, OSError, ArchiveError) as e:
+            print(f"❌ Error archiving partition {partition_name}: {e}")
+            return None
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    # =========================
+    # PROJECT DOCUMENTS
+    # =========================
+
+    def register_document(self, project_id: str, filename: str, content_hash: str,
+                          size_bytes: int, stale_after: float = 900.0) -> Optional[Dict]:
+        """Record an upload, or find the project's existing document with the same content.
+
+        Returns ``document_id``, ``status``, ``created`` (False when the
+        content hash was already known for this project) and ``reclaimed``.
+        An existing row left pending or processing with no progress for
+        ``stale_after`` seconds was abandoned by a crashed or restarted worker;
+        it is reset to pending and returned with ``reclaimed`` True, for one
+        caller only, so that caller ingests it again.
+        """
+        try:
+            with self.cursor('register_document') as cursor:
+                cursor.execute("""
+                    WITH inserted AS (
+                        INSERT INTO project_documents (document_id, project_id, filename, content_hash, size_bytes)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (project_id, content_hash) DO NOTHING
+                        RETURNING document_id, status, TRUE AS created, FALSE AS reclaimed
+                    ), reclaimed AS (
+                        UPDATE project_documents
+                        SET status = 'pending', updated_at = NOW()
+                        WHERE project_id = %s AND content_hash = %s AND NOT EXISTS (SELECT 1 FROM inserted)
+                          AND status IN ('pending', 'processing')
+                          AND updated_at < NOW() - %s * INTERVAL '1 second'
+                        RETURNING document_id, status, FALSE AS created, TRUE AS reclaimed
+                    )
+                    SELECT document_id, status, created, reclaimed FROM inserted
+                    UNION ALL
+                    SELECT document_id, status, created, reclaimed FROM reclaimed
+                    UNION ALL
+                    SELECT document_id, status, FALSE, FALSE FROM project_documents
+                    WHERE project_id = %s AND content_hash = %s
+                      AND NOT EXISTS (SELECT 1 FROM inserted) AND NOT EXISTS (SELECT 1 FROM reclaimed)
+                """, (str(uuid.uuid4()), project_id, filename, content_hash, size_bytes,
+                      project_id, content_hash, stale_after, project_id, content_hash))
+
+                result = cursor.fetchone()
+
+            if not result:
+                return None
+            self._stick(project_id, result['document_id'])
+            return dict(result)
+
+        except psycopg2.Error as e:
+            print(f"❌ Error registering document: {e}")
+            return None
+
+    def fail_stale_documents(self, stale_after: float) -> int:
+        """Mark documents pending or processing with no progress for ``stale_after`` seconds as failed.
+
+        Their ingest died with a worker and the uploaded file is gone, so
+        they cannot be resumed; as failed rows, a re-upload ingests them again.
+        """
+        try:
+            with self.cursor('fail_stale_documents') as cursor:
+                cursor.execute("""
+                    UPDATE project_documents
+                    SET status = 'failed', error = 'Interrupted: ingest stopped before finishing',
+                        finished_at = NOW(), updated_at = NOW()
+                    WHERE status IN ('pending', 'processing')
+                      AND updated_at < NOW() - %s * INTERVAL '1 second'
+                """, (stale_after,))
+                return cursor.rowcount
+
+        except psycopg2.Error as e:
+            print(f"❌ Error failing stale documents: {e}")
+            return 0
+
+    def start_document(self, document_id: str, page_count: int) -> bool:
+        """Mark a document as processing, dropping chunks left by an earlier attempt"""
+        try:
+            with self.cursor('start_document') as cursor:
+                cursor.execute("""
+                    WITH cleared AS (
+                        DELETE FROM document_chunks WHERE document_id = %s
+                    )
+                    UPDATE project_documents
+                    SET status = 'processing', page_count = %s, pages_done = 0, chunk_count = 0,
+                        error = NULL, started_at = NOW(), finished_at = NULL, updated_at = NOW()
+                    WHERE document_id = %s
+                """, (document_id, page_count, document_id))
+                started = cursor.rowcount == 1
+
+            self._stick(document_id)
+            return started
+
+        except psycopg2.Error as e:
+            print(f"❌ Error starting document: {e}")
+            return False
+
+    def add_document_chunks(self, document_id: str, chunks: List[Dict], pages_done: int) -> bool:
+        """Store ``chunks`` (page_number, chunk_index, content) and the new progress in one statement"""
+        try:
+            rows = [(document_id, chunk['page_number'], chunk['chunk_index'], chunk['content'])
+                    for chunk in chunks]
+            with self.cursor('add_document_chunks') as cursor:
+                if rows:
+                    # execute_values only fills VALUES %s, so bind the rest up front
+                    sql = cursor.mogrify("""
+                        WITH inserted AS (
+                            INSERT INTO document_chunks (document_id, page_number, chunk_index, content)
+                            VALUES %%s
+                            RETURNING document_id
+                        )
+                        UPDATE project_documents
+                        SET chunk_count = chunk_count + (SELECT COUNT(*) FROM inserted),
+                            pages_done = %s, updated_at = NOW()
+                        WHERE document_id = %s
+                    """, (pages_done, document_id))
+                    execute_values(cursor, sql, rows, page_size=len(rows))
+                else:
+                    cursor.execute("""
+                        UPDATE project_documents SET pages_done = %s, updated_at = NOW()
+                        WHERE document_id = %s
+                    """, (pages_done, document_id))
+
+            self._stick(document_id)
+            return True
+
+        except psycopg2.Error as e:
+            print(f"❌ Error adding document chunks: {e}")
+            return False
+
+    def finish_document(self, document_id: str, error: str = None) -> bool:
+        """Mark a document done, or failed with ``error``"""
+        try:
+            with self.cursor('finish_document') as cursor:
+                cursor.execute("""
+                    UPDATE project_documents
+                    SET status = %s, error = %s, finished_at = NOW(), updated_at = NOW()
+                    WHERE document_id = %s
+                """, ('failed' if error else 'done', error, document_id))
+                finished = cursor.rowcount == 1
+
+            self._stick(document_id)
+            return finished
+
+        except psycopg2.Error as e:
+            print(f"❌ Error finishing document: {e}")
+            return False
+
+    def get_document(self, document_id: str) -> Optional[Dict]:
+        """Get a document's ingest status, progress and pages/sec"""
+        try:
+            def fetch(cursor):
+                cursor.execute(f"""
+                    SELECT {DOCUMENT_COLUMNS}
+                    FROM project_documents
+                    WHERE document_id = %s
+                """, (document_id,))
+                return cursor.fetchone()
+
+            document = self._read('get_document', fetch, sticky_key=document_id)
+            return dict(document) if document else None
+
+        except psycopg2.Error as e:
+            print(f"❌ Error getting document: {e}")
+            return None
+
+    def get_project_documents(self, project_id: str) -> List[Dict]:
+        """Get all documents of a project, newest first"""
+        try:
+            def fetch(cursor):
+                cursor.execute(f"""
+                    SELECT {DOCUMENT_COLUMNS}
+                    FROM project_documents
+                    WHERE project_id = %s
+                    ORDER BY created_at DESC
+                """, (project_id,))
+                return cursor.fetchall()
+
+            documents = self._read('get_project_documents', fetch, sticky_key=project_id)
+            return [dict(document) for document in documents]
+
+        except psycopg2.Error as e:
+            print(f"❌ Error getting project documents: {e}")
+            return []
+
+    def iter_document_chunks(self, document_id: str, batch_size: int = 1000) -> Iterator[Dict]:
+        """Stream a document's chunks in page order, ``batch_size`` per query.
+
+        Each batch is a short keyset query on (page_number, chunk_index), so no
+        connection or snapshot is held while the caller works through a batch.
+        """
+        after = (0, -1)
+        while True:
+            def fetch(cursor):
+                self._execute(cursor, 'iter_document_chunks', """
+                    SELECT page_number, chunk_index, content
+                    FROM document_chunks
+                    WHERE document_id = %s AND (page_number, chunk_index) > (%s, %s)
+                    ORDER BY page_number, chunk_index
+                    LIMIT %s
+                """, (document_id, after[0], after[1], batch_size))
+                return cursor.fetchall()
+            
+            chunks = self._read('iter_document_chunks', fetch, sticky_key=document_id)
+            yield from chunks
+            if len(chunks) < batch_size:
+                return
+            after = (chunks[-1]['page_number'], chunks[-1]['chunk_index'])
+    
+    # =========================
+    # EMBEDDING CACHE
+    # =========================
+    
+    def get_cached_embeddings(self, model: str, content_hashes: List[str]) -> Dict[str, bytes]:
+        """Stored embeddings of ``model`` for the given content hashes, by hash"""
+        if not content_hashes:
+            return {}
+        try:
+            with self.cursor('get_cached_embeddings') as cursor:
+                cursor.execute("""
+                    SELECT content_hash, embedding
+                    FROM chunk_embeddings
+                    WHERE model = %s AND content_hash = ANY(%s)
+                """, (model, list(content_hashes)))
+            
+                rows = cursor.fetchall()
+            
+            return {row['content_hash']: bytes(row['embedding']) for row in rows}
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error getting cached embeddings: {e}")
+            return {}
+    
+    def store_embeddings(self, model: str, embeddings: Dict[str, bytes]) -> bool:
+        """Cache embeddings of ``model`` by content hash; existing entries are kept"""
+        if not embeddings:
+            return True
+        try:
+            rows = [(model, content_hash, psycopg2.Binary(embedding))
+                    for content_hash, embedding in embeddings.items()]
+            with self.cursor('store_embeddings') as cursor:
+                execute_values(cursor, """
+                    INSERT INTO chunk_embeddings (model, content_hash, embedding)
+                    VALUES %s
+                    ON CONFLICT (model, content_hash) DO NOTHING
+                """, rows, page_size=len(rows))
+            return True
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error storing embeddings: {e}")
+            return False
+    
+    # =========================
+    # SEARCH
+    # =========================
+    
+    def search_messages(self, user_id: str, query: str, limit: int = 20, cursor: str = None) -> Dict:
+        """Full-text search over the chat messages a user can access, best matches first.
+
+        The scope is the user's own sessions plus the sessions of projects
+        they are a member of. ``query`` takes web-search syntax ("phrases",
+        or, -word). Snippets wrap matches in <mark></mark> around the raw,
+        unescaped message text. Pass ``next_cursor`` back for the next
+        page; raises ValueError on a bad cursor. Archived partitions are
+        not searched.
+        """
+        key = decode_search_cursor(cursor) if cursor else None
+        keyset = "AND (ts_rank_cd(m.search_vector, q.query), m.message_id) < (%s::real, %s::uuid)"
+        params = [query, user_id, user_id] + (list(key) if key else []) + [limit + 1, SEARCH_HEADLINE_OPTIONS]
+        
+        try:
+            def fetch(db_cursor):
+                # Only the page's rows get a ts_headline, it re-parses the whole text
+                self._execute(db_cursor, f"search_messages{'_keyset' if key else ''}", f"""
+                    WITH q AS (
+                        SELECT websearch_to_tsquery('english', %s) AS query
+                    ), accessible AS (
+                        SELECT session_id FROM chat_sessions WHERE user_id = %s
+                        UNION
+                        SELECT cs.session_id
+                        FROM project_members pm
+                        JOIN chat_sessions cs ON cs.project_id = pm.project_id
+                        WHERE pm.user_id = %s
+                    ), page AS (
+                        SELECT m.message_id, m.session_id, m.role, m.content, m.created_at,
+                               ts_rank_cd(m.search_vector, q.query) AS rank, q.query
+                        FROM q, chat_messages m
+                        JOIN accessible a ON a.session_id = m.session_id
+                        WHERE m.search_vector @@ q.query {keyset if key else ''}
+                        ORDER BY rank DESC, m.message_id DESC
+                        LIMIT %s
+                    )
+                    SELECT page.message_id, page.session_id, cs.title AS session_title, cs.project_id,
+                           page.role, page.created_at, page.rank,
+                           ts_headline('english', page.content, page.query, %s) AS snippet
+                    FROM page
+                    JOIN chat_sessions cs ON cs.session_id = page.session_id
+                    ORDER BY page.rank DESC, page.message_id DESC
+                """, params)
+                return db_cursor.fetchall()
+            
+            results = [dict(row) for row in self._read('search_messages', fetch, sticky_key=user_id)]
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error searching messages: {e}")
+            results = []
+        
+        page = results[:limit]
+        return {
+            'results': page,
+            'next_cursor': (encode_search_cursor(page[-1]['rank'], page[-1]['message_id'])
+                            if len(results) > limit else None),
+        }
+    
+    def search_projects(self, user_id: str, query: str, limit: int = 20, cursor: str = None) -> Dict:
+        """Full-text search over the name and description of the user's projects"""
+        key = decode_search_cursor(cursor) if cursor else None
+        keyset = "AND (ts_rank_cd(p.search_vector, q.query), p.project_id) < (%s::real, %s::uuid)"
+        params = [query, SEARCH_HEADLINE_OPTIONS, user_id] + (list(key) if key else []) + [limit + 1]
+        
+        try:
+            def fetch(db_cursor):
+                self._execute(db_cursor, f"search_projects{'_keyset' if key else ''}", f"""
+                    WITH q AS (
+                        SELECT websearch_to_tsquery('english', %s) AS query
+                    )
+                    SELECT p.project_id, p.name, p.is_private, p.created_at, pm.role,
+                           ts_rank_cd(p.search_vector, q.query) AS rank,
+                           ts_headline('english', COALESCE(p.description, ''), q.query, %s) AS snippet
+                    FROM q, project_members pm
+                    JOIN projects p ON p.project_id = pm.project_id
+                    WHERE pm.user_id = %s AND p.search_vector @@ q.query {keyset if key else ''}
+                    ORDER BY rank DESC, p.project_id DESC
+                    LIMIT %s
+                """, params)
+                return db_cursor.fetchall()
+            
+            results = [dict(row) for row in self._read('search_projects', fetch, sticky_key=user_id)]
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error searching projects: {e}")
+            results = []
+        
+        page = results[:limit]
+        return {
+            'results': page,
+            'next_cursor': (encode_search_cursor(page[-1]['rank'], page[-1]['project_id'])
+                            if len(results) > limit else None),
+        }
+    
     # =========================
     # AI MODELS
     # =========================
     
     def get_available_models(self) -> List[Dict]:
         """Get all active AI models"""
+        cached = self._cache_get('models')
+        if cached is not MISSING:
+            return cached
         try:
-            cursor = self.get_cursor()
-            cursor.execute("""
-                SELECT model_id, name, version, description, provider, model_type
-                FROM ai_models 
-                WHERE is_active = TRUE
-                ORDER BY name
-            """)
+            def fetch(cursor):
+                self._execute(cursor, 'get_available_models', """
+                    SELECT model_id, name, version, description, provider, model_type
+                    FROM ai_models 
+                    WHERE is_active = TRUE
+                    ORDER BY name
+                """)
+                return cursor.fetchall()
             
-            models = cursor.fetchall()
-            cursor.close()
+            models = self._read('get_available_models', fetch)
             
-            return [dict(model) for model in models]
+            models = [dict(model) for model in models]
+            self._cache_set(models, 'models')
+            return models
             
         except psycopg2.Error as e:
             print(f"❌ Error getting AI models: {e}")
@@ -329,19 +1622,86 @@ class DatabaseHandler:
                        ip_address: str = None, user_agent: str = None):
         """Log a usage analytics event"""
         try:
-            cursor = self.get_cursor()
-            cursor.execute("""
-                INSERT INTO usage_analytics 
-                (user_id, event_type, event_data, session_id, project_id, ip_address, user_agent)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (user_id, event_type, json.dumps(event_data) if event_data else None,
-                  session_id, project_id, ip_address, user_agent))
-            
-            cursor.close()
+            with self.cursor('log_usage_event') as cursor:
+                cursor.execute("""
+                    INSERT INTO usage_analytics 
+                    (user_id, event_type, event_data, session_id, project_id, ip_address, user_agent)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (user_id, event_type, json.dumps(event_data) if event_data else None,
+                      session_id, project_id, ip_address, user_agent))
             
         except psycopg2.Error as e:
             print(f"❌ Error logging usage event: {e}")
     
+    def log_usage_events(self, events: List[Dict]) -> bool:
+        """Write a batch of usage events (dicts with log_usage_event's fields) in one statement"""
+        if not events:
+            return True
+        try:
+            rows = [
+                (event.get('user_id'), event['event_type'],
+                 json.dumps(event['event_data']) if event.get('event_data') else None,
+                 event.get('session_id'), event.get('project_id'),
+                 event.get('ip_address'), event.get('user_agent'))
+                for event in events
+            ]
+            with self.cursor('log_usage_events') as cursor:
+                execute_values(cursor, """
+                    INSERT INTO usage_analytics 
+                    (user_id, event_type, event_data, session_id, project_id, ip_address, user_agent)
+                    VALUES %s
+                """, rows, page_size=len(rows))
+            return True
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error logging {len(events)} usage events: {e}")
+            return False
+    
+    # =========================
+    # RATE LIMITS
+    # =========================
+    
+    def take_rate_limit_token(self, key: str, rate: float, burst: float) -> Optional[float]:
+        """Take a token from bucket ``key`` (refilling at ``rate``/sec up to ``burst``).
+    
+        Returns 0.0 when a token was taken, else the seconds until one is
+        available; None on error. One upsert, so concurrent workers never
+        take the same token.
+        """
+        try:
+            with self.cursor('take_rate_limit_token') as cursor:
+                self._execute(cursor, 'take_rate_limit_token', """
+                    INSERT INTO rate_limit_buckets AS b (bucket_key, tokens, admitted, updated_at)
+                    VALUES (%s, %s::float8 - 1, TRUE, NOW())
+                    ON CONFLICT (bucket_key) DO UPDATE
+                    SET (tokens, admitted, updated_at) = (
+                        SELECT CASE WHEN refilled >= 1 THEN refilled - 1 ELSE refilled END, refilled >= 1, NOW()
+                        FROM (SELECT LEAST(%s::float8, b.tokens + EXTRACT(EPOCH FROM NOW() - b.updated_at)::float8
+                                                                   * %s::float8) AS refilled) r
+                    )
+                    RETURNING tokens, admitted
+                """, (key, burst, burst, rate))
+                row = cursor.fetchone()
+            return 0.0 if row['admitted'] else (1 - row['tokens']) / rate
+    
+        except psycopg2.Error as e:
+            print(f"❌ Error taking rate limit token: {e}")
+            return None
+    
+    def prune_rate_limit_buckets(self, idle_seconds: float) -> int:
+        """Delete buckets untouched for ``idle_seconds``; they would be full again anyway"""
+        try:
+            with self.cursor('prune_rate_limit_buckets') as cursor:
+                cursor.execute("""
+                    DELETE FROM rate_limit_buckets
+                    WHERE updated_at < NOW() - %s * INTERVAL '1 second'
+                """, (idle_seconds,))
+                return cursor.rowcount
+    
+        except psycopg2.Error as e:
+            print(f"❌ Error pruning rate limit buckets: {e}")
+            return 0
+    
     # =========================
     # UTILITY METHODS
     # =========================
@@ -349,10 +1709,9 @@ class DatabaseHandler:
     def test_connection(self) -> bool:
         """Test database connection"""
         try:
-            cursor = self.get_cursor()
-            cursor.execute("SELECT 1")
-            result = cursor.fetchone()
-            cursor.close()
+            with self.cursor('test_connection') as cursor:
+                cursor.execute("SELECT 1")
+                result = cursor.fetchone()
             return result is not None
         except psycopg2.Error as e:
             print(f"❌ Connection test failed: {e}")
@@ -361,18 +1720,17 @@ class DatabaseHandler:
     def get_table_info(self) -> List[Dict]:
         """Get information about all tables"""
         try:
-            cursor = self.get_cursor()
-            cursor.execute("""
-                SELECT table_name, 
-                       (SELECT count(*) FROM information_schema.columns 
-                        WHERE table_name = t.table_name) as column_count
-                FROM information_schema.tables t
-                WHERE table_schema = 'public'
-                ORDER BY table_name
-            """)
-            
-            tables = cursor.fetchall()
-            cursor.close()
+            with self.cursor('get_table_info') as cursor:
+                cursor.execute("""
+                    SELECT table_name, 
+                           (SELECT count(*) FROM information_schema.columns 
+                            WHERE table_name = t.table_name) as column_count
+                    FROM information_schema.tables t
+                    WHERE table_schema = 'public'
+                    ORDER BY table_name
+                """)
+            
+                tables = cursor.fetchall()
             
             return [dict(table) for table in tables]
             
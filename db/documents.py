@@ -0,0 +1,243 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# A document that is already stored (or on its way) is not ingested again;
+# a failed attempt is retried on re-upload, and so is a pending/processing
+# one that made no progress for ``stale_after`` seconds (its worker died)
+SKIP_STATUSES = ('pending', 'processing', 'done')
+
+
+def hash_file(path: str) -> Tuple[str, int]:
+    """sha256 hex digest and size of a file, read in blocks"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
+    """Split ``text`` into ``chunk_size``-character chunks sharing ``overlap`` characters"""
+    text = text.strip()
+    if not text:
+        return []
+    step = chunk_size - overlap
+    return [text[start:start + chunk_size] for start in range(0, max(len(text) - overlap, 1), step)]
+
+
+# =========================
+# WORKER PROCESS FUNCTIONS
+# =========================
+# Module level so the spawn-context pool can pickle them; pypdf is only
+# imported in the workers, so the API process never loads it
+
+def _page_count(path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _extract_range(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """(page_number, text) for pages ``start``..``stop - 1``, 1-based page numbers"""
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [(number + 1, reader.pages[number].extract_text() or '') for number in range(start, stop)]
+
+
+class DocumentIngestor:
+    """Extracts, chunks and stores project PDFs in the background.
+
+    Text extraction is CPU-bound, so page ranges of ``pages_per_task``
+    pages run on a ``max_workers`` process pool. At most ``max_workers * 2``
+    ranges are in flight per document and results are consumed in page
+    order as they complete, so only a bounded window of a file's text is
+    ever in memory. Chunks are written as they are produced, together with
+    the document's progress; ``stats()`` reports pages/sec across all
+    documents ingested by this process. With an ``index``, finished
+    documents are also embedded into the project's vector index.
+
+    Every stored range refreshes the document's ``updated_at``, which acts
+    as a lease: ``start()`` marks documents with no progress for
+    ``stale_after`` seconds as failed, and a re-upload of one still pending
+    or processing past that point ingests it again.
+    """
+
+    def __init__(self, db, max_workers: int = 2, max_documents: int = 2, pages_per_task: int = 8,
+                 chunk_size: int = 1500, chunk_overlap: int = 200, index=None, stale_after: float = 900.0):
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.db = db
+        self.max_workers = max_workers
+        self.pages_per_task = pages_per_task
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.index = index
+        self.stale_after = stale_after
+        self._documents = ThreadPoolExecutor(max_workers=max_documents, thread_name_prefix='ingest')
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'documents': 0,
+            'duplicates': 0,
+            'failed': 0,
+            'reclaimed': 0,
+            'recovered': 0,
+            'pages': 0,
+            'chunks': 0,
+            'extract_seconds_total': 0.0,
+        }
+        self._active = 0
+        self._queued = set()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Created on first use so app start-up does not pay for worker spawn;
+        # spawn rather than fork, the API process has pool and monitor threads
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                      mp_context=multiprocessing.get_context('spawn'))
+            return self._processes
+
+    def start(self):
+        """Fail documents orphaned by a crash or restart, so re-uploads retry them"""
+        recovered = self.db.fail_stale_documents(self.stale_after)
+        with self._lock:
+            self._stats['recovered'] += recovered
+
+    def close(self):
+        self._documents.shutdown(wait=True)
+        with self._lock:
+            if self._processes is not None:
+                self._processes.shutdown(wait=True)
+                self._processes = None
+
+    # =========================
+    # EXTRACTION
+    # =========================
+
+    def iter_pages(self, path: str, page_count: int) -> Iterator[Tuple[int, str]]:
+        """(page_number, text) in page order, extracted on the process pool"""
+        pool = self._pool()
+        ranges = iter(range(0, page_count, self.pages_per_task))
+        pending = deque()
+        for start in ranges:
+            pending.append(pool.submit(_extract_range, path, start, min(start + self.pages_per_task, page_count)))
+            if len(pending) >= self.max_workers * 2:
+                break
+        while pending:
+            pages = pending.popleft().result()
+            start = next(ranges, None)
+            if start is not None:
+                pending.append(pool.submit(_extract_range, path, start, min(start + self.pages_per_task, page_count)))
+            yield from pages
+
+    def page_chunks(self, page_number: int, text: str) -> List[Dict[str, Any]]:
+        return [{'page_number': page_number, 'chunk_index': chunk_index, 'content': content}
+                for chunk_index, content in enumerate(chunk_text(text, self.chunk_size, self.chunk_overlap))]
+
+    def iter_chunks(self, path: str, page_count: int) -> Iterator[Dict[str, Any]]:
+        """Chunks of every page as dicts with page_number, chunk_index and content"""
+        for page_number, text in self.iter_pages(path, page_count):
+            yield from self.page_chunks(page_number, text)
+
+    # =========================
+    # INGESTION
+    # =========================
+
+    def ingest(self, document_id: str, path: str) -> bool:
+        """Extract and store one registered document, recording progress as it goes"""
+        started = time.monotonic()
+        pages_done = 0
+        chunks: List[Dict[str, Any]] = []
+        chunk_total = 0
+        try:
+            page_count = self._pool().submit(_page_count, path).result()
+            if not self.db.start_document(document_id, page_count):
+                return False
+            # One write per extracted range: chunks plus progress
+            for page_number, text in self.iter_pages(path, page_count):
+                chunks.extend(self.page_chunks(page_number, text))
+                pages_done = page_number
+                if pages_done % self.pages_per_task == 0 or pages_done == page_count:
+                    if not self.db.add_document_chunks(document_id, chunks, pages_done):
+                        raise RuntimeError("Failed to store document chunks")
+                    chunk_total += len(chunks)
+                    chunks = []
+            self.db.finish_document(document_id)
+            return True
+        except Exception as e:
+            print(f"❌ Error ingesting document {document_id}: {e}")
+            self.db.finish_document(document_id, error=str(e) or type(e).__name__)
+            with self._lock:
+                self._stats['failed'] += 1
+            return False
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._stats['documents'] += 1
+                self._stats['pages'] += pages_done
+                self._stats['chunks'] += chunk_total
+                self._stats['extract_seconds_total'] += elapsed
+
+    def _ingest_file(self, project_id: str, document_id: str, path: str, delete: bool):
+        try:
+            if self.ingest(document_id, path) and self.index is not None:
+                try:
+                    self.index.index_document(project_id, document_id)
+                except Exception as e:
+                    print(f"❌ Error indexing document {document_id}: {e}")
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._queued.discard(document_id)
+            if delete:
+                os.unlink(path)
+
+    def add(self, project_id: str, filename: str, path: str, content_hash: str = None,
+            size_bytes: int = None, delete: bool = False) -> Optional[Dict[str, Any]]:
+        """Register a PDF for ``project_id`` and ingest it in the background.
+
+        Returns the registration (document_id, status, created) with
+        ``queued`` False when an identical file was already ingested. With
+        ``delete=True`` the file is removed once it is no longer needed.
+        """
+        if content_hash is None or size_bytes is None:
+            content_hash, size_bytes = hash_file(path)
+        document = self.db.register_document(project_id, filename, content_hash, size_bytes, self.stale_after)
+        queued = document is not None and (document['created'] or document['reclaimed']
+                                           or document['status'] not in SKIP_STATUSES)
+        with self._lock:
+            # A document still waiting in this process's queue makes no progress
+            # and can look stale; it is already going to be ingested
+            if queued and document['document_id'] in self._queued:
+                queued = False
+            if queued:
+                self._active += 1
+                self._queued.add(document['document_id'])
+            elif document is not None:
+                self._stats['duplicates'] += 1
+            if document is not None and document['reclaimed']:
+                self._stats['reclaimed'] += 1
+        if not queued:
+            if delete:
+                os.unlink(path)
+            return {**document, 'queued': False} if document else None
+        self._documents.submit(self._ingest_file, project_id, document['document_id'], path, delete)
+        return {**document, 'queued': True}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['active'] = self._active
+        seconds = stats['extract_seconds_total']
+        stats['pages_per_sec'] = stats['pages'] / seconds if seconds else 0.0
+        return stats
@@ -0,0 +1,88 @@
+import hashlib
+import math
+import re
+from array import array
+from typing import List, Optional
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def content_hash(text: str) -> str:
+    """Cache key of a chunk: sha256 of its text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def pack_embedding(vector: List[float]) -> bytes:
+    """float32 little-endian bytes, as stored in chunk_embeddings"""
+    values = array('f', vector)
+    if values.itemsize != 4:
+        raise RuntimeError("float32 arrays are not 4 bytes on this platform")
+    return values.tobytes()
+
+
+def unpack_embedding(data: bytes) -> List[float]:
+    return array('f', data).tolist()
+
+
+class Embedder:
+    """Turns texts into vectors, one batch per call.
+
+    ``name`` identifies the model in the embedding cache and the index, so
+    it must change whenever the vectors would (model, dimension, ...).
+    """
+    name = 'embedder'
+    dimension: Optional[int] = None
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic offline embedder: signed feature hashing of lower-cased words.
+
+    No model and no network, and the same text always gives the same unit
+    vector, so indexing, caching and retrieval can be tested and
+    benchmarked anywhere. Texts sharing words land close together, which
+    is enough for keyword-like retrieval but not for semantics.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self.name = f'hashing-{dimension}'
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            bucket = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+            vector[bucket % self.dimension] += 1.0 if bucket >> 63 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+
+class OllamaEmbedder(Embedder):
+    """Embeddings from a local Ollama model through langchain-ollama"""
+
+    def __init__(self, model: str = 'nomic-embed-text', base_url: str = None):
+        # Imported here so the offline embedder works without langchain-ollama
+        from langchain_ollama import OllamaEmbeddings
+        self.name = f'ollama-{model}'
+        self._embeddings = OllamaEmbeddings(model=model, base_url=base_url)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._embeddings.embed_documents(texts)
+        if vectors and self.dimension is None:
+            self.dimension = len(vectors[0])
+        return vectors
+
+
+def embedder_from_env(value: str) -> Embedder:
+    """'hashing' / 'hashing:256' / 'ollama:nomic-embed-text' -> an Embedder"""
+    kind, _, option = (value or 'hashing').partition(':')
+    if kind == 'hashing':
+        return HashingEmbedder(int(option or 384))
+    if kind == 'ollama':
+        return OllamaEmbedder(option or 'nomic-embed-text')
+    raise ValueError(f"Unknown embedder: {value}")
@@ -0,0 +1,29 @@
+import hashlib
+import json
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def etag_for(content) -> str:
+    """Strong ETag over the JSON-encoded response body"""
+    body = json.dumps(content, sort_keys=True, separators=(',', ':'))
+    return '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def conditional_json(request: Request, payload) -> Response:
+    """JSON response with an ETag; 304 when the client's copy is current"""
+    content = jsonable_encoder(payload)
+    etag = etag_for(content)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content, headers=headers)
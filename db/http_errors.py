@@ -0,0 +1,18 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from .passwords import PasswordQueueFull
+
+
+async def password_queue_full_handler(request: Request, exc: PasswordQueueFull):
+    """Shed login/register bursts instead of queueing them behind bcrypt"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
+
+def register_error_handlers(app: FastAPI):
+    """Map handler-level exceptions to HTTP responses"""
+    app.add_exception_handler(PasswordQueueFull, password_queue_full_handler)
@@ -0,0 +1,86 @@
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, Optional
+
+
+class LastLoginBuffer:
+    """Write-behind buffer that coalesces last_login updates per user.
+
+    ``touch()`` only records the login time in memory; a background thread
+    hands everything collected to ``flush_func`` (one bulk UPDATE) every
+    ``flush_interval`` seconds, or sooner once ``max_pending`` users are
+    waiting. A stored last_login therefore lags by at most about
+    ``flush_interval`` seconds while the process is up, and ``close()``
+    flushes what is left on shutdown.
+    """
+
+    def __init__(self, flush_func: Callable[[Dict[str, datetime]], bool],
+                 flush_interval: float = 5.0, max_pending: int = 10000):
+        self.flush_func = flush_func
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closing = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'touched': 0, 'flushed': 0, 'failed': 0, 'flushes': 0}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._closing.clear()
+        self._thread = threading.Thread(target=self._run, name='last-login-writer', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Flush pending updates and stop the background thread"""
+        self._closing.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def touch(self, user_id: str, at: datetime = None):
+        """Record a login; later logins of the same user overwrite earlier ones"""
+        at = at or datetime.now(timezone.utc)
+        with self._lock:
+            self._pending[user_id] = at
+            self._stats['touched'] += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write everything collected so far; returns the number of users written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        if self.flush_func(pending):
+            with self._lock:
+                self._stats['flushed'] += len(pending)
+                self._stats['flushes'] += 1
+            return len(pending)
+
+        # Put the batch back unless newer logins arrived meanwhile
+        with self._lock:
+            self._stats['failed'] += len(pending)
+            for user_id, at in pending.items():
+                if self._pending.get(user_id, at) <= at:
+                    self._pending[user_id] = at
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        stats['flush_interval'] = self.flush_interval
+        return stats
+
+    def _run(self):
+        while not self._closing.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
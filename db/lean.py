@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Sequence
+
+import orjson
+from starlette.responses import Response
+
+# Lean reads skip RealDictCursor and the dict(row) copy: the tuple cursor's
+# rows become slotted records that orjson serializes natively, and the
+# metadata column is selected as ::text and embedded verbatim as a
+# Fragment instead of being decoded to Python and encoded again.
+MESSAGE_COLUMNS = "message_id, role, content, metadata::text AS metadata, created_at"
+
+
+@dataclass(slots=True)
+class MessageRecord:
+    message_id: str
+    role: str
+    content: str
+    metadata: Optional[orjson.Fragment]
+    created_at: datetime
+
+    def decoded_metadata(self) -> Any:
+        """metadata as Python values; a Fragment's text is only reachable through orjson.dumps"""
+        return orjson.loads(orjson.dumps(self.metadata)) if self.metadata is not None else None
+
+    def to_dict(self) -> dict:
+        """Plain dict with metadata decoded, for callers that need one"""
+        return {
+            'message_id': self.message_id,
+            'role': self.role,
+            'content': self.content,
+            'metadata': self.decoded_metadata(),
+            'created_at': self.created_at,
+        }
+
+
+def message_record(row: Sequence[Any]) -> MessageRecord:
+    message_id, role, content, metadata, created_at = row
+    return MessageRecord(message_id, role, content,
+                         orjson.Fragment(metadata) if metadata is not None else None, created_at)
+
+
+def message_records(rows: Iterable[Sequence[Any]]) -> List[MessageRecord]:
+    return [message_record(row) for row in rows]
+
+
+def ndjson_line(record: MessageRecord) -> bytes:
+    """One newline-terminated JSON document for NDJSON exports"""
+    return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+
+
+class LeanJSONResponse(Response):
+    """JSON response serialized straight to bytes by orjson, bypassing jsonable_encoder"""
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
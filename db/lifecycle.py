@@ -0,0 +1,117 @@
+import asyncio
+import signal
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+STARTING = 'starting'
+READY = 'ready'
+DRAINING = 'draining'
+STOPPED = 'stopped'
+
+
+class AppLifecycle:
+    """Startup/shutdown state shared by the lifespan, probes and drain.
+
+    ``import_started`` is a ``time.monotonic()`` taken at the top of the app
+    module, so ``import_to_ready_ms`` covers module import, pool warm-up and
+    background thread start-up. Liveness only needs the process to answer;
+    readiness is true between ``mark_ready()`` and SIGTERM (see
+    ``handle_sigterm``) or ``drain()``.
+    """
+
+    def __init__(self, import_started: float):
+        self.import_started = import_started
+        self.state = STARTING
+        self.in_flight = 0
+        self.ready_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def mark_ready(self):
+        self.ready_at = time.monotonic()
+        self.state = READY
+        print(f"✅ Ready {self.import_to_ready_ms():.0f}ms after import")
+
+    def import_to_ready_ms(self) -> Optional[float]:
+        if self.ready_at is None:
+            return None
+        return (self.ready_at - self.import_started) * 1000
+
+    def handle_sigterm(self, drain_delay: float) -> bool:
+        """Stop reporting ready as soon as SIGTERM arrives, and shut down ``drain_delay`` seconds later.
+
+        Call from the lifespan startup: uvicorn has installed its SIGTERM
+        handler (stop listening, finish requests, run the lifespan shutdown)
+        by then, and it is chained after the delay. Meanwhile requests are
+        still served but /health/ready answers 503, so load balancers take
+        the instance out of rotation before it stops listening. A second
+        SIGTERM shuts down at once. Returns False, changing nothing, when
+        there is no Python-level handler to chain or not on the main thread.
+        """
+        previous = signal.getsignal(signal.SIGTERM)
+        if not callable(previous) or threading.current_thread() is not threading.main_thread():
+            return False
+        loop = asyncio.get_running_loop()
+        signalled = False
+
+        def handler(signum, frame):
+            nonlocal signalled
+            if signalled:
+                previous(signum, frame)
+                return
+            signalled = True
+            self.state = DRAINING
+            print(f"📝 SIGTERM: not ready, shutting down in {drain_delay:g}s")
+            loop.call_soon_threadsafe(loop.call_later, drain_delay, previous, signum, frame)
+
+        signal.signal(signal.SIGTERM, handler)
+        return True
+
+    async def drain(self, timeout: float) -> bool:
+        """Stop reporting ready and wait up to ``timeout`` seconds for in-flight requests.
+
+        Runs in the lifespan shutdown, after the server has stopped listening
+        and waited for its open requests, so the wait is only a backstop;
+        load balancers see readiness drop during ``handle_sigterm``'s delay.
+        """
+        self.state = DRAINING
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.in_flight:
+            print(f"❌ Drain timed out with {self.in_flight} requests in flight")
+        return not self.in_flight
+
+    def mark_stopped(self):
+        self.state = STOPPED
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'in_flight': self.in_flight,
+            'import_to_ready_ms': self.import_to_ready_ms(),
+        }
+
+
+class InFlightMiddleware:
+    """ASGI middleware that counts requests in progress for ``AppLifecycle.drain``"""
+
+    def __init__(self, app: ASGIApp, lifecycle: AppLifecycle):
+        self.app = app
+        self.lifecycle = lifecycle
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        # Runs on the event loop only, so a plain counter is safe
+        self.lifecycle.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.lifecycle.in_flight -= 1
@@ -1,57 +1,146 @@
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
-from typing import Optional, Dict, List
+import time
+IMPORT_STARTED = time.monotonic()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import hashlib
+import os
+import tempfile
 from .db_manager import DatabaseHandler
+from .async_db_manager import async_handler_from_env
+from .schemas import UserCreateRequest, UserAuthRequest, ProjectCreateRequest, ChatMessageRequest, ChatMessageBatchRequest, ChatStreamRequest
+from .passwords import PasswordHasher
+from .http_errors import register_error_handlers
+from .http_cache import conditional_json
+from .cache import TTLCache
+from .analytics import AnalyticsWriter, AnalyticsMiddleware
+from .metrics import MetricsRegistry, QueryMetrics, HTTPMetricsMiddleware, register_handler_stats, PROMETHEUS_CONTENT_TYPE
+from .lean import LeanJSONResponse, ndjson_line
+from .lifecycle import AppLifecycle, InFlightMiddleware
+from .replicas import parse_replica_hosts
+from .documents import DocumentIngestor
+from .embeddings import embedder_from_env
+from .vector_index import ProjectVectorIndex
+from .context import ContextBuilder, summarizer_from_env, prompt_messages
+from .streaming import ReplyStreamer, backend_from_env
+from .archive import PartitionMaintainer
+from .admission import AdmissionController, AdmissionMiddleware, RouteLimit, bucket_store_from_env
 
 # =========================
 # CONFIGURE DATABASE
 # =========================
+# Nothing here touches the network: connections are opened in lifespan()
+metrics = MetricsRegistry()
+lifecycle = AppLifecycle(IMPORT_STARTED)
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", 10))
+# Seconds between SIGTERM (readiness drops) and the server closing its socket
+DRAIN_DELAY = float(os.getenv("DRAIN_DELAY", 5))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 100 * 1024 * 1024))
+
+DB_PARAMS = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "database": os.getenv("DB_NAME", "your_db"),
+    "user": os.getenv("DB_USER", "your_user"),
+    "password": os.getenv("DB_PASSWORD", "your_password"),
+    "port": int(os.getenv("DB_PORT", 5432)),
+}
+
 db = DatabaseHandler(
-    host="localhost",
-    database="your_db",
-    user="your_user",
-    password="your_password",
-    port=5432
+    **DB_PARAMS,
+    pooled=True,
+    min_connections=2,
+    max_connections=20,
+    password_hasher=PasswordHasher(rounds=12, max_workers=2, max_queue=32),
+    cache=TTLCache(maxsize=10000),
+    cache_notify=True,
+    last_login_flush_interval=5.0,
+    metrics=QueryMetrics(metrics, slow_query_ms=200),
+    prepared_statements=os.getenv("PREPARED_STATEMENTS", "true").lower() == "true",
+    replicas=parse_replica_hosts(os.getenv("DB_REPLICA_HOSTS", ""), DB_PARAMS)
 )
-db.connect()
+# What the routes await: asyncpg on the event loop, or "psycopg2" to run
+# every call on the threadpool. Background work keeps using ``db``
+async_db = async_handler_from_env(os.getenv("DB_DRIVER", "asyncpg"), db, min_connections=2, max_connections=20)
 
-# =========================
-# FASTAPI APP
-# =========================
-app = FastAPI(title="Postgres DB API")
-
-# =========================
-# REQUEST SCHEMAS
-# =========================
-class UserCreateRequest(BaseModel):
-    email: str
-    password: str
-    first_name: Optional[str] = None
-    last_name: Optional[str] = None
-    role: Optional[str] = "scholar"
+analytics = AnalyticsWriter(db, max_queue=10000, batch_size=500, flush_interval=1.0)
+vector_index = ProjectVectorIndex(db, embedder_from_env(os.getenv("EMBEDDER", "hashing")),
+                                  path=os.getenv("VECTOR_INDEX_PATH", "./data/vector_index"))
+context_builder = ContextBuilder(db, summarizer_from_env(os.getenv("SUMMARIZER", "extractive")))
+streamer = ReplyStreamer(db, backend_from_env(os.getenv("CHAT_BACKEND", "fake")), registry=metrics,
+                         flush_interval=float(os.getenv("STREAM_FLUSH_INTERVAL", 0.5)))
+ingestor = DocumentIngestor(db, max_workers=int(os.getenv("INGEST_WORKERS", 2)), index=vector_index,
+                            stale_after=float(os.getenv("INGEST_STALE_AFTER", 900)))
+partitions = PartitionMaintainer(db, os.getenv("MESSAGE_ARCHIVE_PATH", "./data/message_archive"),
+                                 retain_months=int(os.getenv("MESSAGE_RETAIN_MONTHS", 6)),
+                                 inactive_days=int(os.getenv("MESSAGE_INACTIVE_DAYS", 90)),
+                                 archive=os.getenv("MESSAGE_ARCHIVE", "false").lower() == "true")
+# Per-process caps keep the slow routes from filling the threadpool (40) and
+# connection pool (20); rates are per client IP unless keyed by a path param
+admission = AdmissionController([
+    RouteLimit("POST", "/users/create", max_concurrent=4, max_queue=8, queue_timeout=0.5, rate=0.2, burst=5),
+    RouteLimit("POST", "/users/authenticate", max_concurrent=8, max_queue=16, queue_timeout=0.5, rate=2, burst=10),
+    RouteLimit("POST", "/chat/messages/add", max_concurrent=12, max_queue=24, queue_timeout=0.25, rate=20, burst=40),
+    RouteLimit("POST", "/chat/messages/batch", max_concurrent=4, max_queue=8, queue_timeout=0.25, rate=5, burst=10),
+    RouteLimit("POST", "/chat/{session_id}/stream", max_concurrent=32, rate=1, burst=3, key="session_id"),
+    RouteLimit("POST", "/projects/{project_id}/documents", max_concurrent=4, max_queue=4, queue_timeout=1.0,
+               rate=0.5, burst=5, key="project_id"),
+    RouteLimit("GET", "/search", max_concurrent=8, max_queue=16, queue_timeout=0.25, rate=10, burst=20),
+], store=bucket_store_from_env(os.getenv("RATE_LIMIT_STORE", "memory"), db), registry=metrics,
+   trust_forwarded=os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true",
+   forwarded_hops=int(os.getenv("FORWARDED_HOPS", 1)))
 
-class UserAuthRequest(BaseModel):
-    email: str
-    password: str
+register_handler_stats(metrics, db)
+metrics.register_stats('db_request_pool', async_db.get_pool_stats)
+metrics.register_stats('analytics', analytics.stats)
+metrics.register_stats('ingest', ingestor.stats)
+metrics.register_stats('vector_index', vector_index.stats)
+metrics.register_stats('context', context_builder.stats)
+metrics.register_stats('chat_stream', streamer.stats)
+metrics.register_stats('partitions', partitions.stats)
+metrics.register_stats('admission', admission.stats)
+metrics.register_stats('app', lambda: {'in_flight': lifecycle.in_flight, 'ready': int(lifecycle.ready)})
 
-class ProjectCreateRequest(BaseModel):
-    name: str
-    description: str
-    created_by_user_id: str
-    is_private: Optional[bool] = False
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not await async_db.connect():
+        await async_db.disconnect()
+        raise RuntimeError("Database warm-up failed")
+    analytics.start()
+    await run_in_threadpool(ingestor.start)
+    partitions.start()
+    admission.start()
+    lifecycle.handle_sigterm(DRAIN_DELAY)
+    lifecycle.mark_ready()
+    yield
+    await lifecycle.drain(DRAIN_TIMEOUT)
+    await streamer.close()
+    await run_in_threadpool(analytics.close)
+    await run_in_threadpool(ingestor.close)
+    await run_in_threadpool(partitions.close)
+    await run_in_threadpool(admission.close)
+    await async_db.disconnect()
+    lifecycle.mark_stopped()
 
-class ChatMessageRequest(BaseModel):
-    session_id: str
-    role: str
-    content: str
-    metadata: Optional[Dict] = None
+# =========================
+# FASTAPI APP
+# =========================
+app = FastAPI(title="Postgres DB API", lifespan=lifespan)
+register_error_handlers(app)
+app.add_middleware(AnalyticsMiddleware, writer=analytics)
+app.add_middleware(HTTPMetricsMiddleware, registry=metrics)
+app.add_middleware(InFlightMiddleware, lifecycle=lifecycle)
+if os.getenv("ADMISSION_ENABLED", "true").lower() == "true":
+    app.add_middleware(AdmissionMiddleware, controller=admission)
 
 # =========================
 # USER ENDPOINTS
 # =========================
 @app.post("/users/create")
-def create_user(request: UserCreateRequest):
-    user_id = db.create_user(
+async def create_user(request: UserCreateRequest):
+    user_id = await async_db.create_user(
         email=request.email,
         password=request.password,
         first_name=request.first_name,
@@ -63,15 +152,15 @@ def create_user(request: UserCreateRequest):
     return {"user_id": user_id}
 
 @app.post("/users/authenticate")
-def authenticate_user(request: UserAuthRequest):
-    user = db.authenticate_user(email=request.email, password=request.password)
+async def authenticate_user(request: UserAuthRequest):
+    user = await async_db.authenticate_user(email=request.email, password=request.password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return user
 
 @app.get("/users/{user_id}")
-def get_user(user_id: str):
-    user = db.get_user_by_id(user_id)
+async def get_user(user_id: str):
+    user = await async_db.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -80,8 +169,8 @@ def get_user(user_id: str):
 # PROJECT ENDPOINTS
 # =========================
 @app.post("/projects/create")
-def create_project(request: ProjectCreateRequest):
-    project_id = db.create_project(
+async def create_project(request: ProjectCreateRequest):
+    project_id = await async_db.create_project(
         name=request.name,
         description=request.description,
         created_by_user_id=request.created_by_user_id,
@@ -92,15 +181,66 @@ def create_project(request: ProjectCreateRequest):
     return {"project_id": project_id}
 
 @app.get("/users/{user_id}/projects")
-def get_user_projects(user_id: str):
-    return db.get_user_projects(user_id)
+async def get_user_projects(user_id: str):
+    return await async_db.get_user_projects(user_id)
+
+@app.post("/projects/{project_id}/documents", status_code=202)
+async def upload_project_document(project_id: str, request: Request, filename: str = Query(..., min_length=1)):
+    """Raw PDF request body, spooled to disk while hashing and ingested in the background"""
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+        try:
+            async for block in request.stream():
+                size += len(block)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="Document too large")
+                digest.update(block)
+                await run_in_threadpool(f.write, block)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+    if not size:
+        os.unlink(f.name)
+        raise HTTPException(status_code=400, detail="Empty document")
+    document = await run_in_threadpool(ingestor.add, project_id, filename, f.name,
+                                       content_hash=digest.hexdigest(), size_bytes=size, delete=True)
+    if not document:
+        raise HTTPException(status_code=400, detail="Document upload failed")
+    return document
+
+@app.get("/projects/{project_id}/documents")
+async def get_project_documents(project_id: str):
+    return await async_db.get_project_documents(project_id)
+
+@app.get("/documents/{document_id}")
+async def get_document(document_id: str):
+    document = await async_db.get_document(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document
+
+@app.post("/documents/{document_id}/index")
+async def index_document(document_id: str):
+    """Re-embed a document's chunks; cached embeddings are reused"""
+    document = await async_db.get_document(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if document['status'] != 'done':
+        raise HTTPException(status_code=409, detail=f"Document is {document['status']}")
+    return {"document_id": document_id,
+            "chunks": await run_in_threadpool(vector_index.index_document, document['project_id'], document_id)}
+
+@app.get("/projects/{project_id}/retrieve")
+async def retrieve_project_chunks(project_id: str, q: str = Query(..., min_length=1), k: int = Query(5, ge=1, le=50)):
+    return await run_in_threadpool(vector_index.search, project_id, q, k)
 
 # =========================
 # CHAT ENDPOINTS
 # =========================
 @app.post("/chat/messages/add")
-def add_chat_message(request: ChatMessageRequest):
-    message_id = db.add_chat_message(
+async def add_chat_message(request: ChatMessageRequest):
+    message_id = await async_db.add_chat_message(
         session_id=request.session_id,
         role=request.role,
         content=request.content,
@@ -110,26 +250,114 @@ def add_chat_message(request: ChatMessageRequest):
         raise HTTPException(status_code=400, detail="Failed to add message")
     return {"message_id": message_id}
 
+@app.post("/chat/messages/batch")
+async def add_chat_messages(request: ChatMessageBatchRequest):
+    message_ids = await async_db.add_chat_messages(
+        session_id=request.session_id,
+        messages=[message.model_dump() for message in request.messages]
+    )
+    if message_ids is None:
+        raise HTTPException(status_code=400, detail="Failed to add messages")
+    return {"message_ids": message_ids}
+
+@app.post("/chat/{session_id}/stream")
+async def stream_chat_reply(session_id: str, request: ChatStreamRequest):
+    """Store the user's message and stream the assistant reply as server-sent events"""
+    started = time.monotonic()
+    if not await async_db.add_chat_message(session_id, 'user', request.content):
+        raise HTTPException(status_code=400, detail="Failed to add message")
+    context = await run_in_threadpool(context_builder.build, session_id, request.budget)
+    return StreamingResponse(streamer.stream(session_id, prompt_messages(context), started),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/chat/{session_id}/messages")
-def get_chat_messages(session_id: str, limit: int = 50):
-    return db.get_chat_messages(session_id=session_id, limit=limit)
+async def get_chat_messages(session_id: str, limit: int = Query(50, ge=1, le=500),
+                      cursor: Optional[str] = None, latest: bool = False):
+    try:
+        # Lean rows serialized straight to bytes; metadata passes through as stored
+        return LeanJSONResponse(await async_db.get_chat_messages_page(session_id=session_id, limit=limit,
+                                                                      cursor=cursor, latest=latest, lean=True))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/chat/{session_id}/messages/export")
+async def export_chat_messages(session_id: str):
+    """Every message of the session as NDJSON, streamed in constant memory"""
+    # A server-side cursor on the psycopg2 handler; StreamingResponse iterates it on the threadpool
+    lines = (ndjson_line(message) for message in db.iter_chat_messages(session_id, lean=True))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.get("/chat/{session_id}/context")
+async def get_chat_context(session_id: str, budget: int = Query(4096, ge=256, le=1000000)):
+    """Rolling summary plus the newest messages verbatim, within ``budget`` tokens"""
+    return await run_in_threadpool(context_builder.build, session_id, budget)
+
+@app.get("/chat/{session_id}/retrieve")
+async def retrieve_session_chunks(session_id: str, q: str = Query(..., min_length=1), k: int = Query(5, ge=1, le=50)):
+    """Top-k chunks from the documents of the session's project"""
+    session = await async_db.get_chat_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    if not session['project_id']:
+        raise HTTPException(status_code=400, detail="Chat session has no project")
+    return await run_in_threadpool(vector_index.search, session['project_id'], q, k)
 
 @app.get("/users/{user_id}/chat-sessions")
-def get_user_chat_sessions(user_id: str, limit: int = 20):
-    return db.get_user_chat_sessions(user_id=user_id, limit=limit)
+async def get_user_chat_sessions(user_id: str, limit: int = 20):
+    return await async_db.get_user_chat_sessions(user_id=user_id, limit=limit)
+
+# =========================
+# SEARCH
+# =========================
+@app.get("/search")
+async def search(user_id: str, q: str = Query(..., min_length=1, max_length=500),
+           type: str = Query("messages", pattern="^(messages|projects)$"),
+           limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None):
+    """Ranked full-text search over the chat messages or projects ``user_id`` can access"""
+    search_method = async_db.search_messages if type == "messages" else async_db.search_projects
+    try:
+        return await search_method(user_id=user_id, query=q, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # =========================
 # AI MODELS
 # =========================
 @app.get("/models")
-def get_models():
-    return db.get_available_models()
+async def get_models(request: Request):
+    return conditional_json(request, await async_db.get_available_models())
 
 # =========================
 # HEALTH CHECK
 # =========================
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving; says nothing about the database"""
+    return {"status": "alive", **lifecycle.stats()}
+
+@app.get("/health/ready")
+async def readiness():
+    """Started, not draining and the database answers"""
+    if lifecycle.ready and await async_db.test_connection():
+        return {"status": "ready", **lifecycle.stats()}
+    raise HTTPException(status_code=503, detail=lifecycle.stats())
+
 @app.get("/health")
-def health_check():
-    if db.test_connection():
-        return {"status": "ok"}
+async def health_check():
+    if await async_db.test_connection():
+        return {"status": "ok", "pool": db.get_pool_stats(),
+                "request_pool": {"driver": async_db.driver, **async_db.get_pool_stats()}, "passwords": db.password_hasher.stats(),
+                "cache": db.get_cache_stats(), "prepared": db.get_prepared_stats(),
+                "replicas": db.get_replica_stats(),
+                "analytics": analytics.stats(), "ingest": ingestor.stats(), "vector_index": vector_index.stats(),
+                "chat_stream": streamer.stats(), "partitions": partitions.stats(),
+                "admission": admission.stats()}
     raise HTTPException(status_code=500, detail="Database connection failed")
+
+# =========================
+# METRICS
+# =========================
+@app.get("/metrics")
+async def get_metrics():
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,294 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+slow_query_logger = logging.getLogger('db.slow_query')
+
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HTTP_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DB_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = f'le="{bound}"'
+                    lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+                inf = 'le="+Inf"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, inf)} {count}')
+                lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+                lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Collects metrics and renders them in the Prometheus text format.
+
+    Besides counters and histograms, ``register_stats`` exposes any
+    ``stats()``-style callable (pool, cache, analytics, ...) as gauges named
+    ``<prefix>_<key>`` for each numeric value it returns.
+    """
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._stats: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DB_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix: str, stats: Callable[[], Dict[str, Any]]):
+        self._stats.append((prefix, stats))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, stats in self._stats:
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"❌ Error collecting {prefix} stats: {e}")
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = re.sub(r'[^a-zA-Z0-9_]', '_', f'{prefix}_{key}')
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# =========================
+# DATABASE INSTRUMENTATION
+# =========================
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def redact_params(params) -> Any:
+    """Replace parameter values with their type names for logging"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: f'<{type(value).__name__}>' for key, value in params.items()}
+    return [f'<{type(value).__name__}>' for value in params]
+
+
+class QueryMetrics:
+    """Per-operation query latency, row counts, errors and a slow-query log.
+
+    DatabaseHandler hands out cursors from ``cursor_factory(operation)``;
+    with instrumentation disabled that is the plain ``base`` cursor class
+    (RealDictCursor, or the tuple cursor for lean reads), so the only cost
+    left is one attribute check per cursor.
+
+    With ``explain_slow_queries`` a slow statement's plan is logged with it,
+    but only for cursors marked ``read_only`` (the handler's replica-safe
+    reads). Even those get a plain EXPLAIN, never ANALYZE, so logging a plan
+    never runs the statement a second time.
+    """
+
+    def __init__(self, registry: MetricsRegistry, enabled: bool = True,
+                 slow_query_ms: Optional[float] = 200.0, explain_slow_queries: bool = False):
+        self.enabled = enabled
+        self.slow_query_seconds = slow_query_ms / 1000 if slow_query_ms is not None else None
+        self.explain_slow_queries = explain_slow_queries
+        self.latency = registry.histogram(
+            'db_query_duration_seconds', 'Database query latency by handler operation', ('operation',))
+        self.rows = registry.histogram(
+            'db_query_rows', 'Rows returned or affected per query', ('operation',), buckets=ROW_BUCKETS)
+        self.errors = registry.counter(
+            'db_query_errors_total', 'Failed database queries by operation and error class', ('operation', 'error'))
+        self.slow = registry.counter(
+            'db_slow_queries_total', 'Queries slower than the slow-query threshold', ('operation',))
+        self._factories: Dict[Tuple[str, type], type] = {}
+
+    def cursor_factory(self, operation: str, base: type = RealDictCursor, read_only: bool = False):
+        if not self.enabled:
+            return base
+        factory = self._factories.get((operation, base, read_only))
+        if factory is None:
+            factory = self._factories[(operation, base, read_only)] = \
+                self._make_cursor_class(operation, base, read_only)
+        return factory
+
+    def _make_cursor_class(self, operation: str, base: type, read_only: bool):
+        metrics = self
+
+        class InstrumentedCursor(base):
+            def execute(self, query, vars=None):
+                started = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                except Exception as e:
+                    metrics.errors.inc(operation, type(e).__name__)
+                    raise
+                finally:
+                    metrics.record(self, operation, query, vars, time.perf_counter() - started, read_only)
+
+        return InstrumentedCursor
+
+    def record(self, cursor, operation: str, query, params, elapsed: float, read_only: bool = False):
+        explain = None
+        if self.explain_slow_queries and read_only:
+            explain = lambda: None if cursor.connection.closed else self._explain(cursor.connection, query, params)
+        self.observe(operation, query, params, elapsed, cursor.rowcount, explain)
+
+    def observe(self, operation: str, query, params, elapsed: float, rowcount: int = -1,
+                explain: Optional[Callable[[], Optional[str]]] = None):
+        """Record one statement's latency and row count (-1 if unknown).
+
+        ``record`` calls this for psycopg2 cursors; the asyncpg handler calls
+        it directly. A slow statement is logged with ``explain()``'s plan.
+        """
+        self.latency.observe(elapsed, operation)
+        if rowcount >= 0:
+            self.rows.observe(rowcount, operation)
+        if self.slow_query_seconds is None or elapsed < self.slow_query_seconds:
+            return
+
+        self.slow.inc(operation)
+        sql = query.decode('utf-8', 'replace') if isinstance(query, bytes) else str(query)
+        sql = _WHITESPACE.sub(' ', sql).strip()
+        plan = explain() if explain else None
+        slow_query_logger.warning(
+            "Slow query %s took %.1fms: %s params=%s%s",
+            operation, elapsed * 1000, sql, redact_params(params),
+            f"\n{plan}" if plan else ''
+        )
+
+    @staticmethod
+    def _explain(connection, query, params) -> Optional[str]:
+        try:
+            explain_cursor = connection.cursor()
+            try:
+                explain_cursor.execute(b'EXPLAIN ' + (
+                    query.encode('utf-8') if isinstance(query, str) else query), params)
+                return '\n'.join(row[0] for row in explain_cursor.fetchall())
+            finally:
+                explain_cursor.close()
+        except Exception as e:
+            return f"(EXPLAIN failed: {e})"
+
+
+# =========================
+# HTTP INSTRUMENTATION
+# =========================
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware recording request latency per method, route template and status"""
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry):
+        self.app = app
+        self.latency = registry.histogram(
+            'http_request_duration_seconds', 'HTTP request latency by route',
+            ('method', 'route', 'status'), buckets=HTTP_BUCKETS)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            self.latency.observe(
+                time.perf_counter() - started,
+                scope['method'], getattr(route, 'path', 'unmatched'), str(status_code)
+            )
+
+
+def register_handler_stats(registry: MetricsRegistry, db):
+    """Expose a handler's pool, cache, prepared statement, replica, password and last-login stats as gauges"""
+    registry.register_stats('db_pool', db.get_pool_stats)
+    registry.register_stats('db_cache', db.get_cache_stats)
+    if hasattr(db, 'get_prepared_stats'):
+        registry.register_stats('db_prepared', db.get_prepared_stats)
+    if hasattr(db, 'get_replica_stats'):
+        registry.register_stats('db_replicas', db.get_replica_stats)
+    registry.register_stats('password_hasher', db.password_hasher.stats)
+    if getattr(db, 'last_login_buffer', None):
+        registry.register_stats('last_login_buffer', db.last_login_buffer.stats)
@@ -0,0 +1,73 @@
+-- Baseline application schema assumed by DatabaseHandler. IF NOT EXISTS
+-- keeps it safe to adopt on databases created before migrations existed.
+CREATE TABLE IF NOT EXISTS users (
+    user_id         UUID PRIMARY KEY,
+    email           TEXT NOT NULL UNIQUE,
+    password_hash   TEXT NOT NULL,
+    first_name      TEXT,
+    last_name       TEXT,
+    role            TEXT NOT NULL DEFAULT 'scholar',
+    status          TEXT NOT NULL DEFAULT 'active',
+    email_verified  BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_login      TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS projects (
+    project_id          UUID PRIMARY KEY,
+    name                TEXT NOT NULL,
+    description         TEXT,
+    created_by_user_id  UUID REFERENCES users (user_id),
+    is_private          BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS project_members (
+    project_id  UUID NOT NULL REFERENCES projects (project_id) ON DELETE CASCADE,
+    user_id     UUID NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    role        TEXT NOT NULL DEFAULT 'member',
+    joined_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (project_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS ai_models (
+    model_id     SERIAL PRIMARY KEY,
+    name         TEXT NOT NULL,
+    version      TEXT,
+    description  TEXT,
+    provider     TEXT,
+    model_type   TEXT,
+    is_active    BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id   UUID PRIMARY KEY,
+    user_id      UUID NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    project_id   UUID REFERENCES projects (project_id) ON DELETE SET NULL,
+    title        TEXT,
+    model_id     INTEGER REFERENCES ai_models (model_id),
+    status       TEXT NOT NULL DEFAULT 'active',
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    message_id  UUID PRIMARY KEY,
+    session_id  UUID NOT NULL REFERENCES chat_sessions (session_id) ON DELETE CASCADE,
+    role        TEXT NOT NULL,
+    content     TEXT NOT NULL,
+    metadata    JSONB,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS usage_analytics (
+    event_id    BIGSERIAL PRIMARY KEY,
+    user_id     UUID,
+    event_type  TEXT NOT NULL,
+    event_data  JSONB,
+    session_id  UUID,
+    project_id  UUID,
+    ip_address  INET,
+    user_agent  TEXT,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
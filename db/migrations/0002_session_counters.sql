@@ -0,0 +1,14 @@
+-- Denormalized per-session counters maintained by DatabaseHandler.add_chat_message(s)
+ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMPTZ;
+
+-- Backfill (same as DatabaseHandler.repair_session_counters())
+UPDATE chat_sessions cs
+SET message_count = totals.message_count,
+    last_message_at = totals.last_message_at
+FROM (
+    SELECT session_id, COUNT(*) AS message_count, MAX(created_at) AS last_message_at
+    FROM chat_messages
+    GROUP BY session_id
+) totals
+WHERE cs.session_id = totals.session_id;
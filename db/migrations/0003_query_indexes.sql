@@ -0,0 +1,20 @@
+-- Indexes matched to DatabaseHandler's access paths. benchmarks/plan_check.py
+-- fails if any handler query falls back to a sequential scan.
+
+-- get_chat_messages_page / iter_chat_messages:
+--   WHERE session_id = ? [AND (created_at, message_id) >< (?, ?)] ORDER BY created_at, message_id
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session_created
+    ON chat_messages (session_id, created_at, message_id);
+
+-- get_user_projects: JOIN project_members pm ... WHERE pm.user_id = ?
+-- (the primary key leads with project_id, so it cannot serve this)
+CREATE INDEX IF NOT EXISTS idx_project_members_user
+    ON project_members (user_id);
+
+-- authenticate_user: WHERE email = ? AND status = 'active'
+CREATE INDEX IF NOT EXISTS idx_users_active_email
+    ON users (email) WHERE status = 'active';
+
+-- get_user_chat_sessions: WHERE user_id = ? AND status = 'active' ORDER BY updated_at DESC
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_status_updated
+    ON chat_sessions (user_id, status, updated_at DESC);
@@ -0,0 +1,28 @@
+-- Documents uploaded to a project and their extracted text chunks.
+-- (project_id, content_hash) is unique so re-uploading an unchanged file
+-- finds the existing row instead of ingesting it again.
+CREATE TABLE IF NOT EXISTS project_documents (
+    document_id   UUID PRIMARY KEY,
+    project_id    UUID NOT NULL REFERENCES projects (project_id) ON DELETE CASCADE,
+    filename      TEXT NOT NULL,
+    content_hash  TEXT NOT NULL,
+    size_bytes    BIGINT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'pending',  -- pending | processing | done | failed
+    page_count    INTEGER,
+    pages_done    INTEGER NOT NULL DEFAULT 0,
+    chunk_count   INTEGER NOT NULL DEFAULT 0,
+    error         TEXT,
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at    TIMESTAMPTZ,
+    finished_at   TIMESTAMPTZ,
+    UNIQUE (project_id, content_hash)
+);
+
+CREATE TABLE IF NOT EXISTS document_chunks (
+    document_id  UUID NOT NULL REFERENCES project_documents (document_id) ON DELETE CASCADE,
+    page_number  INTEGER NOT NULL,
+    chunk_index  INTEGER NOT NULL,
+    content      TEXT NOT NULL,
+    PRIMARY KEY (document_id, page_number, chunk_index)
+);
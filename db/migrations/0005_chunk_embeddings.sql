@@ -0,0 +1,10 @@
+-- Embeddings keyed by the embedder and the sha256 of the embedded text, so
+-- re-indexing a document (or the same text in another project) reuses them.
+-- embedding holds float32 values, little-endian.
+CREATE TABLE IF NOT EXISTS chunk_embeddings (
+    model         TEXT NOT NULL,
+    content_hash  TEXT NOT NULL,
+    embedding     BYTEA NOT NULL,
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (model, content_hash)
+);
@@ -0,0 +1,14 @@
+-- Rolling summary of a chat session's older messages. The summary covers
+-- every message up to and including the keyset position
+-- (covered_created_at, covered_message_id); context building only reads
+-- messages after it and folds the ones that no longer fit into the summary.
+CREATE TABLE IF NOT EXISTS chat_session_summaries (
+    session_id          UUID PRIMARY KEY REFERENCES chat_sessions (session_id) ON DELETE CASCADE,
+    summary             TEXT NOT NULL,
+    covered_created_at  TIMESTAMPTZ NOT NULL,
+    covered_message_id  UUID NOT NULL,
+    covered_count       INTEGER NOT NULL,
+    token_count         INTEGER NOT NULL,
+    model               TEXT NOT NULL,
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,22 @@
+-- Full-text search over chat history and projects (DatabaseHandler.search_messages /
+-- search_projects). The tsvector columns are generated, so Postgres keeps them
+-- current on every insert and update; adding them rewrites both tables once.
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', content)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_search
+    ON chat_messages USING GIN (search_vector);
+
+-- Name matches rank above description matches
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', name), 'A') ||
+        setweight(to_tsvector('english', COALESCE(description, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_projects_search
+    ON projects USING GIN (search_vector);
+
+-- Search scope: sessions of the projects a user is a member of
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_project
+    ON chat_sessions (project_id);
@@ -0,0 +1,108 @@
+-- chat_messages becomes a table range-partitioned by month on created_at, so
+-- each month's rows and index entries live in their own partition. Old
+-- partitions are exported to the cold archive and detached (db/archive.py),
+-- which keeps the hot heap and indexes bounded however long history grows.
+--
+-- The primary key has to include the partition key: (message_id, created_at).
+-- message_id stays a random UUID, so it is still unique in practice.
+--
+-- DOWNTIME: this runs in one transaction and the RENAME takes an ACCESS
+-- EXCLUSIVE lock on chat_messages until it commits, so every read and
+-- write of chat history (and every request that touches it) waits for the
+-- whole migration: copying every row, recomputing search_vector for each,
+-- and building the primary key, session and GIN indexes from scratch. Plan
+-- a maintenance window of roughly a full table copy plus a REINDEX of
+-- chat_messages; time it against a restored copy of production first.
+-- lock_timeout makes the migration fail instead of queueing behind a long
+-- transaction while every new query queues behind it.
+SET LOCAL lock_timeout = '10s';
+
+ALTER TABLE chat_messages RENAME TO chat_messages_unpartitioned;
+
+CREATE TABLE chat_messages (
+    message_id     UUID NOT NULL,
+    session_id     UUID NOT NULL REFERENCES chat_sessions (session_id) ON DELETE CASCADE,
+    role           TEXT NOT NULL,
+    content        TEXT NOT NULL,
+    metadata       JSONB,
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    -- Empty while a reply is still streaming: ReplyStreamer rewrites the row
+    -- every flush interval, and only the final text needs indexing
+    search_vector  tsvector GENERATED ALWAYS AS (to_tsvector('english',
+        CASE WHEN metadata->>'status' = 'streaming' THEN '' ELSE content END)) STORED
+) PARTITION BY RANGE (created_at);
+
+-- Catches rows outside every monthly partition; PartitionMaintainer creates
+-- months ahead of time so it normally stays empty.
+CREATE TABLE chat_messages_default PARTITION OF chat_messages DEFAULT;
+
+-- chat_messages_YYYY_MM for the UTC month containing ``month``; returns the
+-- partition name if it was created, NULL if it already existed
+CREATE OR REPLACE FUNCTION create_chat_messages_partition(month TIMESTAMP) RETURNS TEXT AS $$
+DECLARE
+    month_start TIMESTAMP := date_trunc('month', month);
+    partition_name TEXT := 'chat_messages_' || to_char(date_trunc('month', month), 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+    EXECUTE format('CREATE TABLE %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+                   partition_name,
+                   month_start AT TIME ZONE 'UTC',
+                   (month_start + INTERVAL '1 month') AT TIME ZONE 'UTC');
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Every month with existing messages, through three months ahead
+SELECT create_chat_messages_partition(month)
+FROM generate_series(
+    date_trunc('month', COALESCE((SELECT MIN(created_at) FROM chat_messages_unpartitioned), NOW()) AT TIME ZONE 'UTC'),
+    date_trunc('month', NOW() AT TIME ZONE 'UTC') + INTERVAL '3 months',
+    INTERVAL '1 month'
+) AS month;
+
+INSERT INTO chat_messages (message_id, session_id, role, content, metadata, created_at)
+SELECT message_id, session_id, role, content, metadata, created_at
+FROM chat_messages_unpartitioned;
+
+DROP TABLE chat_messages_unpartitioned;
+
+-- Created after the copy, with the names the unpartitioned table used
+ALTER TABLE chat_messages ADD PRIMARY KEY (message_id, created_at);
+
+CREATE INDEX idx_chat_messages_session_created
+    ON chat_messages (session_id, created_at, message_id);
+
+CREATE INDEX idx_chat_messages_search
+    ON chat_messages USING GIN (search_vector);
+
+-- Archived partitions: one gzip JSONL file each, written by
+-- DatabaseHandler.archive_message_partition
+CREATE TABLE IF NOT EXISTS chat_message_archives (
+    partition_name  TEXT PRIMARY KEY,
+    range_start     TIMESTAMPTZ NOT NULL,
+    range_end       TIMESTAMPTZ NOT NULL,
+    path            TEXT NOT NULL,
+    message_count   BIGINT NOT NULL,
+    session_count   INTEGER NOT NULL,
+    size_bytes      BIGINT NOT NULL,
+    archived_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Each session's messages in an archive file are a separate gzip member at
+-- [byte_offset, byte_offset + byte_length), so reading one session's history
+-- back is a seek and a decompress of just its rows
+CREATE TABLE IF NOT EXISTS chat_message_archive_segments (
+    session_id        UUID NOT NULL REFERENCES chat_sessions (session_id) ON DELETE CASCADE,
+    partition_name    TEXT NOT NULL REFERENCES chat_message_archives (partition_name) ON DELETE CASCADE,
+    byte_offset       BIGINT NOT NULL,
+    byte_length       BIGINT NOT NULL,
+    message_count     INTEGER NOT NULL,
+    first_created_at  TIMESTAMPTZ NOT NULL,
+    last_created_at   TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (session_id, first_created_at, partition_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_message_archive_segments_partition
+    ON chat_message_archive_segments (partition_name);
@@ -0,0 +1,12 @@
+-- Token buckets for PostgresBucketStore (db/admission.py), shared by every
+-- API worker. UNLOGGED: a crash empties it, which only resets every client
+-- to a full bucket, and skipping WAL keeps the per-request upsert cheap.
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+    bucket_key  TEXT PRIMARY KEY,
+    tokens      DOUBLE PRECISION NOT NULL,
+    admitted    BOOLEAN NOT NULL,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_updated
+    ON rate_limit_buckets (updated_at);
@@ -0,0 +1,143 @@
+"""Versioned schema migrations.
+
+Migrations are the ``NNNN_name.sql`` files in this directory, applied in
+version order. Each runs in its own transaction and is recorded in
+``schema_migrations`` with a checksum, so an applied file that is edited
+afterwards is reported instead of silently diverging. A session-level
+advisory lock keeps concurrent deploys from applying the same migration
+twice.
+
+    uv run python -m db.migrations status
+    uv run python -m db.migrations upgrade
+"""
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+import psycopg2
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Arbitrary constant shared by every process running migrations
+ADVISORY_LOCK_ID = 0x6D696772
+
+_FILENAME = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+
+class MigrationError(RuntimeError):
+    """Raised when migrations cannot be applied safely"""
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    path: str
+
+    @property
+    def sql(self) -> str:
+        with open(self.path) as f:
+            return f.read()
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode('utf-8')).hexdigest()
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """All migration files in ``directory``, ordered by version"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise MigrationError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+class Migrator:
+    """Applies pending migrations to the database at ``connection_params``"""
+
+    def __init__(self, connection_params: Dict[str, Any], directory: str = MIGRATIONS_DIR):
+        self.connection_params = connection_params
+        self.directory = directory
+
+    def _connect(self):
+        connection = psycopg2.connect(**self.connection_params)
+        connection.autocommit = True
+        return connection
+
+    @staticmethod
+    def _ensure_table(cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version     INTEGER PRIMARY KEY,
+                name        TEXT NOT NULL,
+                checksum    TEXT NOT NULL,
+                applied_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """)
+
+    @staticmethod
+    def _applied(cursor) -> Dict[int, str]:
+        cursor.execute("SELECT version, checksum FROM schema_migrations")
+        return dict(cursor.fetchall())
+
+    def status(self) -> List[Dict[str, Any]]:
+        """One entry per known migration: version, name, applied, checksum_ok"""
+        connection = self._connect()
+        try:
+            cursor = connection.cursor()
+            self._ensure_table(cursor)
+            applied = self._applied(cursor)
+        finally:
+            connection.close()
+        return [{
+            'version': m.version,
+            'name': m.name,
+            'applied': m.version in applied,
+            'checksum_ok': applied.get(m.version, m.checksum) == m.checksum,
+        } for m in discover(self.directory)]
+
+    def upgrade(self, target: Optional[int] = None) -> List[Migration]:
+        """Apply pending migrations up to ``target`` (default: all); returns those applied"""
+        migrations = discover(self.directory)
+        connection = self._connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_ID,))
+            try:
+                self._ensure_table(cursor)
+                applied = self._applied(cursor)
+                for m in migrations:
+                    if m.version in applied and applied[m.version] != m.checksum:
+                        raise MigrationError(
+                            f"Migration {m.version:04d}_{m.name} was modified after being applied")
+
+                done = []
+                for m in migrations:
+                    if m.version in applied or (target is not None and m.version > target):
+                        continue
+                    connection.autocommit = False
+                    try:
+                        cursor.execute(m.sql)
+                        cursor.execute("""
+                            INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)
+                        """, (m.version, m.name, m.checksum))
+                        connection.commit()
+                    except psycopg2.Error as e:
+                        connection.rollback()
+                        raise MigrationError(f"Migration {m.version:04d}_{m.name} failed: {e}") from e
+                    finally:
+                        connection.autocommit = True
+                    print(f"✅ Applied migration {m.version:04d}_{m.name}")
+                    done.append(m)
+                return done
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_ID,))
+        finally:
+            connection.close()
@@ -0,0 +1,42 @@
+"""Command line entry point: ``python -m db.migrations [status|upgrade]``"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from . import Migrator, MigrationError
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply versioned schema migrations')
+    parser.add_argument('command', choices=['status', 'upgrade'], nargs='?', default='status')
+    parser.add_argument('--target', type=int, help='stop after this version (upgrade only)')
+    args = parser.parse_args()
+
+    load_dotenv()
+    migrator = Migrator({
+        'host': os.getenv('DB_HOST', '127.0.0.1'),
+        'database': os.getenv('DB_NAME', 'chatting'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', 'placeholder'),
+        'port': int(os.getenv('DB_PORT', 5432)),
+    })
+    try:
+        if args.command == 'upgrade':
+            applied = migrator.upgrade(target=args.target)
+            if not applied:
+                print("📝 Schema is up to date")
+            return
+        for entry in migrator.status():
+            state = 'applied' if entry['applied'] else 'pending'
+            if not entry['checksum_ok']:
+                state = 'MODIFIED'
+            print(f"{entry['version']:04d}_{entry['name']:<30} {state}")
+    except MigrationError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
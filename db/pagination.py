@@ -0,0 +1,52 @@
+import base64
+import binascii
+import json
+import math
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+# Keyset pagination over (created_at, message_id). Cursors are opaque to
+# clients: base64url JSON of [direction, created_at, message_id].
+OLDER = 'older'
+NEWER = 'newer'
+
+
+def encode_cursor(direction: str, created_at: datetime, message_id: str) -> str:
+    payload = json.dumps([direction, created_at.isoformat(), str(message_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, datetime, str]:
+    """Return (direction, created_at, message_id); ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, created_at, message_id = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in (OLDER, NEWER):
+            raise ValueError(direction)
+        # Checked here so a tampered id is a 400, not a DataError in Postgres
+        uuid.UUID(message_id)
+        return direction, datetime.fromisoformat(created_at), message_id
+    except (binascii.Error, UnicodeDecodeError, AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def encode_search_cursor(rank: float, item_id: str) -> str:
+    """Cursor after a search hit: results are ordered by (rank, id) descending"""
+    payload = json.dumps([rank, str(item_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, str]:
+    """Return (rank, id); ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        rank = float(rank)
+        if not math.isfinite(rank):
+            raise ValueError(rank)
+        uuid.UUID(item_id)
+        return rank, item_id
+    except (binascii.Error, UnicodeDecodeError, AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+
+import bcrypt
+
+
+class PasswordQueueFull(RuntimeError):
+    """Raised when too many hash/verify jobs are already pending"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, size-bounded thread pool.
+
+    bcrypt releases the GIL, so hashing on ``max_workers`` threads caps the
+    CPU spent on passwords while the FastAPI threadpool and event loop keep
+    serving other routes. At most ``max_queue`` jobs may wait for a worker;
+    beyond that ``PasswordQueueFull`` is raised instead of queueing.
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: int = 2, max_queue: int = 32):
+        if not 4 <= rounds <= 31:
+            raise ValueError("bcrypt rounds must be between 4 and 31")
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._stats = {
+            'hashes': 0,
+            'verifies': 0,
+            'rejected': 0,
+            'hash_seconds_total': 0.0,
+            'hash_seconds_max': 0.0,
+            'queue_wait_seconds_total': 0.0,
+            'queue_wait_seconds_max': 0.0,
+        }
+        self._pending = 0
+
+    # =========================
+    # JOB SUBMISSION
+    # =========================
+
+    def _run(self, kind: str, func, submitted_at: float, *args):
+        started = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.monotonic() - started
+            waited = started - submitted_at
+            with self._lock:
+                self._pending -= 1
+                self._stats[kind] += 1
+                self._stats['hash_seconds_total'] += elapsed
+                self._stats['hash_seconds_max'] = max(self._stats['hash_seconds_max'], elapsed)
+                self._stats['queue_wait_seconds_total'] += waited
+                self._stats['queue_wait_seconds_max'] = max(self._stats['queue_wait_seconds_max'], waited)
+            self._slots.release()
+
+    def _submit(self, kind: str, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise PasswordQueueFull("Password hashing queue is full")
+        with self._lock:
+            self._pending += 1
+        return self._executor.submit(self._run, kind, func, time.monotonic(), *args)
+
+    def _hashpw(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+
+    @staticmethod
+    def _checkpw(password: str, password_hash: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    # =========================
+    # PUBLIC API
+    # =========================
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured cost"""
+        return self._submit('hashes', self._hashpw, password).result()
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Check a password against a stored hash"""
+        return self._submit('verifies', self._checkpw, password, password_hash).result()
+
+    async def hash_async(self, password: str) -> str:
+        """Hash a password without blocking the event loop"""
+        return await asyncio.wrap_future(self._submit('hashes', self._hashpw, password))
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        """Check a password without blocking the event loop"""
+        return await asyncio.wrap_future(self._submit('verifies', self._checkpw, password, password_hash))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True when a stored hash was made with a different cost factor"""
+        # Modular crypt format: $2b$<cost>$<salt+digest>
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Hash latency and queue wait counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = self._pending
+        jobs = stats['hashes'] + stats['verifies']
+        stats.update({
+            'rounds': self.rounds,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'hash_ms_avg': stats['hash_seconds_total'] / jobs * 1000 if jobs else 0.0,
+            'queue_wait_ms_avg': stats['queue_wait_seconds_total'] / jobs * 1000 if jobs else 0.0,
+        })
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
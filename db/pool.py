@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+class PoolTimeout(PoolError):
+    """Raised when no connection could be checked out before the timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool with health checks and stats.
+
+    Unlike ``psycopg2.pool.ThreadedConnectionPool`` callers block (up to
+    ``timeout`` seconds) when every connection is in use instead of failing
+    straight away, and dead connections are replaced transparently on checkout.
+    """
+
+    def __init__(self, connection_params: Dict[str, Any], min_size: int = 1,
+                 max_size: int = 10, timeout: float = 30.0,
+                 health_check_interval: float = 30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: need 0 <= min_size <= max_size and max_size >= 1")
+        self.connection_params = connection_params
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()  # (connection, returned_at)
+        self._in_use = set()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._reconnects = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # =========================
+    # CONNECTION LIFECYCLE
+    # =========================
+
+    def _new_connection(self):
+        connection = psycopg2.connect(**self.connection_params)
+        connection.autocommit = True
+        return connection
+
+    def _is_healthy(self, connection, idle_for: float) -> bool:
+        if connection.closed:
+            return False
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def warm_up(self):
+        """Open connections until the pool holds at least min_size"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self._new_connection()
+            except psycopg2.Error:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Check out a healthy connection, waiting if the pool is exhausted"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+                if self._idle or self._size < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No connection available within {timeout:.1f}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if self._idle:
+                connection, returned_at = self._idle.pop()
+            else:
+                connection, returned_at = None, None
+                self._size += 1
+
+        # Health checks and connects happen outside the lock
+        if connection is not None and not self._is_healthy(connection, time.monotonic() - returned_at):
+            self._close_quietly(connection)
+            connection = None
+            with self._cond:
+                self._reconnects += 1
+        if connection is None:
+            try:
+                connection = self._new_connection()
+            except psycopg2.Error:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._in_use.add(id(connection))
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return connection
+
+    def putconn(self, connection, discard: bool = False):
+        """Return a connection to the pool, dropping it if broken"""
+        if not discard and not connection.closed:
+            try:
+                if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                discard = True
+        discard = discard or bool(connection.closed)
+
+        with self._cond:
+            self._in_use.discard(id(connection))
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+        if discard or self._closed:
+            self._close_quietly(connection)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager that checks a connection out and always returns it"""
+        connection = self.getconn(timeout)
+        discard = False
+        try:
+            yield connection
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(connection, discard=discard)
+
+    def close(self):
+        """Close idle connections; in-use ones are closed when returned"""
+        with self._cond:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._size -= len(idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for connection in idle:
+            self._close_quietly(connection)
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    # =========================
+    # STATS
+    # =========================
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool usage and checkout latency"""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                'checkouts': checkouts,
+                'timeouts': self._timeouts,
+                'reconnects': self._reconnects,
+                'checkout_wait_avg_ms': (self._wait_total / checkouts * 1000) if checkouts else 0.0,
+                'checkout_wait_max_ms': self._wait_max * 1000,
+            }
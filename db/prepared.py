@@ -0,0 +1,79 @@
+import re
+import threading
+import weakref
+from typing import Dict, Any, Sequence
+
+import psycopg2
+import psycopg2.errors
+
+_PLACEHOLDER = re.compile(r'%s')
+
+
+def to_positional(sql: str) -> str:
+    """Rewrite psycopg2 ``%s`` placeholders as PREPARE's ``$1, $2, ...``"""
+    counter = iter(range(1, 10000))
+    return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", sql)
+
+
+class PreparedStatements:
+    """Runs named queries as server-side prepared statements.
+
+    Each statement is PREPAREd the first time it runs on a connection and
+    then called with EXECUTE, so Postgres skips parsing and (after a few
+    executions) planning. Prepared statements live as long as their
+    connection: a reconnect yields a new connection object that starts with
+    none, and a statement that disappeared server-side (``DEALLOCATE``,
+    server restart behind a proxy) is re-prepared on the next call.
+    """
+
+    def __init__(self):
+        # connection -> names prepared on it; entries vanish with the connection
+        self._prepared: "weakref.WeakKeyDictionary[Any, set]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = {'prepares': 0, 'executions': 0, 'reprepares': 0}
+
+    def _names(self, connection) -> set:
+        with self._lock:
+            names = self._prepared.get(connection)
+            if names is None:
+                names = self._prepared[connection] = set()
+            return names
+
+    def _prepare(self, cursor, name: str, sql: str):
+        cursor.execute(f"PREPARE {name} AS {to_positional(sql)}")
+        self._count('prepares')
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def execute(self, cursor, name: str, sql: str, params: Sequence = ()):
+        """Run ``sql`` (with %s placeholders) as prepared statement ``name``"""
+        names = self._names(cursor.connection)
+        if name not in names:
+            try:
+                self._prepare(cursor, name, sql)
+            except psycopg2.errors.DuplicatePreparedStatement:
+                # Prepared on this session by an earlier handler instance
+                if not cursor.connection.autocommit:
+                    raise
+            names.add(name)
+
+        statement = f"EXECUTE {name} ({', '.join(['%s'] * len(params))})" if params else f"EXECUTE {name}"
+        try:
+            cursor.execute(statement, params)
+        except psycopg2.errors.InvalidSqlStatementName:
+            # Gone server-side; inside a transaction the retry would fail anyway
+            if not cursor.connection.autocommit:
+                names.discard(name)
+                raise
+            self._prepare(cursor, name, sql)
+            self._count('reprepares')
+            cursor.execute(statement, params)
+        self._count('executions')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['connections'] = len(self._prepared)
+        return stats
@@ -0,0 +1,187 @@
+import itertools
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+import psycopg2
+from psycopg2.pool import PoolError
+
+from .pool import ConnectionPool
+
+# Inputs to replica_lag(). pg_stat_wal_receiver has a row only while the
+# WAL receiver runs; its status is NULL for roles without pg_read_all_stats
+LAG_QUERY = """
+    SELECT pg_is_in_recovery() AS in_recovery,
+           EXISTS (SELECT 1 FROM pg_stat_wal_receiver) AS receiver_running,
+           (SELECT status FROM pg_stat_wal_receiver) AS receiver_status,
+           pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() AS caught_up,
+           EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8 AS replay_age
+"""
+
+# Errors after which a read is retried on the primary and the replica benched
+REPLICA_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError)
+
+
+def replica_lag(in_recovery: bool, receiver_running: bool, receiver_status: Optional[str],
+                caught_up: Optional[bool], replay_age: Optional[float]) -> Optional[float]:
+    """Seconds a server is behind its primary, from LAG_QUERY's row; None if unknown.
+
+    A streaming replica that replayed everything it received is current, so
+    an idle primary does not make it look lagged. Without a streaming WAL
+    receiver, receive == replay proves nothing (nothing new arrives), so the
+    age of the last replayed transaction is the only bound.
+    """
+    if not in_recovery:
+        return 0.0
+    streaming = receiver_running and receiver_status in (None, 'streaming')
+    if streaming and caught_up:
+        return 0.0
+    return replay_age
+
+
+def parse_replica_hosts(value: str, base_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """'replica1:5433,replica2' -> connection dicts sharing the primary's database and credentials"""
+    replicas = []
+    for entry in filter(None, (part.strip() for part in (value or '').split(','))):
+        host, _, port = entry.partition(':')
+        replicas.append({**base_params, 'host': host, 'port': int(port or base_params.get('port', 5432))})
+    return replicas
+
+
+class Replica:
+    def __init__(self, connection_params: Dict[str, Any], pool: ConnectionPool):
+        self.connection_params = connection_params
+        self.pool = pool
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.connection_params['host']}:{self.connection_params.get('port', 5432)}"
+
+
+class ReplicaRouter:
+    """Spreads reads over read replicas, falling back to the primary.
+
+    A background thread measures each replica's replay lag every
+    ``check_interval`` seconds; replicas that are down, more than
+    ``max_lag`` seconds behind, or cut off from the primary with nothing
+    replayed to date them by get no reads until a later check passes.
+    ``stick(key)`` pins reads for ``key`` (a user or chat session id) to
+    the primary for ``sticky_window`` seconds after a write, so callers
+    read their own writes.
+    """
+
+    def __init__(self, replicas: List[Dict[str, Any]], max_connections: int = 10,
+                 pool_timeout: float = 1.0, max_lag: float = 5.0,
+                 sticky_window: float = 5.0, check_interval: float = 1.0):
+        self.replicas = [
+            Replica(params, ConnectionPool(params, min_size=1, max_size=max_connections, timeout=pool_timeout))
+            for params in replicas
+        ]
+        self.max_lag = max_lag
+        self.sticky_window = sticky_window
+        self.check_interval = check_interval
+        self._round_robin = itertools.count()
+        self._sticky: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'replica_reads': 0, 'primary_reads': 0, 'sticky_reads': 0, 'fallbacks': 0}
+
+    def start(self):
+        """Check every replica once, then keep checking in the background"""
+        for replica in self.replicas:
+            try:
+                replica.pool.warm_up()
+            except psycopg2.Error as e:
+                print(f"❌ Replica {replica.name} unavailable: {e}")
+        self.check()
+        if self._thread and self._thread.is_alive():
+            return
+        self._closing.clear()
+        self._thread = threading.Thread(target=self._run, name='replica-monitor', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._closing.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def _run(self):
+        while not self._closing.wait(self.check_interval):
+            self.check()
+
+    def check(self):
+        """Refresh health and lag of every replica"""
+        for replica in self.replicas:
+            try:
+                with replica.pool.connection() as connection:
+                    cursor = connection.cursor()
+                    cursor.execute(LAG_QUERY)
+                    lag = replica_lag(*cursor.fetchone())
+                    cursor.close()
+                healthy = lag is not None and lag <= self.max_lag
+            except (psycopg2.Error, PoolError):
+                lag, healthy = None, False
+            if healthy != replica.healthy:
+                print(f"{'✅' if healthy else '❌'} Replica {replica.name} "
+                      f"{'in rotation' if healthy else 'out of rotation'} (lag={lag})")
+            replica.lag, replica.healthy, replica.checked_at = lag, healthy, time.monotonic()
+
+    # =========================
+    # ROUTING
+    # =========================
+
+    def stick(self, *keys: str):
+        """Route reads for ``keys`` to the primary for the sticky window"""
+        until = time.monotonic() + self.sticky_window
+        with self._lock:
+            for key in keys:
+                if key:
+                    self._sticky[str(key)] = until
+            if len(self._sticky) > 10000:
+                now = time.monotonic()
+                self._sticky = {k: t for k, t in self._sticky.items() if t > now}
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            until = self._sticky.get(str(key))
+        return until is not None and until > time.monotonic()
+
+    def pick(self, sticky_key: Optional[str] = None) -> Optional[Replica]:
+        """A replica for this read, or None to use the primary"""
+        if self.is_sticky(sticky_key):
+            self._count('sticky_reads')
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            self._count('primary_reads')
+            return None
+        self._count('replica_reads')
+        return healthy[next(self._round_robin) % len(healthy)]
+
+    def mark_down(self, replica: Replica, error: Exception):
+        """Take a replica out of rotation until the next successful check"""
+        if replica.healthy:
+            print(f"❌ Replica {replica.name} out of rotation: {error}")
+        replica.healthy = False
+        self._count('fallbacks')
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['replicas'] = len(self.replicas)
+        stats['healthy'] = sum(replica.healthy for replica in self.replicas)
+        stats['max_lag_seconds'] = max((replica.lag or 0.0 for replica in self.replicas), default=0.0)
+        return stats
@@ -0,0 +1,44 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
+
+# Upper bound on rows per batch insert, so one request stays one bounded statement
+MAX_BATCH_MESSAGES = 5000
+
+# =========================
+# REQUEST SCHEMAS
+# =========================
+class UserCreateRequest(BaseModel):
+    email: str
+    password: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    role: Optional[str] = "scholar"
+
+class UserAuthRequest(BaseModel):
+    email: str
+    password: str
+
+class ProjectCreateRequest(BaseModel):
+    name: str
+    description: str
+    created_by_user_id: str
+    is_private: Optional[bool] = False
+
+class ChatMessageRequest(BaseModel):
+    session_id: str
+    role: str
+    content: str
+    metadata: Optional[Dict] = None
+
+class ChatMessageItem(BaseModel):
+    role: str
+    content: str
+    metadata: Optional[Dict] = None
+
+class ChatMessageBatchRequest(BaseModel):
+    session_id: str
+    messages: List[ChatMessageItem] = Field(min_length=1, max_length=MAX_BATCH_MESSAGES)
+
+class ChatStreamRequest(BaseModel):
+    content: str = Field(min_length=1)
+    budget: int = Field(4096, ge=256, le=1000000)
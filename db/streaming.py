@@ -0,0 +1,270 @@
+import asyncio
+import json
+import re
+import time
+from typing import AsyncIterator, Dict, Any, List, Optional, Set
+
+from starlette.concurrency import run_in_threadpool
+
+TOKEN_PATTERN = re.compile(r'\S+\s*')
+
+TTFB_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_RATE_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """One server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+# =========================
+# MODEL BACKENDS
+# =========================
+
+class ModelBackend:
+    """Streams a reply to chat-model messages ({'role', 'content'} dicts) as text pieces"""
+    name = 'backend'
+
+    def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class FakeBackend(ModelBackend):
+    """Local stand-in: a deterministic reply, one word every 1/``tokens_per_sec`` seconds"""
+    name = 'fake'
+
+    def __init__(self, tokens_per_sec: float = 50.0, first_token_delay: float = 0.05,
+                 reply_words: int = 120):
+        self.tokens_per_sec = tokens_per_sec
+        self.first_token_delay = first_token_delay
+        self.reply_words = reply_words
+
+    def reply(self, messages: List[Dict[str, str]]) -> str:
+        question = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '')
+        words = question.split() or ['nothing']
+        return ' '.join(words[n % len(words)] for n in range(self.reply_words))
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        await asyncio.sleep(self.first_token_delay)
+        for n, token in enumerate(TOKEN_PATTERN.findall(self.reply(messages))):
+            if n:
+                await asyncio.sleep(1 / self.tokens_per_sec)
+            yield token
+
+
+class OllamaBackend(ModelBackend):
+    """Streams from a local Ollama chat model through langchain-ollama"""
+
+    def __init__(self, model: str = 'llama3.2', base_url: str = None):
+        # Imported here so the fake backend works without langchain-ollama
+        from langchain_ollama import ChatOllama
+        self.name = f'ollama-{model}'
+        self._model = ChatOllama(model=model, base_url=base_url)
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        async for chunk in self._model.astream([(m['role'], m['content']) for m in messages]):
+            if chunk.content:
+                yield chunk.content
+
+
+def backend_from_env(value: str) -> ModelBackend:
+    """'fake' / 'fake:200' (tokens/sec) / 'ollama:llama3.2' -> a ModelBackend"""
+    kind, _, option = (value or 'fake').partition(':')
+    if kind == 'fake':
+        return FakeBackend(float(option or 50))
+    if kind == 'ollama':
+        return OllamaBackend(option or 'llama3.2')
+    raise ValueError(f"Unknown chat backend: {value}")
+
+
+# =========================
+# PERSISTENCE
+# =========================
+
+class CoalescedMessageWriter:
+    """Persists a message that grows token by token with at most one write per ``interval``.
+
+    ``append`` never blocks: when a write is due and none is running, the
+    whole text so far is written in the background. Each write replaces
+    the row's content, so a skipped write only delays the next one. The
+    row stays out of the full-text index while its status is
+    ``streaming``, so these writes do not touch the GIN index; the text is
+    indexed once, by the final write.
+    """
+
+    def __init__(self, db, message_id: str, interval: float = 0.5):
+        self.db = db
+        self.message_id = message_id
+        self.interval = interval
+        self.writes = 0
+        self._parts: List[str] = []
+        self._written_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def content(self) -> str:
+        return ''.join(self._parts)
+
+    def append(self, text: str):
+        self._parts.append(text)
+        if time.monotonic() - self._written_at >= self.interval and (self._task is None or self._task.done()):
+            self._written_at = time.monotonic()
+            self._task = asyncio.get_running_loop().create_task(self._write(self.content))
+
+    async def _write(self, content: str, metadata: Dict[str, Any] = None):
+        if await run_in_threadpool(self.db.update_message_content, self.message_id, content, metadata):
+            self.writes += 1
+
+    async def close(self, metadata: Dict[str, Any]):
+        """Wait for a running write, then store the final text and ``metadata``"""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._write(self.content, metadata)
+
+
+# =========================
+# STREAMING
+# =========================
+
+class ReplyStreamer:
+    """Streams assistant replies as server-sent events while persisting them.
+
+    The reply row is created empty up front (status ``streaming``), then
+    a producer task reads the backend, hands tokens to the SSE response
+    through a queue and to a ``CoalescedMessageWriter``. The producer runs
+    outside the response, so when the client disconnects (the response
+    generator is cancelled or closed) it is cancelled and still gets to
+    store the partial text with status ``interrupted``. ``close`` does the
+    same for replies still running at shutdown.
+
+    Time to first token (from the request start passed to ``stream``) and
+    tokens/sec per reply are recorded as histograms when a metrics
+    registry is given, and summarized in ``stats()``.
+    """
+
+    def __init__(self, db, backend: ModelBackend, registry=None, flush_interval: float = 0.5):
+        self.db = db
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self._producers: Set[asyncio.Task] = set()
+        self._stats = {
+            'replies': 0,
+            'active': 0,
+            'complete': 0,
+            'interrupted': 0,
+            'failed': 0,
+            'tokens': 0,
+            'writes': 0,
+            'first_tokens': 0,
+            'ttfb_seconds_total': 0.0,
+            'ttfb_seconds_max': 0.0,
+            'generation_seconds_total': 0.0,
+        }
+        self._ttfb = self._rate = None
+        if registry is not None:
+            self._ttfb = registry.histogram('chat_stream_ttfb_seconds', 'Request start to first streamed token',
+                                            ('backend',), TTFB_BUCKETS)
+            self._rate = registry.histogram('chat_stream_tokens_per_second', 'Streamed tokens per second per reply',
+                                            ('backend',), TOKEN_RATE_BUCKETS)
+
+    async def stream(self, session_id: str, messages: List[Dict[str, str]],
+                     started: float) -> AsyncIterator[bytes]:
+        """SSE events: ``start`` (message_id), ``token`` (text) ..., then ``done`` or ``error``"""
+        message_id = await run_in_threadpool(self.db.add_chat_message, session_id, 'assistant', '',
+                                             {'status': 'streaming', 'backend': self.backend.name})
+        if not message_id:
+            yield sse_event('error', {'detail': 'Failed to create reply message'})
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.get_running_loop().create_task(self._produce(message_id, messages, queue, started))
+        self._producers.add(producer)
+        producer.add_done_callback(self._producers.discard)
+        try:
+            yield sse_event('start', {'message_id': message_id})
+            while True:
+                event, data = await queue.get()
+                yield sse_event(event, data)
+                if event in ('done', 'error'):
+                    return
+        finally:
+            # Client gone (or reply finished): the producer stores what it has
+            producer.cancel()
+
+    async def _produce(self, message_id: str, messages: List[Dict[str, str]], queue: asyncio.Queue,
+                       started: float):
+        writer = CoalescedMessageWriter(self.db, message_id, self.flush_interval)
+        status, error = 'complete', None
+        first_at = None
+        tokens = 0
+        self._stats['replies'] += 1
+        self._stats['active'] += 1
+        try:
+            async for token in self.backend.stream(messages):
+                if first_at is None:
+                    first_at = time.monotonic()
+                tokens += 1
+                writer.append(token)
+                queue.put_nowait(('token', {'text': token}))
+        except asyncio.CancelledError:
+            status = 'interrupted'
+        except Exception as e:
+            print(f"❌ Error streaming reply {message_id}: {e}")
+            status, error = 'failed', str(e) or type(e).__name__
+        finally:
+            finished = time.monotonic()
+            metadata = self._record(status, tokens, started, first_at, finished)
+            # Stored with the final text, so only the writes that already landed
+            metadata['partial_writes'] = writer.writes
+            if error:
+                metadata['error'] = error
+            try:
+                # Shielded: a second cancel (shutdown) must not lose the final text
+                await asyncio.shield(writer.close(metadata))
+            except (asyncio.CancelledError, Exception) as e:
+                print(f"❌ Error finalizing reply {message_id}: {e!r}")
+            self._stats['writes'] += writer.writes
+            self._stats['active'] -= 1
+            queue.put_nowait(('error' if error else 'done',
+                              {'message_id': message_id, **metadata, 'writes': writer.writes}))
+
+    def _record(self, status: str, tokens: int, started: float, first_at: Optional[float],
+                finished: float) -> Dict[str, Any]:
+        """Count the reply and return its metadata (status, tokens, ttfb_ms, tokens_per_sec)"""
+        self._stats[status] += 1
+        self._stats['tokens'] += tokens
+        metadata = {'status': status, 'backend': self.backend.name, 'tokens': tokens}
+        if first_at is not None:
+            ttfb = first_at - started
+            generation = finished - first_at
+            rate = (tokens - 1) / generation if tokens > 1 and generation > 0 else None
+            self._stats['first_tokens'] += 1
+            self._stats['ttfb_seconds_total'] += ttfb
+            self._stats['ttfb_seconds_max'] = max(self._stats['ttfb_seconds_max'], ttfb)
+            self._stats['generation_seconds_total'] += generation
+            if self._ttfb is not None:
+                self._ttfb.observe(ttfb, self.backend.name)
+                if rate is not None:
+                    self._rate.observe(rate, self.backend.name)
+            metadata['ttfb_ms'] = round(ttfb * 1000, 1)
+            metadata['tokens_per_sec'] = round(rate, 1) if rate is not None else None
+        return metadata
+
+    async def close(self, timeout: float = 5.0):
+        """Interrupt replies still streaming and wait for them to be stored"""
+        producers = list(self._producers)
+        for producer in producers:
+            producer.cancel()
+        if producers:
+            await asyncio.wait(producers, timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        # Only touched on the event loop, so no lock
+        stats = dict(self._stats)
+        finished = stats['complete'] + stats['interrupted'] + stats['failed']
+        first_tokens = stats['first_tokens']
+        stats['ttfb_ms_avg'] = stats['ttfb_seconds_total'] * 1000 / first_tokens if first_tokens else 0.0
+        generation = stats['generation_seconds_total']
+        stats['tokens_per_sec'] = stats['tokens'] / generation if generation else 0.0
+        stats['writes_per_reply'] = stats['writes'] / finished if finished else 0.0
+        return stats
@@ -0,0 +1,162 @@
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from .embeddings import Embedder, content_hash, pack_embedding, unpack_embedding
+
+# HNSW settings of new collections; search_ef trades query latency for recall
+DEFAULT_HNSW = {'hnsw:space': 'cosine', 'hnsw:construction_ef': 200, 'hnsw:M': 16, 'hnsw:search_ef': 100}
+
+
+class ProjectVectorIndex:
+    """Persistent per-project retrieval index over document chunks.
+
+    Each project gets its own Chroma collection under ``path``, named after
+    the project and the embedder, so switching models never mixes vectors.
+    Chunks are embedded ``batch_size`` at a time; embeddings are cached in
+    Postgres by (embedder, sha256 of the chunk text), so re-indexing a
+    document only embeds text that changed. chromadb is imported on first
+    use, keeping it off the API's import path.
+    """
+
+    def __init__(self, db, embedder: Embedder, path: str, batch_size: int = 256,
+                 hnsw: Optional[Dict[str, Any]] = None):
+        self.db = db
+        self.embedder = embedder
+        self.path = path
+        self.batch_size = batch_size
+        self.hnsw = {**DEFAULT_HNSW, **(hnsw or {})}
+        self._client = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'chunks_indexed': 0,
+            'embedded': 0,
+            'cache_hits': 0,
+            'embed_seconds_total': 0.0,
+            'queries': 0,
+            'query_seconds_total': 0.0,
+        }
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import chromadb
+                from chromadb.config import Settings
+                self._client = chromadb.PersistentClient(path=self.path,
+                                                         settings=Settings(anonymized_telemetry=False))
+            return self._client
+
+    def collection_name(self, project_id: str) -> str:
+        embedder = re.sub(r'[^a-zA-Z0-9_-]+', '-', self.embedder.name).strip('-')
+        return f"project_{str(project_id).replace('-', '')}_{embedder}"
+
+    def collection(self, project_id: str):
+        return self.client().get_or_create_collection(self.collection_name(project_id), metadata=self.hnsw)
+
+    def drop_project(self, project_id: str):
+        try:
+            self.client().delete_collection(self.collection_name(project_id))
+        except Exception as e:
+            print(f"❌ Error dropping vector collection of project {project_id}: {e}")
+
+    # =========================
+    # EMBEDDING
+    # =========================
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings of ``texts``, from the cache where possible"""
+        hashes = [content_hash(text) for text in texts]
+        cached = self.db.get_cached_embeddings(self.embedder.name, hashes)
+        missing = {}
+        for text, key in zip(texts, hashes):
+            if key not in cached:
+                missing.setdefault(key, text)
+        if missing:
+            started = time.monotonic()
+            vectors = self.embedder.embed(list(missing.values()))
+            elapsed = time.monotonic() - started
+            computed = {key: pack_embedding(vector) for key, vector in zip(missing, vectors)}
+            self.db.store_embeddings(self.embedder.name, computed)
+            cached.update(computed)
+            with self._lock:
+                self._stats['embed_seconds_total'] += elapsed
+        with self._lock:
+            self._stats['embedded'] += len(missing)
+            self._stats['cache_hits'] += len(texts) - len(missing)
+        return [unpack_embedding(cached[key]) for key in hashes]
+
+    # =========================
+    # INDEXING
+    # =========================
+
+    def add(self, project_id: str, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        """Embed and upsert one batch into the project's collection"""
+        if not ids:
+            return
+        self.collection(project_id).upsert(ids=ids, embeddings=self.embed(texts),
+                                           documents=texts, metadatas=metadatas)
+        with self._lock:
+            self._stats['chunks_indexed'] += len(ids)
+
+    def index_document(self, project_id: str, document_id: str) -> int:
+        """(Re)index every stored chunk of a document; returns the number of chunks.
+
+        Chunks are read a batch per query, and no connection is held while a
+        batch is embedded.
+        """
+        self.remove_document(project_id, document_id)
+        batch: List[Dict[str, Any]] = []
+        total = 0
+        for chunk in self.db.iter_document_chunks(document_id, batch_size=self.batch_size):
+            batch.append(chunk)
+            if len(batch) >= self.batch_size:
+                self._add_chunks(project_id, document_id, batch)
+                total += len(batch)
+                batch = []
+        self._add_chunks(project_id, document_id, batch)
+        return total + len(batch)
+
+    def _add_chunks(self, project_id: str, document_id: str, chunks: List[Dict[str, Any]]):
+        self.add(
+            project_id,
+            ids=[f"{document_id}:{c['page_number']}:{c['chunk_index']}" for c in chunks],
+            texts=[c['content'] for c in chunks],
+            metadatas=[{'document_id': str(document_id), 'page_number': c['page_number'],
+                        'chunk_index': c['chunk_index']} for c in chunks],
+        )
+
+    def remove_document(self, project_id: str, document_id: str):
+        self.collection(project_id).delete(where={'document_id': str(document_id)})
+
+    # =========================
+    # RETRIEVAL
+    # =========================
+
+    def search_vector(self, project_id: str, vector: List[float], k: int = 5) -> List[Dict[str, Any]]:
+        """Top-``k`` chunks nearest to ``vector``, closest first"""
+        collection = self.collection(project_id)
+        started = time.monotonic()
+        result = collection.query(query_embeddings=[vector], n_results=k,
+                                  include=['documents', 'metadatas', 'distances'])
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._stats['queries'] += 1
+            self._stats['query_seconds_total'] += elapsed
+        return [
+            {'id': chunk_id, 'content': content, 'distance': distance, **(metadata or {})}
+            for chunk_id, content, metadata, distance in zip(
+                result['ids'][0], result['documents'][0], result['metadatas'][0], result['distances'][0])
+        ]
+
+    def search(self, project_id: str, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Top-``k`` chunks of the project for a text query"""
+        return self.search_vector(project_id, self.embedder.embed([query])[0], k)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        looked_up = stats['embedded'] + stats['cache_hits']
+        stats['cache_hit_ratio'] = stats['cache_hits'] / looked_up if looked_up else 0.0
+        stats['query_ms_avg'] = stats['query_seconds_total'] * 1000 / stats['queries'] if stats['queries'] else 0.0
+        return stats
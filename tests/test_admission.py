@@ -0,0 +1,103 @@
+import asyncio
+import types
+
+import pytest
+
+from db import admission
+from db.admission import QUEUE_TIMEOUT, SHED, MemoryBucketStore, _Gate
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+async def _take(store, key, rate, burst, times):
+    return [await store.take(key, rate, burst) for _ in range(times)]
+
+
+def test_gate_sheds_beyond_the_queue():
+    async def scenario():
+        gate = _Gate(limit=1, max_queue=1, queue_timeout=1.0)
+        assert await gate.acquire() is None
+        waiter = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        assert gate.waiting == 1
+        assert await gate.acquire() == SHED
+        gate.release()
+        assert await waiter is None
+        assert (gate.active, gate.waiting) == (1, 0)
+
+    asyncio.run(scenario())
+
+
+def test_gate_wait_times_out():
+    async def scenario():
+        gate = _Gate(limit=1, max_queue=4, queue_timeout=0.01)
+        assert await gate.acquire() is None
+        assert await gate.acquire() == QUEUE_TIMEOUT
+        assert (gate.active, gate.waiting) == (1, 0)
+        gate.release()
+        assert await gate.acquire() is None
+
+    asyncio.run(scenario())
+
+
+def test_bucket_allows_a_burst_then_reports_the_wait(clock):
+    store = MemoryBucketStore()
+    results = asyncio.run(_take(store, 'ip:a', rate=2.0, burst=3.0, times=4))
+    assert results[:3] == [0.0, 0.0, 0.0]
+    assert results[3] == pytest.approx(0.5)
+
+
+def test_bucket_refills_at_rate_up_to_burst(clock):
+    store = MemoryBucketStore()
+    asyncio.run(_take(store, 'ip:a', rate=2.0, burst=3.0, times=3))
+    clock.now += 0.5
+    assert asyncio.run(_take(store, 'ip:a', rate=2.0, burst=3.0, times=2)) == [0.0, pytest.approx(0.5)]
+    clock.now += 3600
+    assert asyncio.run(_take(store, 'ip:a', rate=2.0, burst=3.0, times=4))[3] > 0
+
+
+def test_buckets_are_per_key_and_least_recently_used_are_dropped(clock):
+    store = MemoryBucketStore(max_keys=2)
+
+    async def scenario():
+        for key in ('ip:a', 'ip:b'):
+            assert await store.take(key, 1.0, 1.0) == 0.0
+        assert await store.take('ip:a', 1.0, 1.0) > 0
+        # 'ip:b' is now the least recently used and makes room for 'ip:c'
+        assert await store.take('ip:c', 1.0, 1.0) == 0.0
+        assert await store.take('ip:b', 1.0, 1.0) == 0.0
+
+    asyncio.run(scenario())
+    assert store.stats() == {'keys': 2, 'evicted': 2}
+
+
+def _scope(*forwarded):
+    return {'client': ('10.0.0.5', 51234), 'headers': [(b'x-forwarded-for', value.encode('latin-1'))
+                                                      for value in forwarded]}
+
+
+def test_spoofed_leading_forwarded_entry_does_not_change_the_client_ip():
+    controller = admission.AdmissionController([], trust_forwarded=True)
+    assert controller.client_ip(_scope('6.6.6.6, 203.0.113.7')) == '203.0.113.7'
+    assert controller.client_ip(_scope('7.7.7.7, 203.0.113.7')) == '203.0.113.7'
+    assert controller.client_ip(_scope('203.0.113.7')) == '203.0.113.7'
+
+
+def test_forwarded_hops_counts_from_the_right_across_repeated_headers():
+    controller = admission.AdmissionController([], trust_forwarded=True, forwarded_hops=2)
+    assert controller.client_ip(_scope('6.6.6.6, 203.0.113.7', '10.1.0.1')) == '203.0.113.7'
+    assert controller.client_ip(_scope('203.0.113.7')) == '203.0.113.7'
+    assert admission.AdmissionController([]).client_ip(_scope('6.6.6.6')) == '10.0.0.5'
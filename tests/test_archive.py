@@ -0,0 +1,82 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from db.archive import SegmentWriter, archived_messages, partition_range, read_segment
+from db.pagination import NEWER, OLDER
+
+T0 = datetime(2025, 1, 10, 9, 0, tzinfo=timezone.utc)
+SESSIONS = ['11111111-1111-1111-1111-111111111111', '22222222-2222-2222-2222-222222222222']
+
+
+def copy_lines():
+    """COPY TO output: session_id<0x02>json per row, grouped by session"""
+    lines = []
+    for s, session_id in enumerate(SESSIONS):
+        for n in range(3):
+            row = {'message_id': f'{s}-{n}', 'session_id': session_id, 'role': 'user',
+                   'content': f'message {n} of session {s}', 'metadata': {'n': n} if n else None,
+                   'created_at': (T0 + timedelta(minutes=10 * s + n)).isoformat()}
+            lines.append(f"{session_id}\x02{json.dumps(row)}\n")
+    return ''.join(lines)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = tmp_path / 'chat_messages_2025_01.jsonl.gz'
+    data = copy_lines()
+    with open(path, 'wb') as out:
+        writer = SegmentWriter(out)
+        # COPY hands over arbitrary chunks, not whole lines
+        for start in range(0, len(data), 37):
+            writer.write(data[start:start + 37])
+        writer.close()
+    return str(path), writer
+
+
+def test_one_segment_per_session(archive):
+    path, writer = archive
+    assert [s['session_id'] for s in writer.segments] == SESSIONS
+    assert [s['message_count'] for s in writer.segments] == [3, 3]
+    assert writer.message_count == 6
+    first, second = writer.segments
+    assert first['byte_offset'] == 0
+    assert second['byte_offset'] == first['byte_length']
+    assert second['byte_offset'] + second['byte_length'] == writer.size_bytes
+    assert first['first_created_at'] == T0
+    assert first['last_created_at'] == T0 + timedelta(minutes=2)
+
+
+def test_read_segment_returns_only_that_session(archive):
+    path, writer = archive
+    segment = writer.segments[1]
+    messages = read_segment(path, segment['byte_offset'], segment['byte_length'])
+    assert [m['message_id'] for m in messages] == ['1-0', '1-1', '1-2']
+    assert messages[1]['metadata'] == {'n': 1}
+    assert messages[0]['created_at'] == T0 + timedelta(minutes=10)
+
+
+def test_whole_file_is_one_valid_gzip_stream(archive):
+    path, _ = archive
+    with open(path, 'rb') as f:
+        lines = gzip.decompress(f.read()).decode('utf-8').splitlines()
+    assert [json.loads(line)['message_id'] for line in lines] == ['0-0', '0-1', '0-2', '1-0', '1-1', '1-2']
+
+
+def test_archived_messages_page_past_a_key(archive):
+    path, writer = archive
+    segments = [(path, s['byte_offset'], s['byte_length']) for s in writer.segments]
+    key = (T0 + timedelta(minutes=1), '0-1')
+    assert [m['message_id'] for m in archived_messages(segments, NEWER, key, 3)] == ['0-2', '1-0', '1-1']
+    assert [m['message_id'] for m in archived_messages(segments, OLDER, key, 3)] == ['0-0']
+    lean = archived_messages(segments, NEWER, None, 2, lean=True)
+    assert [m.to_dict()['metadata'] for m in lean] == [None, {'n': 1}]
+
+
+def test_partition_range():
+    assert partition_range('chat_messages_2024_12') == (datetime(2024, 12, 1, tzinfo=timezone.utc),
+                                                        datetime(2025, 1, 1, tzinfo=timezone.utc))
+    with pytest.raises(ValueError):
+        partition_range('chat_messages_default')
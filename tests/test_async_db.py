@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from db.async_db_manager import AsyncDatabaseHandler, ThreadedDatabaseHandler, async_handler_from_env
+from db.cache import TTLCache
+from db.db_manager import DatabaseHandler
+from db.passwords import PasswordHasher
+
+USER_ID = '0b7c5a1e-6f0d-4d5e-9a51-3f4f5bb0d2c1'
+
+
+class FakePool:
+    """Just pool.acquire() and the connection calls AsyncDatabaseHandler makes"""
+
+    def __init__(self, row=None, error=None):
+        self.row = row
+        self.error = error
+        self.queries = []
+
+    def acquire(self, timeout=None):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def fetchrow(self, sql, *args):
+        self.queries.append(args)
+        if self.error:
+            raise self.error
+        return self.row
+
+    async def fetch(self, sql, *args):
+        return [await self.fetchrow(sql, *args)]
+
+
+def handler(replicas=None, **kwargs):
+    db = DatabaseHandler('primary', 'chat', 'app', 'secret', pooled=True, replicas=replicas,
+                         password_hasher=PasswordHasher(rounds=4), **kwargs)
+    return AsyncDatabaseHandler(db)
+
+
+def test_threaded_handler_awaits_every_method_and_shares_attributes():
+    db = DatabaseHandler('primary', 'chat', 'app', 'secret', cache=TTLCache(maxsize=10))
+    db.get_user_by_id = lambda user_id: {'user_id': user_id}
+    threaded = ThreadedDatabaseHandler(db)
+    assert asyncio.run(threaded.get_user_by_id(USER_ID)) == {'user_id': USER_ID}
+    assert threaded.cache is db.cache
+
+
+def test_unported_methods_fall_back_to_the_threadpool():
+    async_db = handler()
+    async_db.db.search_projects = lambda **kwargs: {'results': [], **kwargs}
+    assert asyncio.run(async_db.search_projects(user_id=USER_ID, query='q')) == \
+        {'results': [], 'user_id': USER_ID, 'query': 'q'}
+
+
+def test_reads_are_cached_in_the_shared_cache():
+    async_db = handler(cache=TTLCache(maxsize=10))
+    async_db.pool = FakePool(row={'user_id': USER_ID, 'email': 'a@example.com'})
+    assert asyncio.run(async_db.get_user_by_id(USER_ID))['email'] == 'a@example.com'
+    assert asyncio.run(async_db.get_user_by_id(USER_ID))['email'] == 'a@example.com'
+    assert len(async_db.pool.queries) == 1
+    assert async_db.db.get_user_by_id(USER_ID)['email'] == 'a@example.com'
+
+
+def test_replica_read_falls_back_to_the_primary_on_connection_errors():
+    async_db = handler(replicas=[{'host': 'replica', 'database': 'chat', 'user': 'app', 'password': 'secret'}])
+    replica = async_db.replicas.replicas[0]
+    replica.healthy = True
+    async_db._replica_pools[replica.name] = FakePool(error=ConnectionRefusedError())
+    async_db.pool = FakePool(row={'session_id': 's', 'project_id': None})
+
+    assert asyncio.run(async_db.get_chat_session('s'))['session_id'] == 's'
+    assert not replica.healthy
+    assert async_db.replicas.stats()['fallbacks'] == 1
+
+
+def test_writes_stick_the_session_to_the_primary():
+    async_db = handler(replicas=[{'host': 'replica', 'database': 'chat', 'user': 'app', 'password': 'secret'}])
+    async_db.replicas.replicas[0].healthy = True
+    async_db.pool = FakePool(row={'message_id': 'm', 'user_id': USER_ID})
+    assert asyncio.run(async_db.add_chat_message('s', 'user', 'hello')) == 'm'
+    assert async_db.replicas.pick('s') is None
+    assert async_db.replicas.pick(USER_ID) is None
+
+
+def test_login_verifies_off_the_loop_and_buffers_last_login():
+    async_db = handler(last_login_flush_interval=60)
+    password_hash = async_db.password_hasher.hash('correct horse')
+    async_db.pool = FakePool(row={'user_id': USER_ID, 'email': 'a@example.com', 'password_hash': password_hash,
+                                  'status': 'active'})
+
+    assert asyncio.run(async_db.authenticate_user('a@example.com', 'wrong')) is None
+    user = asyncio.run(async_db.authenticate_user('a@example.com', 'correct horse'))
+    assert user == {'user_id': USER_ID, 'email': 'a@example.com', 'status': 'active'}
+    assert async_db.last_login_buffer.stats()['pending'] == 1
+
+
+def test_driver_is_chosen_by_name():
+    db = DatabaseHandler('primary', 'chat', 'app', 'secret')
+    assert type(async_handler_from_env('', db)) is AsyncDatabaseHandler
+    assert type(async_handler_from_env('psycopg2', db)) is ThreadedDatabaseHandler
+    with pytest.raises(ValueError):
+        async_handler_from_env('aiopg', db)
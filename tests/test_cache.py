@@ -0,0 +1,45 @@
+from db.cache import MISSING, TTLCache
+
+
+def test_get_returns_value_until_it_expires():
+    cache = TTLCache()
+    cache.set(('user', 'a'), {'user_id': 'a'}, ttl=60)
+    cache.set(('user', 'b'), {'user_id': 'b'}, ttl=0)
+    assert cache.get(('user', 'a')) == {'user_id': 'a'}
+    assert cache.get(('user', 'b')) is MISSING
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 1, 1)
+
+
+def test_ttl_defaults_per_namespace():
+    cache = TTLCache(ttls={'user': 0}, default_ttl=60)
+    cache.set(('user', 'a'), 1)
+    cache.set(('other', 'a'), 2)
+    assert cache.get(('user', 'a')) is MISSING
+    assert cache.get(('other', 'a')) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set(('user', 'a'), 1)
+    cache.set(('user', 'b'), 2)
+    cache.get(('user', 'a'))
+    cache.set(('user', 'c'), 3)
+    assert cache.get(('user', 'b')) is MISSING
+    assert cache.get(('user', 'a')) == 1
+    assert cache.get(('user', 'c')) == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidate_one_key_or_a_namespace():
+    cache = TTLCache()
+    cache.set(('user', 'a'), 1)
+    cache.set(('user', 'b'), 2)
+    cache.set(('models',), [])
+    cache.invalidate('user', 'a')
+    assert cache.get(('user', 'a')) is MISSING
+    assert cache.get(('user', 'b')) == 2
+    cache.invalidate('user')
+    assert cache.get(('user', 'b')) is MISSING
+    assert cache.get(('models',)) == []
+    assert cache.stats()['invalidations'] == 2
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+
+from db.context import ContextBuilder, ExtractiveSummarizer, approx_tokens
+from db.lean import MessageRecord
+from db.pagination import NEWER, decode_cursor, encode_cursor
+
+T0 = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeDB:
+    """Just the handler calls ContextBuilder makes, over an in-memory session"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.summary = None
+
+    def get_session_summary(self, session_id):
+        return self.summary
+
+    def save_session_summary(self, session_id, summary, covered_created_at, covered_message_id,
+                             covered_count, token_count, summarizer):
+        self.summary = {'summary': summary, 'covered_created_at': covered_created_at,
+                        'covered_message_id': covered_message_id, 'covered_count': covered_count,
+                        'token_count': token_count, 'summarizer': summarizer}
+
+    def get_chat_messages_page(self, session_id, limit=50, cursor=None, lean=False):
+        after = decode_cursor(cursor)[1:] if cursor else None
+        newer = [m for m in self.messages if after is None or (m.created_at, m.message_id) > after]
+        page = newer[:limit]
+        more = len(newer) > limit
+        return {'messages': page,
+                'newer_cursor': encode_cursor(NEWER, page[-1].created_at, page[-1].message_id) if more else None}
+
+
+def message(n, words=40, metadata=None, created_at=None):
+    return MessageRecord(f'00000000-0000-4000-8000-{n:012d}', 'user' if n % 2 == 0 else 'assistant',
+                         ' '.join(f'word{n}' for _ in range(words)),
+                         orjson.Fragment(orjson.dumps(metadata)) if metadata else None,
+                         created_at or T0 + timedelta(seconds=n))
+
+
+@pytest.fixture
+def builder():
+    def make(messages, **kwargs):
+        db = FakeDB(messages)
+        return db, ContextBuilder(db, ExtractiveSummarizer(), page_size=7, **kwargs)
+    return make
+
+
+def test_session_within_budget_is_returned_verbatim(builder):
+    messages = [message(n) for n in range(5)]
+    db, context_builder = builder(messages)
+    context = context_builder.build('s', budget=10000)
+    assert context['summary'] is None
+    assert [m['content'] for m in context['messages']] == [m.content for m in messages]
+    assert context['folded_messages'] == 0
+    assert db.summary is None
+
+
+def test_overflow_is_folded_into_the_summary_within_budget(builder):
+    messages = [message(n) for n in range(40)]
+    db, context_builder = builder(messages)
+    budget = 1000
+    context = context_builder.build('s', budget)
+
+    assert context['token_count'] <= budget
+    assert context['summary_tokens'] == approx_tokens(context['summary']) <= budget * 0.25
+    folded = context['folded_messages']
+    assert 0 < folded < len(messages)
+    assert [m['content'] for m in context['messages']] == [m.content for m in messages[folded:]]
+    assert (db.summary['covered_message_id'], db.summary['covered_count']) == (messages[folded - 1].message_id, folded)
+
+
+def test_next_build_reads_only_messages_after_the_summary(builder):
+    messages = [message(n) for n in range(40)]
+    db, context_builder = builder(messages)
+    folded = context_builder.build('s', 1000)['folded_messages']
+    messages.append(message(40))
+
+    context = context_builder.build('s', 1000)
+    assert context['messages_read'] == len(messages) - folded
+    assert context['messages'][-1]['content'] == messages[-1].content
+    assert context['token_count'] <= 1000
+
+
+def test_reply_still_streaming_is_never_folded(builder):
+    now = datetime.now(timezone.utc)
+    messages = [message(n, created_at=now - timedelta(seconds=60 - n)) for n in range(40)]
+    messages[5] = message(5, metadata={'status': 'streaming'}, created_at=messages[5].created_at)
+    db, context_builder = builder(messages)
+
+    context = context_builder.build('s', 1000)
+    assert context['folded_messages'] == 5
+    assert db.summary['covered_message_id'] == messages[4].message_id
+    assert context['messages'][0]['content'] == messages[5].content
+    assert context_builder.stats()['folds_held'] == 1
+
+
+def test_abandoned_streaming_row_is_folded_after_the_grace_period(builder):
+    now = datetime.now(timezone.utc)
+    messages = [message(n, created_at=now - timedelta(seconds=60 - n)) for n in range(40)]
+    messages[5] = message(5, metadata={'status': 'streaming'}, created_at=messages[5].created_at)
+    db, context_builder = builder(messages, streaming_grace=30)
+
+    context = context_builder.build('s', 1000)
+    assert context['folded_messages'] > 5
+    assert context['token_count'] <= 1000
+    assert context_builder.stats()['folds_held'] == 0
+
+
+def test_invalid_ratios_are_rejected():
+    with pytest.raises(ValueError):
+        ContextBuilder(FakeDB([]), ExtractiveSummarizer(), summary_ratio=1.0)
+    with pytest.raises(ValueError):
+        ContextBuilder(FakeDB([]), ExtractiveSummarizer(), keep_ratio=0)
@@ -0,0 +1,105 @@
+from concurrent.futures import Future
+
+import pytest
+
+from db import documents
+from db.documents import DocumentIngestor, chunk_text
+
+
+class InlinePool:
+    """Runs worker functions in-process instead of on the spawn pool"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class FakeDB:
+    def __init__(self, existing=None):
+        self.existing = existing
+        self.writes = []
+        self.finished = {}
+
+    def register_document(self, project_id, filename, content_hash, size_bytes, stale_after):
+        if self.existing:
+            return {'document_id': 'doc-1', 'status': self.existing, 'created': False, 'reclaimed': False}
+        return {'document_id': 'doc-1', 'status': 'pending', 'created': True, 'reclaimed': False}
+
+    def start_document(self, document_id, page_count):
+        self.page_count = page_count
+        return True
+
+    def add_document_chunks(self, document_id, chunks, pages_done):
+        self.writes.append(([(c['page_number'], c['chunk_index']) for c in chunks], pages_done))
+        return True
+
+    def finish_document(self, document_id, error=None):
+        self.finished[document_id] = error
+
+
+@pytest.fixture
+def pdf(monkeypatch):
+    pages = ['page one ' * 30, '', 'page three', 'page four', 'page five']
+    monkeypatch.setattr(documents, '_page_count', lambda path: len(pages))
+    monkeypatch.setattr(documents, '_extract_range',
+                        lambda path, start, stop: [(n + 1, pages[n]) for n in range(start, stop)])
+    return pages
+
+
+def ingestor(db, **kwargs):
+    ingestor = DocumentIngestor(db, max_workers=1, pages_per_task=2, chunk_size=100, chunk_overlap=20, **kwargs)
+    ingestor._processes = InlinePool()
+    return ingestor
+
+
+def test_chunks_overlap_and_cover_the_whole_text():
+    text = ''.join(chr(ord('a') + n % 26) for n in range(250))
+    chunks = chunk_text(text, chunk_size=100, overlap=20)
+    assert [len(c) for c in chunks] == [100, 100, 90]
+    assert chunks[0][-20:] == chunks[1][:20]
+    assert chunks[-1].endswith(text[-10:])
+    assert chunk_text('  short  ', 100, 20) == ['short']
+    assert chunk_text(' \n ', 100, 20) == []
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        DocumentIngestor(FakeDB(), chunk_size=100, chunk_overlap=100)
+
+
+def test_ingest_stores_one_write_per_page_range(pdf):
+    db = FakeDB()
+    assert ingestor(db).ingest('doc-1', 'file.pdf')
+    assert db.page_count == 5
+    assert [pages_done for _, pages_done in db.writes] == [2, 4, 5]
+    # Page one strips to 269 characters: chunks start 80 apart; the empty page has none
+    assert db.writes[0][0] == [(1, 0), (1, 1), (1, 2), (1, 3)]
+    assert db.writes[1][0] == [(3, 0), (4, 0)]
+    assert db.finished == {'doc-1': None}
+
+
+def test_failed_extraction_marks_the_document_failed(pdf, monkeypatch):
+    def extract(path, start, stop):
+        raise OSError('truncated file')
+
+    monkeypatch.setattr(documents, '_extract_range', extract)
+    db = FakeDB()
+    doc_ingestor = ingestor(db)
+    assert not doc_ingestor.ingest('doc-1', 'file.pdf')
+    assert db.finished == {'doc-1': 'truncated file'}
+    assert doc_ingestor.stats()['failed'] == 1
+
+
+def test_duplicate_upload_is_not_queued_and_its_file_is_deleted(tmp_path):
+    path = tmp_path / 'upload.pdf'
+    path.write_bytes(b'%PDF-1.4 same bytes')
+    doc_ingestor = ingestor(FakeDB(existing='done'))
+    document = doc_ingestor.add('project-1', 'report.pdf', str(path), delete=True)
+    assert document['queued'] is False
+    assert not path.exists()
+    assert doc_ingestor.stats()['duplicates'] == 1
+    doc_ingestor.close()
@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from db.embeddings import HashingEmbedder, embedder_from_env, pack_embedding, unpack_embedding
+
+
+def dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_hashing_embedder_is_deterministic_and_unit_length():
+    embedder = HashingEmbedder(dimension=64)
+    first, again, empty = embedder.embed(['Postgres connection pool', 'postgres CONNECTION pool', ''])
+    assert len(first) == 64
+    assert first == again
+    assert math.isclose(math.sqrt(dot(first, first)), 1.0)
+    assert empty == [0.0] * 64
+
+
+def test_texts_sharing_words_are_closer():
+    query, related, unrelated = HashingEmbedder().embed(
+        ['connection pool timeout', 'the pool hit its connection timeout', 'banana bread recipe'])
+    assert dot(query, related) > dot(query, unrelated)
+
+
+def test_dimension_is_part_of_the_name():
+    assert HashingEmbedder(256).name != HashingEmbedder(384).name
+    assert embedder_from_env('hashing:256').dimension == 256
+    with pytest.raises(ValueError):
+        embedder_from_env('word2vec')
+
+
+def test_pack_round_trips_as_float32():
+    vector = [0.5, -0.25, 1.0, 0.0]
+    data = pack_embedding(vector)
+    assert len(data) == 4 * len(vector)
+    assert unpack_embedding(data) == vector
+    # Values are stored at float32 precision
+    assert unpack_embedding(pack_embedding([0.1]))[0] == pytest.approx(0.1, rel=1e-6)
@@ -0,0 +1,75 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from db.last_login import LastLoginBuffer
+
+T0 = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class Recorder:
+    def __init__(self, ok: bool = True):
+        self.ok = ok
+        self.batches = []
+
+    def __call__(self, logins):
+        self.batches.append(dict(logins))
+        return self.ok
+
+
+def test_repeated_logins_coalesce_into_one_write():
+    writes = Recorder()
+    buffer = LastLoginBuffer(writes)
+    buffer.touch('a', T0)
+    buffer.touch('b', T0)
+    buffer.touch('a', T0 + timedelta(seconds=1))
+    assert buffer.flush() == 2
+    assert writes.batches == [{'a': T0 + timedelta(seconds=1), 'b': T0}]
+    assert buffer.flush() == 0
+    assert len(writes.batches) == 1
+    stats = buffer.stats()
+    assert (stats['touched'], stats['flushed'], stats['flushes'], stats['pending']) == (3, 2, 1, 0)
+
+
+def test_failed_flush_keeps_newer_logins():
+    writes = Recorder(ok=False)
+    buffer = LastLoginBuffer(writes)
+    buffer.touch('a', T0)
+    buffer.touch('b', T0)
+
+    def flush_func(logins):
+        # A newer login of 'a' arrives while the failing write is in flight
+        buffer.touch('a', T0 + timedelta(seconds=5))
+        return writes(logins)
+
+    buffer.flush_func = flush_func
+    assert buffer.flush() == 0
+    assert buffer.stats()['failed'] == 2
+
+    buffer.flush_func = writes
+    writes.ok = True
+    assert buffer.flush() == 2
+    assert writes.batches[-1] == {'a': T0 + timedelta(seconds=5), 'b': T0}
+
+
+def test_close_flushes_what_is_left():
+    writes = Recorder()
+    buffer = LastLoginBuffer(writes, flush_interval=60)
+    buffer.start()
+    buffer.touch('a', T0)
+    buffer.close()
+    assert writes.batches == [{'a': T0}]
+
+
+def test_max_pending_wakes_the_writer():
+    writes = Recorder()
+    buffer = LastLoginBuffer(writes, flush_interval=60, max_pending=2)
+    buffer.start()
+    try:
+        buffer.touch('a', T0)
+        buffer.touch('b', T0)
+        deadline = time.monotonic() + 2
+        while not writes.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writes.batches == [{'a': T0, 'b': T0}]
+    finally:
+        buffer.close()
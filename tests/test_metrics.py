@@ -0,0 +1,60 @@
+import logging
+
+import pytest
+
+from db.metrics import MetricsRegistry, QueryMetrics
+
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    rowcount = 1
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        self.connection.executed.append(query)
+
+    def fetchall(self):
+        return [('Seq Scan on users',)]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def metrics():
+    return QueryMetrics(MetricsRegistry(), slow_query_ms=10, explain_slow_queries=True)
+
+
+def test_slow_read_only_statement_is_explained_without_analyze(metrics, caplog):
+    connection = FakeConnection()
+    with caplog.at_level(logging.WARNING, logger='db.slow_query'):
+        metrics.record(FakeCursor(connection), 'get_user', 'SELECT * FROM users', None, 0.5, read_only=True)
+    assert connection.executed == [b'EXPLAIN SELECT * FROM users']
+    assert 'Seq Scan on users' in caplog.text
+
+
+def test_slow_write_is_logged_but_never_re_executed(metrics, caplog):
+    connection = FakeConnection()
+    with caplog.at_level(logging.WARNING, logger='db.slow_query'):
+        metrics.record(FakeCursor(connection), 'create_user', 'SELECT create_user(%s)', ('a',), 0.5)
+    assert connection.executed == []
+    assert 'Slow query create_user' in caplog.text
+
+
+def test_fast_statement_is_not_logged(metrics, caplog):
+    connection = FakeConnection()
+    with caplog.at_level(logging.WARNING, logger='db.slow_query'):
+        metrics.record(FakeCursor(connection), 'get_user', 'SELECT 1', None, 0.001, read_only=True)
+    assert connection.executed == []
+    assert caplog.text == ''
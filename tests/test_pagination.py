@@ -0,0 +1,67 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from db.pagination import (NEWER, OLDER, decode_cursor, decode_search_cursor, encode_cursor,
+                           encode_search_cursor)
+
+CREATED_AT = datetime(2025, 3, 1, 12, 30, 45, 123456, tzinfo=timezone.utc)
+MESSAGE_ID = '0b7c5a1e-6f0d-4d5e-9a51-3f4f5bb0d2c1'
+
+
+@pytest.mark.parametrize('direction', [OLDER, NEWER])
+def test_cursor_round_trip(direction):
+    cursor = encode_cursor(direction, CREATED_AT, MESSAGE_ID)
+    assert decode_cursor(cursor) == (direction, CREATED_AT, MESSAGE_ID)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(NEWER, CREATED_AT, MESSAGE_ID)
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+
+
+@pytest.mark.parametrize('cursor', [
+    '',
+    'not base64!',
+    encode_cursor(NEWER, CREATED_AT, MESSAGE_ID)[:-4],
+    encode_search_cursor(0.5, MESSAGE_ID),
+])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize('message_id', ['not-a-uuid', "1' OR '1'='1", 42])
+def test_cursor_with_a_non_uuid_message_id_is_rejected(message_id):
+    payload = json.dumps([NEWER, CREATED_AT.isoformat(), message_id]).encode('utf-8')
+    with pytest.raises(ValueError):
+        decode_cursor(base64.urlsafe_b64encode(payload).decode('ascii'))
+
+
+def test_unknown_direction_is_rejected():
+    cursor = encode_cursor('sideways', CREATED_AT, MESSAGE_ID)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_search_cursor_round_trip():
+    assert decode_search_cursor(encode_search_cursor(0.0625, MESSAGE_ID)) == (0.0625, MESSAGE_ID)
+
+
+def test_malformed_search_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_search_cursor('e30')
+
+
+@pytest.mark.parametrize('rank, item_id', [
+    (0.5, 'not-a-uuid'),
+    (0.5, 7),
+    ('NaN', MESSAGE_ID),
+    ('Infinity', MESSAGE_ID),
+])
+def test_search_cursor_with_bad_rank_or_id_is_rejected(rank, item_id):
+    payload = json.dumps([rank, item_id]).encode('utf-8')
+    with pytest.raises(ValueError):
+        decode_search_cursor(base64.urlsafe_b64encode(payload).decode('ascii'))
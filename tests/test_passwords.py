@@ -0,0 +1,40 @@
+import asyncio
+
+import bcrypt
+import pytest
+
+from db.passwords import PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(rounds=5, max_workers=1, max_queue=1)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_made_with_configured_cost_is_current(hasher):
+    assert not hasher.needs_rehash(hasher.hash('correct horse'))
+
+
+def test_other_cost_needs_rehash(hasher):
+    old = bcrypt.hashpw(b'correct horse', bcrypt.gensalt(4)).decode('utf-8')
+    assert hasher.needs_rehash(old)
+    assert hasher.verify('correct horse', old)
+
+
+@pytest.mark.parametrize('password_hash', ['', 'plaintext', '$2b$', '$2b$xx$salt'])
+def test_unparseable_hash_needs_rehash(hasher, password_hash):
+    assert hasher.needs_rehash(password_hash)
+
+
+def test_async_hash_and_verify_run_on_the_bcrypt_pool(hasher):
+    async def scenario():
+        password_hash = await hasher.hash_async('correct horse')
+        return password_hash, await hasher.verify_async('correct horse', password_hash), \
+            await hasher.verify_async('wrong', password_hash)
+
+    password_hash, ok, wrong = asyncio.run(scenario())
+    assert (ok, wrong) == (True, False)
+    assert not hasher.needs_rehash(password_hash)
+    assert (hasher.stats()['hashes'], hasher.stats()['verifies']) == (1, 2)
@@ -0,0 +1,104 @@
+import threading
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from db import pool
+from db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, n):
+        self.n = n
+        self.closed = 0
+        self.autocommit = False
+        self.broken = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        if self.connection.broken:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(**params):
+        opened.append(FakeConnection(len(opened)))
+        return opened[-1]
+
+    monkeypatch.setattr(pool.psycopg2, 'connect', connect)
+    return opened
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted(connections):
+    connection_pool = ConnectionPool({}, min_size=0, max_size=1)
+    held = connection_pool.getconn()
+    with pytest.raises(PoolTimeout):
+        connection_pool.getconn(timeout=0.01)
+    assert connection_pool.stats()['timeouts'] == 1
+
+    # A waiter gets the connection as soon as it is returned
+    threading.Timer(0.05, connection_pool.putconn, (held,)).start()
+    assert connection_pool.getconn(timeout=5) is held
+    assert len(connections) == 1
+
+
+def test_broken_idle_connection_is_discarded_on_checkout(connections):
+    connection_pool = ConnectionPool({}, min_size=1, max_size=1, health_check_interval=0)
+    connection_pool.warm_up()
+    connections[0].broken = True
+
+    connection = connection_pool.getconn()
+    assert connection is connections[1]
+    assert connections[0].closed
+    assert connection_pool.stats()['reconnects'] == 1
+    assert connection_pool.stats()['size'] == 1
+
+
+def test_connection_that_failed_mid_use_is_not_returned_to_the_pool(connections):
+    connection_pool = ConnectionPool({}, min_size=0, max_size=1)
+    with pytest.raises(psycopg2.OperationalError):
+        with connection_pool.connection() as connection:
+            raise psycopg2.OperationalError('terminating connection')
+    assert connection.closed
+    assert connection_pool.stats()['size'] == connection_pool.stats()['idle'] == 0
+    assert connection_pool.getconn() is connections[1]
+
+
+def test_close_while_checked_out_closes_on_return(connections):
+    connection_pool = ConnectionPool({}, min_size=2, max_size=2)
+    connection_pool.warm_up()
+    held = connection_pool.getconn()
+    connection_pool.close()
+
+    idle = connections[0] if held is connections[1] else connections[1]
+    assert idle.closed and not held.closed
+    with pytest.raises(PoolError):
+        connection_pool.getconn()
+
+    connection_pool.putconn(held)
+    assert held.closed
+    assert connection_pool.stats()['size'] == 0
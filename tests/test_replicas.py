@@ -0,0 +1,34 @@
+import pytest
+
+from db.replicas import parse_replica_hosts, replica_lag
+
+
+def test_primary_has_no_lag():
+    assert replica_lag(False, False, None, None, None) == 0.0
+
+
+@pytest.mark.parametrize('status', ['streaming', None])
+def test_streaming_replica_that_replayed_everything_is_current(status):
+    # None: the receiver runs but the role may not read its status
+    assert replica_lag(True, True, status, True, 900.0) == 0.0
+
+
+def test_streaming_replica_behind_reports_replay_age():
+    assert replica_lag(True, True, 'streaming', False, 3.5) == 3.5
+
+
+@pytest.mark.parametrize('running, status', [(False, None), (True, 'waiting'), (True, 'stopping')])
+def test_disconnected_replica_is_dated_by_its_last_replay(running, status):
+    assert replica_lag(True, running, status, True, 900.0) == 900.0
+
+
+def test_disconnected_replica_with_nothing_replayed_is_unknown():
+    assert replica_lag(True, False, None, True, None) is None
+
+
+def test_parse_replica_hosts_shares_the_primary_credentials():
+    base = {'host': 'primary', 'port': 5432, 'database': 'app', 'user': 'app'}
+    assert parse_replica_hosts(' replica1:5433, replica2 ,', base) == [
+        {**base, 'host': 'replica1', 'port': 5433},
+        {**base, 'host': 'replica2', 'port': 5432},
+    ]
@@ -0,0 +1,52 @@
+import asyncio
+import json
+import time
+
+from db.streaming import FakeBackend, ReplyStreamer
+
+
+class FakeDB:
+    def __init__(self, final_write_ok: bool = True):
+        self.final_write_ok = final_write_ok
+        self.rows = {}
+
+    def add_chat_message(self, session_id, role, content, metadata=None):
+        self.rows['reply'] = {'content': content, 'metadata': dict(metadata or {})}
+        return 'reply'
+
+    def update_message_content(self, message_id, content, metadata=None):
+        if metadata is not None and not self.final_write_ok:
+            return False
+        self.rows[message_id]['content'] = content
+        self.rows[message_id]['metadata'].update(metadata or {})
+        return True
+
+
+def events(db, flush_interval=0.5):
+    streamer = ReplyStreamer(db, FakeBackend(tokens_per_sec=1000, first_token_delay=0, reply_words=5),
+                             flush_interval=flush_interval)
+
+    async def collect():
+        parsed = []
+        async for chunk in streamer.stream('s', [{'role': 'user', 'content': 'a b c'}], time.monotonic()):
+            event, data = chunk.decode('utf-8').split('\n')[:2]
+            parsed.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+        return parsed
+
+    return asyncio.run(collect())
+
+
+def test_final_write_stores_text_and_status():
+    db = FakeDB()
+    event, data = events(db)[-1]
+    assert event == 'done'
+    assert data['writes'] == 1
+    assert db.rows['reply']['content'] == 'a b c a b'
+    assert db.rows['reply']['metadata']['status'] == 'complete'
+    assert db.rows['reply']['metadata']['partial_writes'] == 0
+
+
+def test_failed_final_write_is_not_counted():
+    event, data = events(FakeDB(final_write_ok=False))[-1]
+    assert event == 'done'
+    assert data['writes'] == 0